@@ -6,6 +6,7 @@ from modules.manage_actions import manage_actions
 from modules.view_specs import view_specs
 from modules.visualize_decision_tree import visualize_decision_tree
 from modules.my_strategies import my_strategies
+from modules.parameter_sweep import parameter_sweep
 
 
 def main():
@@ -32,7 +33,8 @@ def main():
                 "Manage Actions",
                 "View Specifications",
                 "Visualize Decision Tree",
-                "My Strategies"
+                "My Strategies",
+                "Parameter Sweep"
             ],
             key='navigation'
         )
@@ -53,6 +55,8 @@ def main():
         visualize_decision_tree(st.session_state['selected_strategy_name'])
     elif st.session_state['app_mode'] == "My Strategies":
         my_strategies()
+    elif st.session_state['app_mode'] == "Parameter Sweep":
+        parameter_sweep(st.session_state['selected_strategy_name'])
 
 
 if __name__ == "__main__":
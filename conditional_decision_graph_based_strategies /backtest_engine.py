@@ -0,0 +1,220 @@
+from typing import Any, Dict, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+SIZING_METHODS = ('initial_cash', 'nav')
+
+# Trading days per year used to annualise metrics
+PERIODS_PER_YEAR = 252
+
+
+class BacktestResult:
+    def __init__(self, nav: pd.Series, positions: pd.DataFrame, turnover: pd.Series, weights: pd.DataFrame,
+                 state: Optional[Dict[str, Any]] = None):
+        """
+        Initializes a BacktestResult.
+
+        :param nav: Strategy NAV per date.
+        :param positions: Units held per date and ETF, after the day's trades.
+        :param turnover: Traded notional per date as a fraction of the NAV before trading.
+        :param weights: Target allocation weights per date and ETF.
+        :param state: JSON-serializable state after the last date, see `run_local_backtest`.
+        """
+        self.nav = nav
+        self.positions = positions
+        self.turnover = turnover
+        self.weights = weights
+        self.state = state
+        # Name of the action taken on each date, set by run_strategy
+        self.decision_path = None
+
+    def history(self) -> pd.Series:
+        """
+        Returns the NAV series, mirroring `sig.DynamicStrategy.history()`.
+
+        :return: Strategy NAV per date.
+        """
+        return self.nav
+
+
+def build_price_panel(etf_histories: Dict[str, pd.Series], dates, etfs) -> pd.DataFrame:
+    """
+    Aligns ETF histories into a date x ETF price panel.
+
+    Prices are forward-filled over the union of history dates before being restricted to
+    `dates`, so each value is the ETF's last known price as of that date.
+
+    :param etf_histories: Dictionary mapping ETFs to their price histories.
+    :param dates: Dates of the panel.
+    :param etfs: ETFs (columns) of the panel.
+    :return: DataFrame of prices, NaN before an ETF's history starts.
+    """
+    panel = pd.DataFrame({etf: etf_histories[etf] for etf in etfs if etf in etf_histories})
+    panel = panel.sort_index().ffill().reindex(pd.DatetimeIndex(dates))
+    return panel.reindex(columns=list(etfs))
+
+
+def _state_row(state: Optional[Dict[str, Any]], key: str, columns, fill_value: float) -> np.ndarray:
+    # Values of a saved state for the given ETFs; ETFs the state does not know get `fill_value`
+    if state is None:
+        return np.full(len(columns), fill_value)
+    row = pd.Series(state[key], index=state['columns'], dtype=float)
+    return row.reindex(columns, fill_value=fill_value).to_numpy(dtype=float)
+
+
+def run_local_backtest(
+    prices: pd.DataFrame,
+    weights: pd.DataFrame,
+    initial_cash: float,
+    sizing: str = 'initial_cash',
+    transaction_cost_bps: float = 0.0,
+    initial_state: Optional[Dict[str, Any]] = None
+) -> BacktestResult:
+    """
+    Runs a backtest of target allocation weights with vectorized NumPy arithmetic.
+
+    Weights decided on a date are traded at that date's price. With 'initial_cash' sizing the
+    target units are weight * initial_cash / price, like the orders of an ActionNode. With 'nav'
+    sizing the weights are rebalanced on the current NAV, so the strategy compounds.
+
+    The result's `state` holds the units, weights, last prices and running cash flow and growth
+    factors after the last date. Passing it as `initial_state` to a backtest of the following dates
+    continues the run: the accumulations resume from the saved values, so the continued series
+    are identical to those of a single backtest over all the dates.
+
+    :param prices: DataFrame of prices, one row per date and one column per ETF.
+    :param weights: DataFrame of target weights, as returned by `DecisionTree.evaluate_series`.
+    :param initial_cash: Initial cash of the strategy.
+    :param sizing: 'initial_cash' or 'nav'.
+    :param transaction_cost_bps: Cost charged on traded notional, in basis points.
+    :param initial_state: Optional `state` of a backtest of the preceding dates, with the same parameters.
+    :return: BacktestResult object.
+    """
+    if sizing not in SIZING_METHODS:
+        raise ValueError(f"Unsupported sizing method: {sizing}")
+    if initial_state is not None:
+        parameters = (initial_state['sizing'], initial_state['initial_cash'], initial_state['transaction_cost_bps'])
+        if parameters != (sizing, initial_cash, transaction_cost_bps):
+            raise ValueError(f"Cannot resume a backtest run with different parameters: {parameters}")
+
+    # Align weights on the price panel; dates without a decision keep the previous weights
+    previous_weights_row = _state_row(initial_state, 'weights', prices.columns, 0.0)
+    weights = weights.reindex(columns=prices.columns, fill_value=0.0)
+    weights = weights.reindex(prices.index).ffill().fillna(dict(zip(prices.columns, previous_weights_row)))
+
+    price_values = prices.to_numpy(dtype=float)
+    weight_values = weights.to_numpy(dtype=float)
+    # ETFs without a price yet cannot be traded
+    tradable = ~np.isnan(price_values)
+    weight_values = np.where(tradable, weight_values, 0.0)
+    safe_prices = np.where(tradable, price_values, 1.0)
+    cost_rate = transaction_cost_bps / 1e4
+
+    # Values before the first date: nothing held on a fresh run, the saved state on a resumed one
+    first_units = _state_row(initial_state, 'units', prices.columns, 0.0)
+    cash_flow = growth = cost_factor = None
+    if sizing == 'initial_cash':
+        units = weight_values * initial_cash / safe_prices
+        previous_units = np.vstack([first_units[None, :], units[:-1]])
+        traded_notional = np.abs(units - previous_units) * safe_prices
+        costs = cost_rate * traded_notional.sum(axis=1)
+        # Accumulating from the saved flow adds the same terms in the same order as a single run
+        first_flow = initial_state['cash_flow'] if initial_state is not None else 0.0
+        flows = ((units - previous_units) * safe_prices).sum(axis=1) + costs
+        cash_flow = np.cumsum(np.concatenate([[first_flow], flows]))
+        cash = initial_cash - cash_flow[1:]
+        nav = cash + (units * safe_prices).sum(axis=1)
+        nav_before_trade = initial_cash - cash_flow[:-1] + (previous_units * safe_prices).sum(axis=1)
+    else:
+        if initial_state is not None:
+            first_prices = _state_row(initial_state, 'prices', prices.columns, np.nan)
+            first_prices = np.where(np.isnan(first_prices), 1.0, first_prices)
+            previous_prices = np.vstack([first_prices[None, :], safe_prices[:-1]])
+        else:
+            previous_prices = np.vstack([safe_prices[:1], safe_prices[:-1]])
+        returns = np.where(tradable, safe_prices / previous_prices - 1, 0.0)
+        previous_weights = np.vstack([previous_weights_row[None, :], weight_values[:-1]])
+        portfolio_returns = (previous_weights * returns).sum(axis=1)
+        # Weights drift with prices between rebalances; trading brings them back to target
+        drifted_weights = previous_weights * (1 + returns) / (1 + portfolio_returns)[:, None]
+        traded_fraction = np.abs(weight_values - drifted_weights).sum(axis=1)
+        first_growth, first_cost_factor = (initial_state['growth'], initial_state['cost_factor']) \
+            if initial_state is not None else (1.0, 1.0)
+        growth = np.cumprod(np.concatenate([[first_growth], 1 + portfolio_returns]))
+        cost_factor = np.cumprod(np.concatenate([[first_cost_factor], 1 - cost_rate * traded_fraction]))
+        nav_before_trade = initial_cash * growth[1:] * cost_factor[:-1]
+        nav = nav_before_trade * (1 - cost_rate * traded_fraction)
+        units = weight_values * nav[:, None] / safe_prices
+        previous_units = np.vstack([first_units[None, :], units[:-1]])
+        traded_notional = np.abs(units - previous_units) * safe_prices
+
+    turnover = traded_notional.sum(axis=1) / np.where(nav_before_trade != 0, nav_before_trade, np.nan)
+    logging.info(f"Local backtest over {len(prices.index)} dates, final NAV {nav[-1] if len(nav) else initial_cash}")
+
+    state = None
+    if len(prices.index):
+        state = {
+            'sizing': sizing,
+            'initial_cash': initial_cash,
+            'transaction_cost_bps': transaction_cost_bps,
+            'columns': [str(column) for column in prices.columns],
+            'units': units[-1].tolist(),
+            'weights': weight_values[-1].tolist(),
+            'prices': price_values[-1].tolist(),
+            'cash_flow': float(cash_flow[-1]) if cash_flow is not None else 0.0,
+            'growth': float(growth[-1]) if growth is not None else 1.0,
+            'cost_factor': float(cost_factor[-1]) if cost_factor is not None else 1.0,
+        }
+
+    return BacktestResult(
+        nav=pd.Series(nav, index=prices.index),
+        positions=pd.DataFrame(units, index=prices.index, columns=prices.columns),
+        turnover=pd.Series(turnover, index=prices.index),
+        weights=weights,
+        state=state,
+    )
+
+
+def compute_nav_metrics(nav: pd.Series) -> Dict[str, float]:
+    """
+    Computes performance metrics of a NAV series, whichever engine produced it.
+
+    :param nav: Strategy NAV per date.
+    :return: Dictionary with total return, CAGR, annualised volatility, Sharpe ratio (zero risk-free rate)
+             and maximum drawdown.
+    """
+    nav = nav.dropna()
+    if len(nav) < 2 or nav.iloc[0] == 0:
+        return {'total_return': np.nan, 'cagr': np.nan, 'volatility': np.nan, 'sharpe': np.nan, 'max_drawdown': np.nan}
+
+    returns = nav.pct_change().dropna()
+    total_return = nav.iloc[-1] / nav.iloc[0] - 1
+    years = (len(nav) - 1) / PERIODS_PER_YEAR
+    cagr = (nav.iloc[-1] / nav.iloc[0]) ** (1 / years) - 1 if nav.iloc[-1] > 0 else -1.0
+    volatility = returns.std() * np.sqrt(PERIODS_PER_YEAR)
+    sharpe = returns.mean() / returns.std() * np.sqrt(PERIODS_PER_YEAR) if returns.std() > 0 else np.nan
+    max_drawdown = (nav / nav.cummax() - 1).min()
+    return {
+        'total_return': total_return,
+        'cagr': cagr,
+        'volatility': volatility,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+    }
+
+
+def compute_metrics(result: BacktestResult) -> Dict[str, float]:
+    """
+    Computes NAV-based performance metrics of a backtest.
+
+    :param result: BacktestResult object.
+    :return: Dictionary with total return, CAGR, annualised volatility, Sharpe ratio (zero risk-free rate),
+             maximum drawdown and average daily turnover.
+    """
+    metrics = compute_nav_metrics(result.nav)
+    # Like the other metrics, turnover is undefined without at least two valid NAVs
+    metrics['turnover'] = np.nan if np.isnan(metrics['total_return']) else result.turnover.mean()
+    return metrics
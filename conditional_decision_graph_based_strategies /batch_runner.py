@@ -0,0 +1,239 @@
+"""
+Batch backtests of saved strategies.
+
+Runs every saved strategy, or those matching name patterns, with the local engine in one pass:
+the union of their data requirements is loaded once, the union of their features is computed
+once and shared with a pool of worker processes, and each worker evaluates a decision tree and
+its backtest against the shared data. Results are written to each strategy folder and recorded
+in the catalog like runs started from the UI.
+
+Features are computed on the longest history any strategy needs, so an RSI can differ from a
+single run of a strategy by its warm-up error (see `spec_dependencies.RSI_WARMUP_FACTOR`).
+For that reason batch results are not written to the run cache (`utils/run_cache.py`): its
+entries are served in place of single runs, which batch runs do not reproduce exactly.
+
+Run from the project directory:
+    python batch_runner.py
+    python batch_runner.py --strategies 'strat*' --start-date 2015-01-01 --workers 4
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import argparse
+import datetime as dtm
+import fnmatch
+import logging
+import os
+import uuid
+
+import pandas as pd
+
+from backtest_engine import build_price_panel, compute_metrics, run_local_backtest
+from feature_store import FeatureStore, collect_feature_keys
+from shared_run_data import attach_shared_data, share_run_data, shared_feature_store, shared_prices
+from spec_dependencies import StrategyDependencies, analyze_specs
+from strategy_builder import build_decision_tree_from_specs, load_compiled_strategy
+from strategy_execution import load_strategy_histories
+from strategy_extension import RESUME_STATE_KEY, capture_resume_state
+from utils.catalog import StrategyCatalog
+from utils.data_utils import STRATEGY_DIR, load_actions, load_conditions
+from utils.price_cache import PriceCache
+from utils.result_store import open_strategy_result, result_path, write_result
+
+# Initial cash of strategies without a saved run
+DEFAULT_INITIAL_CASH = 100000
+
+# Statuses of the strategies in the summary of a batch
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+def discover_strategies(strategy_dir: str = STRATEGY_DIR, patterns: Optional[List[str]] = None) -> List[str]:
+    """
+    Lists the saved strategies: folders holding both specification files.
+
+    :param strategy_dir: Directory of the strategy folders.
+    :param patterns: Optional shell-style name patterns, e.g. ['strat*']. All strategies when not given.
+    :return: Sorted strategy names.
+    """
+    names = []
+    for name in sorted(os.listdir(strategy_dir)):
+        strategy_folder = os.path.join(strategy_dir, name)
+        if not all(os.path.isfile(os.path.join(strategy_folder, file_name))
+                   for file_name in ('conditions.json', 'actions.json')):
+            continue
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        names.append(name)
+    return names
+
+
+def _run_batch_strategy(task):
+    """
+    Backtests one strategy against the shared data.
+    """
+    position, name, condition_specs, action_specs, run_dates, initial_cash = task
+    try:
+        decision_tree = build_decision_tree_from_specs(condition_specs, action_specs)
+        batch_context = {'etf_histories': {}, 'feature_store': shared_feature_store()}
+        leaves = decision_tree.evaluate_leaves(batch_context, run_dates)
+        weights = decision_tree.evaluate_series(batch_context, run_dates, leaves=leaves)
+        prices = shared_prices().reindex(index=run_dates, columns=weights.columns)
+        result = run_local_backtest(prices, weights, initial_cash)
+        result.decision_path = pd.Series([leaf.name for leaf in leaves], index=leaves.index)
+    except Exception as e:
+        logging.error(f"Batch run of {name} failed: {e}")
+        return position, None, str(e)
+    return position, result, None
+
+
+def run_batch(
+        strategy_dir: str = STRATEGY_DIR,
+        patterns: Optional[List[str]] = None,
+        start_date=None,
+        end_date=None,
+        initial_cash: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        price_cache=None,
+        etf_histories: Optional[Dict[str, pd.Series]] = None
+) -> pd.DataFrame:
+    """
+    Backtests saved strategies in one pass with the local engine and saves their results.
+
+    Each strategy keeps the start date and initial cash of its saved run unless they are given.
+    Strategies without a saved run and without `start_date` are skipped.
+
+    :param strategy_dir: Directory of the strategy folders.
+    :param patterns: Optional shell-style name patterns selecting the strategies.
+    :param start_date: Start date of every run. Defaults to the start date of each saved run.
+    :param end_date: End date of every run. Defaults to today.
+    :param initial_cash: Initial cash of every run. Defaults to the initial cash of each saved run.
+    :param max_workers: Number of worker processes. 1 runs the batch in the current process.
+    :param price_cache: PriceCache the histories are read from when `etf_histories` is not given.
+    :param etf_histories: Optional histories covering every strategy's lookback and dates.
+    :return: DataFrame with one row per strategy: name, status, dates, initial cash, metrics and error.
+    """
+    end_date = pd.Timestamp(end_date if end_date is not None else dtm.date.today())
+    batch_id = uuid.uuid4().hex[:12]
+
+    rows, runs = [], []
+    for name in discover_strategies(strategy_dir, patterns):
+        strategy_folder = os.path.join(strategy_dir, name)
+        row = {'name': name, 'status': SKIPPED}
+        rows.append(row)
+        compiled_strategy = load_compiled_strategy(os.path.join(strategy_folder, 'conditions.json'),
+                                                   os.path.join(strategy_folder, 'actions.json'))
+        if compiled_strategy is None:
+            row['error'] = "Invalid condition or action specifications"
+            continue
+        stored_result = open_strategy_result(strategy_folder)
+        saved = stored_result.meta if stored_result is not None else {}
+        strategy_start = start_date if start_date is not None else saved.get('start_date')
+        if strategy_start is None:
+            row['error'] = "No saved run to take the start date from"
+            continue
+        row.update({
+            'start_date': pd.Timestamp(strategy_start),
+            'end_date': end_date,
+            'initial_cash': initial_cash if initial_cash is not None
+            else saved.get('initial_cash', DEFAULT_INITIAL_CASH),
+        })
+        runs.append({
+            'row': row,
+            'folder': strategy_folder,
+            'compiled_strategy': compiled_strategy,
+            'dependencies': analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs),
+        })
+    if not runs:
+        return pd.DataFrame(rows)
+
+    # Prices are loaded once, from the longest lookback of each ticker before the earliest start date
+    dependencies = StrategyDependencies.union([run['dependencies'] for run in runs])
+    first_start = min(run['row']['start_date'] for run in runs)
+    data_source = None
+    if etf_histories is None:
+        price_cache = price_cache if price_cache is not None else PriceCache()
+        data_source = price_cache.source.name
+        etf_histories = load_strategy_histories(dependencies, first_start, end_date, price_cache=price_cache)
+    else:
+        etf_histories = dependencies.restrict(etf_histories, first_start, end_date)
+
+    feature_keys = list(dict.fromkeys(key for run in runs
+                                      for key in collect_feature_keys(run['compiled_strategy'].condition_specs)))
+    feature_store = FeatureStore(etf_histories, feature_keys)
+    prices = build_price_panel(etf_histories, feature_store.calendar, list(etf_histories))
+    logging.info(f"Batch {batch_id}: {len(runs)} strategies, {len(etf_histories)} tickers, "
+                 f"{len(feature_store.columns)} features over {len(feature_store.calendar)} dates")
+
+    tasks = []
+    for position, run in enumerate(runs):
+        # The dates a single run of the strategy would evaluate: those of its own tickers
+        run['etf_histories'] = run['dependencies'].restrict(etf_histories, run['row']['start_date'], end_date)
+        calendar = pd.DatetimeIndex([])
+        for history in run['etf_histories'].values():
+            calendar = calendar.union(history.index)
+        run_dates = calendar[calendar >= run['row']['start_date']]
+        compiled_strategy = run['compiled_strategy']
+        tasks.append((position, run['row']['name'], compiled_strategy.condition_specs, compiled_strategy.action_specs,
+                      run_dates, run['row']['initial_cash']))
+
+    with share_run_data(prices, feature_store, feature_keys) as initializer_args:
+        if max_workers == 1:
+            results = [_run_batch_strategy(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=attach_shared_data, initargs=initializer_args
+            ) as executor:
+                results = list(executor.map(_run_batch_strategy, tasks))
+
+    catalog = StrategyCatalog(strategy_dir)
+    for position, result, error in results:
+        run = runs[position]
+        row = run['row']
+        if result is None:
+            row.update(status=FAILED, error=error)
+            continue
+        name, strategy_folder = row['name'], run['folder']
+        metrics = compute_metrics(result)
+        stored_result = write_result(result_path(strategy_folder), {
+            'name': name,
+            'start_date': row['start_date'].date(),
+            'end_date': end_date.date(),
+            'initial_cash': row['initial_cash'],
+            'engine': 'local',
+            'conditions': load_conditions(os.path.join(strategy_folder, 'conditions.json')),
+            'actions': load_actions(os.path.join(strategy_folder, 'actions.json')),
+            'metrics': metrics,
+            'profile': None,
+            # Not written to the run cache, see the module docstring
+            'run_key': None,
+            'cached': False,
+            'batch_id': batch_id,
+            'data_source': data_source,
+            RESUME_STATE_KEY: capture_resume_state(run['compiled_strategy'].condition_specs, run['etf_histories'],
+                                                   result),
+        }, result.history().rename(f'{name} NAV'), weights=result.weights, decision_path=result.decision_path,
+            positions=result.positions)
+        catalog.record_run(name, stored_result.meta, stored_result.path, job_id=batch_id)
+        row.update(status=DONE, **metrics)
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backtests saved strategies in one pass with the local engine.")
+    parser.add_argument('--strategy-dir', default=STRATEGY_DIR)
+    parser.add_argument('--strategies', nargs='*', help="Shell-style name patterns. All strategies by default.")
+    parser.add_argument('--start-date', type=dtm.date.fromisoformat,
+                        help="Defaults to the start date of each saved run.")
+    parser.add_argument('--end-date', type=dtm.date.fromisoformat, help="Defaults to today.")
+    parser.add_argument('--initial-cash', type=float, help="Defaults to the initial cash of each saved run.")
+    parser.add_argument('--workers', type=int, help="Number of worker processes. 1 runs in the current process.")
+    parser.add_argument('--price-cache-dir', help="Price cache directory. Defaults to the application's cache.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = run_batch(args.strategy_dir, args.strategies, args.start_date, args.end_date, args.initial_cash,
+                        max_workers=args.workers,
+                        price_cache=PriceCache(args.price_cache_dir) if args.price_cache_dir else None)
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(summary)
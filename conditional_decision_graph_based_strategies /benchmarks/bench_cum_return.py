@@ -0,0 +1,68 @@
+"""
+Benchmarks the price-ratio cumulative return against the previous rolling-product implementation.
+
+Run from the project directory:
+    python benchmarks/bench_cum_return.py --days 10000 --windows 5 20 60 250 500
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from helper import get_cum_return, get_cum_return_series
+
+
+def legacy_get_cum_return(data, window):
+    returns = data.pct_change()
+    cumulative_returns = (returns + 1).rolling(window).apply(lambda x: x.prod(), raw=True) - 1
+    return cumulative_returns.iloc[-1] if len(cumulative_returns) >= window else 0
+
+
+def legacy_get_cum_return_series(data, window):
+    returns = data.pct_change()
+    cumulative_returns = (returns + 1).rolling(window).apply(lambda x: x.prod(), raw=True) - 1
+    cumulative_returns.iloc[:window - 1] = 0
+    return cumulative_returns
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=10000, help='Length of the synthetic price history.')
+    parser.add_argument('--windows', type=int, nargs='+', default=[5, 20, 60, 250, 500])
+    parser.add_argument('--points', type=int, default=250, help='Number of daily point evaluations to time.')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    dates = pd.bdate_range('1980-01-01', periods=args.days)
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, args.days))), index=dates)
+    point_dates = dates[-args.points:]
+
+    print(f"{'window':>8} {'series legacy':>14} {'series new':>12} {'points legacy':>14} {'points new':>12} {'max abs diff':>13}")
+    for window in args.windows:
+        legacy_series_time, legacy_series = timed(legacy_get_cum_return_series, prices, window)
+        series_time, series = timed(get_cum_return_series, prices, window)
+        legacy_points_time, _ = timed(
+            lambda: [legacy_get_cum_return(prices.loc[:date], window) for date in point_dates], repeat=1
+        )
+        points_time, _ = timed(lambda: [get_cum_return(prices.loc[:date], window) for date in point_dates], repeat=1)
+        max_diff = np.nanmax(np.abs(series.to_numpy() - legacy_series.to_numpy()))
+        print(f"{window:>8} {legacy_series_time:>13.4f}s {series_time:>11.4f}s "
+              f"{legacy_points_time:>13.4f}s {points_time:>11.4f}s {max_diff:>13.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Benchmark suite for indicators, tree construction, evaluation, DOT generation and a full backtest.
+
+Prices and decision trees are synthetic and seeded, so runs are reproducible and can be compared
+over time from the JSON output. Each benchmark scales along one or more axes: history length in
+years, number of tickers, tree depth and number of nodes.
+
+Run from the project directory:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --years 1 10 50 --tickers 10 200 2000 --depths 1 5 20 --nodes 20 200
+    python benchmarks/run_benchmarks.py --only indicators evaluate
+"""
+from contextlib import redirect_stdout
+import argparse
+import datetime as dtm
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Benchmarks run on synthetic prices and never need the platform
+os.environ.setdefault('SIG_BACKEND', 'offline')
+
+from feature_store import FeatureStore
+from helper import get_cum_return, get_cum_return_series, get_rsi, get_vol
+from strategy_builder import build_decision_tree_from_specs
+from strategy_execution import run_strategy
+from utils.decision_tree_utils import generate_dot
+from utils.synthetic_data import generate_prices
+
+TRADING_DAYS_PER_YEAR = 252
+BENCHMARKS = ('indicators', 'build', 'evaluate', 'dot', 'backtest')
+INDICATOR_WINDOWS = (5, 10, 20, 60, 120)
+
+
+def make_prices(tickers, years, seed=0, start='1970-01-01'):
+    """
+    Generates geometric Brownian motion prices.
+
+    :param tickers: Number of tickers.
+    :param years: History length in years.
+    :param seed: Random seed.
+    :param start: First date of the history.
+    :return: Dictionary mapping ticker names to price histories.
+    """
+    return generate_prices(tickers, start, periods=max(int(years * TRADING_DAYS_PER_YEAR), 1), model='gbm', seed=seed)
+
+
+def random_condition(rng, tickers):
+    indicator = rng.choice(['RSI', 'Volatility', 'Cumulative Return'])
+    window = int(rng.choice(INDICATOR_WINDOWS))
+    if indicator == 'RSI':
+        operator, threshold = rng.choice(['>', '<']), float(rng.uniform(30, 70))
+    elif indicator == 'Volatility':
+        operator, threshold = '>', float(rng.uniform(0.005, 0.03))
+    elif rng.random() < 0.3:
+        # Dynamic threshold comparing the cumulative returns of two tickers
+        etf1, etf2 = rng.choice(tickers, 2, replace=False)
+        operator = '>'
+        threshold = {'indicator': indicator, 'etf1': str(etf1), 'etf2': str(etf2), 'window': window, 'operator': '>'}
+    else:
+        operator, threshold = '>', float(rng.uniform(-0.05, 0.05))
+    return {
+        'indicator': str(indicator),
+        'etf': str(rng.choice(tickers)),
+        'window': window,
+        'operator': str(operator),
+        'threshold': threshold,
+    }
+
+
+def make_specs(tickers, depth, nodes, seed=0):
+    """
+    Generates random condition and action specifications.
+
+    The tree has a spine of `depth` decision nodes; the remaining nodes are attached to free branches
+    of nodes shallower than `depth`, so the tree depth is exactly `depth`.
+
+    :param tickers: Ticker names the conditions and actions may reference.
+    :param depth: Depth of the tree, in decision nodes.
+    :param nodes: Number of decision nodes, at least `depth`.
+    :param seed: Random seed.
+    :return: Tuple (condition specifications, action specifications).
+    """
+    rng = np.random.default_rng(seed)
+    nodes = max(nodes, depth)
+    levels = [0]
+    children = [[None, None]]
+    for position in range(1, nodes):
+        if position < depth:
+            parent, branch = position - 1, 0
+        else:
+            free = [(node, branch) for node in range(len(levels)) if levels[node] < depth - 1
+                    for branch in (0, 1) if children[node][branch] is None]
+            if not free:
+                break
+            parent, branch = free[rng.integers(len(free))]
+        children[parent][branch] = position
+        children.append([None, None])
+        levels.append(levels[parent] + 1)
+
+    condition_specs, action_specs = [], {}
+    for node, (true_child, false_child) in enumerate(children):
+        branches = []
+        for child in (true_child, false_child):
+            if child is None:
+                action_name = f"action_{len(action_specs)}"
+                etfs = rng.choice(tickers, min(3, len(tickers)), replace=False)
+                weights = rng.dirichlet(np.ones(len(etfs)))
+                action_specs[action_name] = {str(etf): float(weight) for etf, weight in zip(etfs, weights)}
+                branches.append(action_name)
+            else:
+                branches.append(f"node_{child}")
+        condition_specs.append({
+            'node_name': f"node_{node}",
+            **random_condition(rng, tickers),
+            'true_branch': branches[0],
+            'false_branch': branches[1],
+        })
+    return condition_specs, action_specs
+
+
+def timed(function, repeat):
+    """
+    Times a function.
+
+    :param function: Function without arguments.
+    :param repeat: Number of runs.
+    :return: Dictionary with the best and mean durations in seconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return {'seconds_best': min(durations), 'seconds_mean': float(np.mean(durations)), 'repeat': repeat}
+
+
+def bench_indicators(args, record):
+    for years in args.years:
+        history = next(iter(make_prices(1, years, args.seed).values()))
+        for window in (20, 60):
+            params = {'years': years, 'window': window, 'dates': len(history)}
+            record('get_rsi', params, timed(lambda: get_rsi(history, window), args.repeat))
+            record('get_vol', params, timed(lambda: get_vol(history, window), args.repeat))
+            record('get_cum_return_series', params, timed(lambda: get_cum_return_series(history, window), args.repeat))
+            # Point evaluation as done for each date of a run
+            point_dates = history.index[-args.points:]
+            record('get_cum_return', {**params, 'points': len(point_dates)}, timed(
+                lambda: [get_cum_return(history.loc[:date], window) for date in point_dates], args.repeat
+            ))
+
+
+def bench_build(args, record):
+    tickers = list(make_prices(args.tickers[0], 0.01, args.seed))
+    for depth in args.depths:
+        for nodes in args.nodes:
+            condition_specs, action_specs = make_specs(tickers, depth, nodes, args.seed)
+            params = {'depth': depth, 'nodes': len(condition_specs)}
+            record('build_decision_tree_from_specs', params, timed(
+                lambda: build_decision_tree_from_specs(condition_specs, action_specs), args.repeat
+            ))
+
+
+def bench_evaluate(args, record):
+    histories = make_prices(args.tickers[0], args.years[0], args.seed)
+    tickers = list(histories)
+    for depth in args.depths:
+        for nodes in args.nodes:
+            condition_specs, action_specs = make_specs(tickers, depth, nodes, args.seed)
+            tree = build_decision_tree_from_specs(condition_specs, action_specs)
+            feature_store = FeatureStore.from_specs(histories, condition_specs)
+            dates = feature_store.calendar
+            params = {'depth': depth, 'nodes': len(condition_specs), 'years': args.years[0], 'dates': len(dates)}
+
+            def evaluate_daily():
+                for date in dates:
+                    tree.evaluate({
+                        'etf_histories': histories,
+                        'feature_store': feature_store,
+                        'midnight_dt': date,
+                        'size_date': date,
+                        'initial_cash': 100000,
+                    })
+
+            record('DecisionTree.evaluate', params, timed(evaluate_daily, args.repeat))
+            record('DecisionTree.evaluate_leaves', params, timed(
+                lambda: tree.evaluate_leaves({'etf_histories': histories, 'feature_store': feature_store}, dates),
+                args.repeat
+            ))
+            record('DecisionTree.flip_calendar', params, timed(
+                lambda: tree.flip_calendar({'etf_histories': histories, 'feature_store': feature_store}, dates),
+                args.repeat
+            ))
+
+
+def bench_dot(args, record):
+    tickers = list(make_prices(args.tickers[0], 0.01, args.seed))
+    for depth in args.depths:
+        for nodes in args.nodes:
+            condition_specs, action_specs = make_specs(tickers, depth, nodes, args.seed)
+            record('generate_dot', {'depth': depth, 'nodes': len(condition_specs)}, timed(
+                lambda: generate_dot(condition_specs, action_specs), args.repeat
+            ))
+
+
+def bench_backtest(args, record):
+    depth, nodes = args.depths[len(args.depths) // 2], args.nodes[0]
+    with tempfile.TemporaryDirectory() as directory:
+        conditions_file = os.path.join(directory, 'conditions.json')
+        actions_file = os.path.join(directory, 'actions.json')
+        for years in args.years:
+            for tickers in args.tickers:
+                histories = make_prices(tickers, years, args.seed)
+                condition_specs, action_specs = make_specs(list(histories), depth, nodes, args.seed)
+                with open(conditions_file, 'w') as f:
+                    json.dump(condition_specs, f)
+                with open(actions_file, 'w') as f:
+                    json.dump(action_specs, f)
+                dates = next(iter(histories.values())).index
+                params = {'years': years, 'tickers': tickers, 'depth': depth, 'nodes': len(condition_specs)}
+                record('run_strategy[local]', params, timed(
+                    lambda: run_strategy(dates[0], dates[-1], 100000, conditions_file, actions_file,
+                                         engine='local', etf_histories=histories),
+                    args.repeat
+                ))
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, nargs='+', default=[1, 10], help='History lengths in years.')
+    parser.add_argument('--tickers', type=int, nargs='+', default=[10, 200], help='Universe sizes.')
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 5, 20], help='Tree depths.')
+    parser.add_argument('--nodes', type=int, nargs='+', default=[20, 200], help='Numbers of decision nodes.')
+    parser.add_argument('--points', type=int, default=250, help='Dates of the point indicator benchmarks.')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark; the best and mean are reported.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument('--output', help='JSON file the results are written to. Defaults to stdout.')
+    args = parser.parse_args()
+
+    results = []
+
+    def record(name, params, timing):
+        results.append({'benchmark': name, 'params': params, **timing})
+        print(f"{name:<32} {json.dumps(params):<80} {timing['seconds_best']:>10.4f}s", file=sys.stderr)
+
+    benchmarks = {
+        'indicators': bench_indicators,
+        'build': bench_build,
+        'evaluate': bench_evaluate,
+        'dot': bench_dot,
+        'backtest': bench_backtest,
+    }
+    # Keep stdout for the JSON report; progress and the project's debug prints go to stderr
+    with redirect_stdout(sys.stderr):
+        for name in args.only:
+            benchmarks[name](args, record)
+
+    report = {
+        'meta': {
+            'timestamp': dtm.datetime.now().isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'arguments': vars(args),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from evaluation_context import size_price
+from feature_store import feature_key
+from graph_factory import ActionNode, DecisionNode, DecisionTree, evaluate_threshold_series
+from helper import OPERATORS, get_indicator_value, get_indicator_values
+
+
+# Operator codes stored in the flat arrays, indexing OPERATOR_FUNCTIONS
+OPERATOR_CODES = {symbol: code for code, symbol in enumerate(OPERATORS)}
+OPERATOR_FUNCTIONS = tuple(OPERATORS.values())
+
+# Threshold kinds
+STATIC_THRESHOLD = 0
+COMPARISON_THRESHOLD = 1
+CALLABLE_THRESHOLD = 2
+
+
+class Leaf:
+    __slots__ = ('name', 'allocations')
+
+    def __init__(self, name: str, allocations: Dict[str, float]):
+        """
+        Initializes a Leaf of a compiled tree.
+
+        :param name: Name of the action the leaf was compiled from.
+        :param allocations: Dictionary mapping ETFs to their allocation weights (in decimal).
+        """
+        self.name = name
+        self.allocations = allocations
+
+    def action(self, context) -> Dict[str, float]:
+        """
+        Calculates the order allocations, like `ActionNode.action`.
+
+        :param context: Dictionary containing ETF histories and other parameters.
+        :return: Dictionary with ETF orders.
+        """
+        return {
+            etf: weight * context['initial_cash'] / size_price(context, etf)
+            for etf, weight in self.allocations.items()
+        }
+
+
+class CompiledTree:
+    """
+    Flat, array-backed form of a DecisionTree.
+
+    Decision node i compares feature `feature_ids[i]` with its threshold using
+    `operator_codes[i]`. Children are decision node indices when >= 0 and leaves when
+    negative, leaf id being -child - 1. Thresholds are either static (`thresholds[i]`),
+    a comparison between two features (row `threshold_ids[i]` of the comparison table)
+    or an arbitrary callable (entry `threshold_ids[i]` of `callable_thresholds`).
+    """
+
+    def __init__(
+        self,
+        features: List[Tuple[str, str, int]],
+        feature_ids: np.ndarray,
+        operator_codes: np.ndarray,
+        threshold_kinds: np.ndarray,
+        thresholds: np.ndarray,
+        threshold_ids: np.ndarray,
+        true_children: np.ndarray,
+        false_children: np.ndarray,
+        comparisons: np.ndarray,
+        callable_thresholds: List[Any],
+        leaves: List[Leaf]
+    ):
+        self.features = features
+        self.feature_ids = feature_ids
+        self.operator_codes = operator_codes
+        self.threshold_kinds = threshold_kinds
+        self.thresholds = thresholds
+        self.threshold_ids = threshold_ids
+        self.true_children = true_children
+        self.false_children = false_children
+        self.comparisons = comparisons
+        self.callable_thresholds = callable_thresholds
+        self.leaves = leaves
+
+        # Plain-list copies for the scalar evaluator, where list indexing beats NumPy scalar access
+        self._rows = list(zip(
+            feature_ids.tolist(), operator_codes.tolist(), threshold_kinds.tolist(), thresholds.tolist(),
+            threshold_ids.tolist(), true_children.tolist(), false_children.tolist()
+        ))
+        self._comparisons = [tuple(row) for row in comparisons.tolist()]
+
+    def feature_value(self, context, feature_id: int, cache: Dict[int, float]) -> float:
+        value = cache.get(feature_id)
+        if value is None:
+            name, etf, window = self.features[feature_id]
+            value = get_indicator_value(context, {'name': name, 'etf': etf}, window)
+            cache[feature_id] = value
+        return value
+
+    def evaluate_leaf(self, context) -> Leaf:
+        """
+        Walks the tree iteratively for the context's date.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :return: Leaf reached.
+        """
+        cache = {}
+        node = 0
+        while node >= 0:
+            feature_id, operator_code, kind, threshold, threshold_id, true_child, false_child = self._rows[node]
+            if kind == COMPARISON_THRESHOLD:
+                feature_id1, feature_id2, comparison_code = self._comparisons[threshold_id]
+                try:
+                    threshold = OPERATOR_FUNCTIONS[comparison_code](
+                        self.feature_value(context, feature_id1, cache),
+                        self.feature_value(context, feature_id2, cache)
+                    )
+                except Exception:
+                    threshold = False
+            elif kind == CALLABLE_THRESHOLD:
+                threshold = self.callable_thresholds[threshold_id](context)
+
+            value = self.feature_value(context, feature_id, cache)
+            node = true_child if OPERATOR_FUNCTIONS[operator_code](value, threshold) else false_child
+        return self.leaves[-node - 1]
+
+    def evaluate(self, context) -> Dict[str, float]:
+        """
+        Evaluates the tree for the context's date, like `DecisionTree.evaluate`.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :return: Dictionary with ETF orders.
+        """
+        return self.evaluate_leaf(context).action(context)
+
+    def evaluate_leaf_ids(self, context, dates) -> np.ndarray:
+        """
+        Routes many dates through the flat arrays with boolean masks.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate.
+        :return: Array with the leaf id reached by each date.
+        """
+        dates = pd.DatetimeIndex(dates)
+        features = np.column_stack([
+            get_indicator_values(context, {'name': name, 'etf': etf}, window, dates)
+            for name, etf, window in self.features
+        ]) if self.features else np.zeros((len(dates), 0))
+
+        leaf_ids = np.full(len(dates), -1, dtype=np.int64)
+        stack = [(0, np.arange(len(dates)))]
+        while stack:
+            node, positions = stack.pop()
+            if len(positions) == 0:
+                continue
+            if node < 0:
+                leaf_ids[positions] = -node - 1
+                continue
+
+            kind = self.threshold_kinds[node]
+            if kind == STATIC_THRESHOLD:
+                threshold = self.thresholds[node]
+            elif kind == COMPARISON_THRESHOLD:
+                feature_id1, feature_id2, operator_code = self.comparisons[self.threshold_ids[node]]
+                threshold = OPERATOR_FUNCTIONS[operator_code](
+                    features[positions, feature_id1], features[positions, feature_id2]
+                )
+            else:
+                threshold = evaluate_threshold_series(
+                    self.callable_thresholds[self.threshold_ids[node]], context, dates[positions]
+                )
+
+            mask = np.asarray(
+                OPERATOR_FUNCTIONS[self.operator_codes[node]](features[positions, self.feature_ids[node]], threshold),
+                dtype=bool
+            )
+            stack.append((self.true_children[node], positions[mask]))
+            stack.append((self.false_children[node], positions[~mask]))
+        return leaf_ids
+
+
+def compile_tree(decision_tree: DecisionTree) -> CompiledTree:
+    """
+    Compiles a DecisionTree into flat arrays.
+
+    Nodes shared by several parents are compiled once.
+
+    :param decision_tree: DecisionTree object.
+    :return: CompiledTree object.
+    """
+    # Reuse the feature ids of the tree's shared feature table when it has one
+    feature_table = getattr(decision_tree, 'feature_table', None)
+    features = dict(feature_table.ids) if feature_table is not None else {}
+    leaves = []
+    leaf_ids = {}
+    comparisons = []
+    callable_thresholds = []
+    decision_nodes = []
+    node_ids = {}
+
+    def add_feature(name, etf, window):
+        key = feature_key(name, etf, window)
+        if key not in features:
+            features[key] = len(features)
+        return features[key]
+
+    def child_id(node):
+        if isinstance(node, ActionNode):
+            if id(node) not in leaf_ids:
+                leaf_ids[id(node)] = len(leaves)
+                leaves.append(Leaf(node.name, node.allocations))
+            return -leaf_ids[id(node)] - 1
+        if id(node) not in node_ids:
+            node_ids[id(node)] = len(decision_nodes)
+            decision_nodes.append(node)
+        return node_ids[id(node)]
+
+    if not isinstance(decision_tree.root, DecisionNode):
+        raise ValueError("Cannot compile a tree whose root is not a DecisionNode")
+
+    rows = []
+    child_id(decision_tree.root)
+    # decision_nodes grows while it is scanned, which visits every reachable node once
+    position = 0
+    while position < len(decision_nodes):
+        node = decision_nodes[position]
+        position += 1
+        if not isinstance(node, DecisionNode):
+            raise ValueError(f"Cannot compile node of type {type(node).__name__}")
+
+        threshold_kind, threshold, threshold_id = STATIC_THRESHOLD, np.nan, -1
+        if callable(node.threshold):
+            spec = getattr(node.threshold, 'spec', None)
+            if spec is not None:
+                threshold_kind, threshold_id = COMPARISON_THRESHOLD, len(comparisons)
+                comparisons.append((
+                    add_feature(spec['indicator'], spec['etf1'], spec['window']),
+                    add_feature(spec['indicator'], spec['etf2'], spec['window']),
+                    OPERATOR_CODES[spec['operator']],
+                ))
+            else:
+                threshold_kind, threshold_id = CALLABLE_THRESHOLD, len(callable_thresholds)
+                callable_thresholds.append(node.threshold)
+        else:
+            threshold = node.threshold
+
+        rows.append((
+            add_feature(node.indicator['name'], node.indicator['etf'], node.window),
+            OPERATOR_CODES[node.operator],
+            threshold_kind,
+            threshold,
+            threshold_id,
+            child_id(node.true_branch),
+            child_id(node.false_branch),
+        ))
+
+    columns = list(zip(*rows))
+    return CompiledTree(
+        features=list(features),
+        feature_ids=np.array(columns[0], dtype=np.int64),
+        operator_codes=np.array(columns[1], dtype=np.int64),
+        threshold_kinds=np.array(columns[2], dtype=np.int64),
+        thresholds=np.array(columns[3], dtype=float),
+        threshold_ids=np.array(columns[4], dtype=np.int64),
+        true_children=np.array(columns[5], dtype=np.int64),
+        false_children=np.array(columns[6], dtype=np.int64),
+        comparisons=np.array(comparisons, dtype=np.int64).reshape(-1, 3),
+        callable_thresholds=callable_thresholds,
+        leaves=leaves,
+    )
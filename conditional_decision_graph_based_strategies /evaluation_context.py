@@ -0,0 +1,194 @@
+"""
+Typed context of the daily evaluation of a decision tree.
+
+A run builds its TradingCalendar and PriceMatrix once; the context of each date then resolves
+calendar membership and the as-of row of its size date with hash lookups, and reads prices with
+an array access, instead of scanning a list of dates and calling `Series.asof` per ETF and per date.
+"""
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import build_price_panel
+
+
+class TradingCalendar:
+    def __init__(self, dates: Iterable):
+        """
+        Initializes a TradingCalendar.
+
+        :param dates: Trading dates. Sorted and deduplicated.
+        """
+        self.dates = pd.DatetimeIndex(dates).unique().sort_values()
+        # Timestamps hash like the equal datetimes, so decision datetimes are looked up directly
+        self.positions = {date: position for position, date in enumerate(self.dates)}
+        # Row of the last trading date on or before every calendar day of the span, forward-filled once
+        days = pd.date_range(self.dates[0].normalize(), self.dates[-1], freq='D') if len(self.dates) else []
+        self.day_positions = dict(zip(days, self.dates.searchsorted(days, side='right') - 1))
+
+    def __contains__(self, date) -> bool:
+        return date in self.positions
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def position(self, date) -> Optional[int]:
+        """
+        Row of a trading date, or None if the date is not in the calendar.
+        """
+        return self.positions.get(date)
+
+    def asof_position(self, date) -> int:
+        """
+        Row of the last trading date on or before `date`, -1 before the first one.
+        """
+        position = self.positions.get(date)
+        if position is not None:
+            return position
+        if not len(self.dates):
+            return -1
+        date = pd.Timestamp(date)
+        if date >= self.dates[-1]:
+            return len(self.dates) - 1
+        return int(self.day_positions.get(date.normalize(), -1))
+
+
+class PriceMatrix:
+    def __init__(self, etf_histories: Dict[str, pd.Series], calendar: TradingCalendar):
+        """
+        Initializes a PriceMatrix: the ETF histories aligned on the calendar and forward-filled.
+
+        :param etf_histories: Dictionary mapping ETFs to their price histories.
+        :param calendar: TradingCalendar of the rows, normally the union of the history dates.
+        """
+        self.calendar = calendar
+        self.columns = {etf: column for column, etf in enumerate(etf_histories)}
+        self.values = build_price_panel(etf_histories, calendar.dates, list(etf_histories)).to_numpy(dtype=float)
+
+    def asof(self, etf: str, date) -> Optional[float]:
+        """
+        Last known price of an ETF on `date`, like `Series.asof` on its history.
+
+        :param etf: ETF of the price.
+        :param date: Date of the price.
+        :return: Price, NaN before the ETF's history starts, or None for an ETF the matrix does not hold.
+        """
+        return self.at(etf, self.calendar.asof_position(date))
+
+    def at(self, etf: str, position: int) -> Optional[float]:
+        """
+        Price of an ETF in a row of the matrix, e.g. one resolved once with `TradingCalendar.asof_position`.
+
+        :param etf: ETF of the price.
+        :param position: Row of the price. -1, before the first date, reads NaN.
+        :return: Price, NaN before the ETF's history starts, or None for an ETF the matrix does not hold.
+        """
+        column = self.columns.get(etf)
+        if column is None:
+            return None
+        if position < 0:
+            return np.nan
+        return self.values[position, column]
+
+
+class EvaluationContext(MutableMapping):
+    """
+    Context of one evaluation date, passed to the nodes of a decision tree.
+
+    The fields are attributes. The mapping interface (`context['midnight_dt']`, `context.get(...)`,
+    `{**context, ...}`) keeps nodes, thresholds and callables written for context dictionaries
+    working, and lets the feature table memoize the date's feature values in the context.
+    """
+
+    def __init__(
+        self,
+        midnight_dt,
+        size_date,
+        initial_cash: float,
+        etf_histories: Dict[str, pd.Series],
+        feature_store=None,
+        calendar: Optional[TradingCalendar] = None,
+        price_matrix: Optional[PriceMatrix] = None,
+        etfs: Optional[Dict[str, Any]] = None,
+        strategy=None,
+        dt=None,
+        positions=None,
+        additional_parameters: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initializes an EvaluationContext.
+
+        :param midnight_dt: Evaluation date at midnight.
+        :param size_date: Date the orders are sized on.
+        :param initial_cash: Initial cash of the strategy.
+        :param etf_histories: Dictionary mapping ETFs to their price histories.
+        :param feature_store: Optional FeatureStore of the run.
+        :param calendar: Optional TradingCalendar of the run.
+        :param price_matrix: Optional PriceMatrix of the run, read by the actions to size their orders.
+        :param etfs: Dictionary mapping ETF names to the instruments orders are placed on.
+        :param strategy: Strategy being built.
+        :param dt: Decision datetime.
+        :param positions: Positions held before the decision.
+        :param additional_parameters: Keyword arguments of the basket creation method.
+        """
+        self.midnight_dt = midnight_dt
+        self.size_date = size_date
+        self.initial_cash = initial_cash
+        self.etf_histories = etf_histories
+        self.feature_store = feature_store
+        self.calendar = calendar
+        self.price_matrix = price_matrix
+        self.etfs = etfs if etfs is not None else {}
+        self.strategy = strategy
+        self.dt = dt
+        self.positions = positions
+        self.additional_parameters = additional_parameters if additional_parameters is not None else {}
+        # Row of the date in the calendar, None outside of it
+        self.position = calendar.position(midnight_dt) if calendar is not None else None
+        # Row of the price matrix the orders are sized on, resolved once for every ETF of the date
+        self.size_position = price_matrix.calendar.asof_position(size_date) if price_matrix is not None else None
+        self.feature_values = None
+
+    def __getitem__(self, key: str):
+        try:
+            return self.__dict__[key]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        self.__dict__[key] = value
+
+    def __delitem__(self, key: str):
+        del self.__dict__[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__dict__)
+
+    def __len__(self) -> int:
+        return len(self.__dict__)
+
+    def __repr__(self):
+        return f"EvaluationContext({self.midnight_dt})"
+
+
+def size_price(context, etf: str) -> float:
+    """
+    Price an action sizes its order of an ETF on: the ETF's last price as of the context's size date.
+
+    Read from the context's PriceMatrix when there is one, otherwise from the ETF's history.
+
+    :param context: EvaluationContext or context dictionary.
+    :param etf: ETF of the order.
+    :return: Price.
+    """
+    price_matrix = context.get('price_matrix')
+    if price_matrix is not None:
+        size_position = context.get('size_position')
+        if size_position is None:
+            size_position = price_matrix.calendar.asof_position(context['size_date'])
+        price = price_matrix.at(etf, size_position)
+        if price is not None:
+            return price
+    return context['etf_histories'][etf].asof(context['size_date'])
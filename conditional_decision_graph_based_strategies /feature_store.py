@@ -0,0 +1,260 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from helper import get_rsi, get_vol, get_cum_return_series, get_indicator_value
+
+
+FeatureKey = Tuple[str, str, int]
+
+
+def feature_key(indicator_name: str, etf: str, window: int) -> FeatureKey:
+    """
+    Normalises an indicator reference into the key used by the feature store.
+
+    :param indicator_name: Name of the indicator (e.g., 'RSI', 'Cumulative Return').
+    :param etf: ETF the indicator is computed on.
+    :param window: Window size for the indicator.
+    :return: Tuple (lower-cased indicator name, ETF, window).
+    """
+    return indicator_name.lower(), etf, int(window)
+
+
+def collect_feature_keys(condition_specs: List[Dict[str, Any]]) -> List[FeatureKey]:
+    """
+    Collects every distinct (indicator, ETF, window) referenced by the condition specifications,
+    including both ETFs of dynamic thresholds.
+
+    :param condition_specs: List of condition specifications (dictionaries).
+    :return: List of feature keys, in order of first appearance.
+    """
+    keys = []
+    for spec in condition_specs:
+        keys.append(feature_key(spec['indicator'], spec['etf'], spec['window']))
+        threshold = spec.get('threshold')
+        if isinstance(threshold, dict):
+            window = threshold.get('window', 60)
+            keys.append(feature_key(threshold['indicator'], threshold['etf1'], window))
+            keys.append(feature_key(threshold['indicator'], threshold['etf2'], window))
+    return list(dict.fromkeys(keys))
+
+
+class FeatureTable:
+    """
+    Deduplicated table of the indicators a decision tree references.
+
+    Decision nodes and dynamic-threshold comparisons hold a feature id instead of computing
+    their indicator themselves, so a feature shared by several of them is computed at most
+    once per date.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.indicators = []
+        self.ids = {}
+        self.references = 0
+
+    def register(self, indicator_name: str, etf: str, window: int) -> int:
+        """
+        Registers a reference to an indicator.
+
+        :param indicator_name: Name of the indicator.
+        :param etf: ETF the indicator is computed on.
+        :param window: Window size for the indicator.
+        :return: Feature id shared by every reference to the same (indicator, ETF, window).
+        """
+        self.references += 1
+        key = feature_key(indicator_name, etf, window)
+        if key not in self.ids:
+            self.ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.indicators.append(({'name': indicator_name, 'etf': etf}, window))
+        return self.ids[key]
+
+    @property
+    def evaluations_saved(self) -> int:
+        """
+        Number of indicator evaluations per date avoided by sharing features.
+        """
+        return self.references - len(self.keys)
+
+    def value(self, context, feature_id: int) -> float:
+        """
+        Retrieves a feature value for the context's date, computing it once per date.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param feature_id: Feature id returned by `register`.
+        :return: Indicator value.
+        """
+        # The memo is tagged with its date, so copies of a context made for other dates start afresh
+        memo = context.get('feature_values')
+        if memo is None or memo[0] is not self or memo[1] != context['midnight_dt']:
+            memo = (self, context['midnight_dt'], {})
+            context['feature_values'] = memo
+
+        values = memo[2]
+        if feature_id not in values:
+            indicator, window = self.indicators[feature_id]
+            values[feature_id] = get_indicator_value(context, indicator, window)
+        return values[feature_id]
+
+
+def compute_feature(history: pd.Series, key: FeatureKey, calendar: pd.DatetimeIndex) -> Optional[np.ndarray]:
+    """
+    Computes one indicator over the full ETF history and aligns it to the calendar.
+
+    Alignment reproduces the per-date lookups of `get_indicator_value`: RSI and volatility
+    are read on the exact date (0 when the date is missing from the history) while the
+    cumulative return is read as of the date (0 before the history starts).
+
+    :param history: Price history of the ETF.
+    :param key: Feature key as returned by `feature_key`.
+    :param calendar: Dates the feature is aligned to.
+    :return: Float array aligned to the calendar, or None if the indicator is unsupported.
+    """
+    name, _, window = key
+    if name == 'rsi':
+        series = get_rsi(history, window)
+        positions = history.index.get_indexer(calendar)
+    elif name == 'volatility':
+        series = get_vol(history, window)
+        positions = history.index.get_indexer(calendar)
+    elif name == 'cumulative return':
+        series = get_cum_return_series(history, window)
+        positions = history.index.searchsorted(calendar, side='right') - 1
+    else:
+        return None
+
+    values = series.to_numpy(dtype=float)
+    if len(values) == 0:
+        return np.zeros(len(calendar))
+    return np.where(positions >= 0, values[positions.clip(min=0)], 0.0)
+
+
+class FeatureStore:
+    def __init__(
+        self,
+        etf_histories: Dict[str, pd.Series],
+        feature_keys: Iterable[FeatureKey] = (),
+        calendar: Optional[Iterable] = None
+    ):
+        """
+        Initializes a FeatureStore holding precomputed indicator series for a run.
+
+        :param etf_histories: Dictionary mapping ETFs to their price histories.
+        :param feature_keys: Features to compute upfront. Other features are computed on first use.
+        :param calendar: Dates the features are aligned to. Defaults to the union of all history dates.
+        """
+        if calendar is None:
+            calendar = pd.DatetimeIndex([])
+            for history in etf_histories.values():
+                calendar = calendar.union(history.index)
+        self.etf_histories = etf_histories
+        self.calendar = pd.DatetimeIndex(calendar)
+        self.positions = {date: position for position, date in enumerate(self.calendar)}
+        self.columns = {}
+        for key in feature_keys:
+            self.add_feature(key)
+
+    @classmethod
+    def from_specs(
+        cls,
+        etf_histories: Dict[str, pd.Series],
+        condition_specs: List[Dict[str, Any]],
+        calendar: Optional[Iterable] = None
+    ) -> 'FeatureStore':
+        """
+        Builds a FeatureStore with every feature referenced by the condition specifications.
+
+        :param etf_histories: Dictionary mapping ETFs to their price histories.
+        :param condition_specs: List of condition specifications (dictionaries).
+        :param calendar: Dates the features are aligned to.
+        :return: FeatureStore object.
+        """
+        return cls(etf_histories, collect_feature_keys(condition_specs), calendar)
+
+    @classmethod
+    def from_columns(
+        cls,
+        calendar: Iterable,
+        columns: Dict[FeatureKey, np.ndarray],
+        etf_histories: Optional[Dict[str, pd.Series]] = None
+    ) -> 'FeatureStore':
+        """
+        Wraps features that were already computed, e.g. arrays shared between processes.
+
+        :param calendar: Dates the features are aligned to.
+        :param columns: Dictionary mapping feature keys to arrays aligned to the calendar.
+        :param etf_histories: Optional histories used to compute features missing from `columns`.
+        :return: FeatureStore object.
+        """
+        feature_store = cls(etf_histories or {}, calendar=calendar)
+        feature_store.columns.update(columns)
+        return feature_store
+
+    def add_feature(self, key: FeatureKey) -> Optional[np.ndarray]:
+        """
+        Computes a feature and stores it.
+
+        :param key: Feature key as returned by `feature_key`.
+        :return: Feature values aligned to the calendar, or None if it cannot be computed.
+        """
+        if key in self.columns:
+            return self.columns[key]
+
+        name, etf, window = key
+        if etf not in self.etf_histories:
+            logging.error(f"Indicator data for {etf} not found. Feature {key} defaults to 0.")
+            column = np.zeros(len(self.calendar))
+        else:
+            column = compute_feature(self.etf_histories[etf], key, self.calendar)
+            if column is None:
+                logging.error(f"Unsupported indicator: {name}")
+                return None
+
+        self.columns[key] = column
+        return column
+
+    def value(self, indicator_name: str, etf: str, window: int, date) -> Optional[float]:
+        """
+        Reads a feature value for a single date.
+
+        :param indicator_name: Name of the indicator.
+        :param etf: ETF the indicator is computed on.
+        :param window: Window size for the indicator.
+        :param date: Date to read.
+        :return: Feature value, or None if the date or the feature is not available.
+        """
+        position = self.positions.get(date)
+        if position is None:
+            return None
+        key = feature_key(indicator_name, etf, window)
+        column = self.columns.get(key)
+        if column is None:
+            column = self.add_feature(key)
+            if column is None:
+                return None
+        return column[position]
+
+    def values(self, indicator_name: str, etf: str, window: int, dates) -> Optional[np.ndarray]:
+        """
+        Reads a feature for many dates at once.
+
+        :param indicator_name: Name of the indicator.
+        :param etf: ETF the indicator is computed on.
+        :param window: Window size for the indicator.
+        :param dates: Dates to read.
+        :return: Array of feature values, or None if a date or the feature is not available.
+        """
+        positions = self.calendar.get_indexer(pd.DatetimeIndex(dates))
+        if (positions < 0).any():
+            return None
+        key = feature_key(indicator_name, etf, window)
+        column = self.columns.get(key)
+        if column is None:
+            column = self.add_feature(key)
+            if column is None:
+                return None
+        return column[positions]
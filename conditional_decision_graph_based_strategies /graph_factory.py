@@ -1,7 +1,13 @@
 
 from typing import Callable, Union
 from abc import ABC, abstractmethod
-from helper import get_indicator_value
+from time import perf_counter_ns
+import numpy as np
+import pandas as pd
+from evaluation_context import size_price
+from helper import compare_values, get_indicator_value, get_indicator_values
+import instrumentation
+import tracing
 from graphviz import Digraph
 
 
@@ -19,7 +25,9 @@ class DecisionNode(Node):
         operator: str, 
         threshold: Union[float, Callable[[dict], float]], 
         true_branch: Node, 
-        false_branch: Node
+        false_branch: Node,
+        name: str = None,
+        feature_table=None
     ):
         """
         Initializes a DecisionNode.
@@ -30,6 +38,8 @@ class DecisionNode(Node):
         :param threshold: Static float value or a callable that returns a float based on context.
         :param true_branch: Node to evaluate if condition is True.
         :param false_branch: Node to evaluate if condition is False.
+        :param name: Optional node name, as given in the condition specifications.
+        :param feature_table: Optional FeatureTable the node reads its indicator from, shared with other nodes.
         """
         self.indicator = indicator  # e.g., {'name': 'RSI', 'etf': 'QQQ UP EQUITY'}
         self.window = window
@@ -37,6 +47,11 @@ class DecisionNode(Node):
         self.threshold = threshold  # Can be a float or a callable
         self.true_branch = true_branch
         self.false_branch = false_branch
+        self.name = name
+        self.feature_table = feature_table
+        self.feature_id = None
+        if feature_table is not None:
+            self.feature_id = feature_table.register(indicator['name'], indicator['etf'], window)
 
     def evaluate(self, context):
         """
@@ -45,28 +60,79 @@ class DecisionNode(Node):
         :param context: Dictionary containing necessary data and parameters.
         :return: Result from the true or false branch.
         """
+        profiling = instrumentation.PROFILER.enabled
+        if profiling:
+            start = perf_counter_ns()
+
         if callable(self.threshold):
             threshold_value = self.threshold(context)
-            print(f"[DecisionNode] Evaluating condition: {self.get_label()} with dynamic threshold {threshold_value}")
         else:
             threshold_value = self.threshold
-            print(f"[DecisionNode] Evaluating condition: {self.get_label()} with threshold {threshold_value}")
 
         # Retrieve the indicator value from context
-        indicator_value = get_indicator_value(context, self.indicator, self.window)
-        print(f"[DecisionNode] Indicator Value for {self.indicator['etf']}: {indicator_value}")
+        indicator_value = self.indicator_value(context)
 
         # Perform the comparison
         condition_met = self.compare(indicator_value, self.operator, threshold_value)
-        print(f"[DecisionNode] Condition Met: {condition_met}")
+        if profiling:
+            instrumentation.PROFILER.record(
+                instrumentation.NODE, self.name or self.get_label(), perf_counter_ns() - start,
+                true_count=int(bool(condition_met)), false_count=int(not condition_met)
+            )
+        if tracing.TRACER.enabled:
+            tracing.TRACER.decision(self, context, indicator_value, threshold_value, condition_met)
 
         if condition_met:
-            print(f"[DecisionNode] Condition true. Traversing to True branch.")
             return self.true_branch.evaluate(context)
+        return self.false_branch.evaluate(context)
+
+    def indicator_value(self, context):
+        """
+        Retrieves the node's indicator value, through the shared feature table when there is one.
 
+        :param context: Dictionary containing necessary data and parameters.
+        :return: Indicator value.
+        """
+        if self.feature_table is not None:
+            return self.feature_table.value(context, self.feature_id)
+        return get_indicator_value(context, self.indicator, self.window)
+
+    def condition_mask(self, context, dates) -> np.ndarray:
+        """
+        Evaluates the condition for many dates at once, without recording the node in the profiler.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate.
+        :return: Boolean array, True where the condition is met.
+        """
+        if callable(self.threshold):
+            threshold_values = evaluate_threshold_series(self.threshold, context, dates)
         else:
-            print(f"[DecisionNode] Condition false. Traversing to False branch.")
-            return self.false_branch.evaluate(context)
+            threshold_values = self.threshold
+
+        indicator_values = get_indicator_values(context, self.indicator, self.window, dates)
+        return np.asarray(self.compare(indicator_values, self.operator, threshold_values), dtype=bool)
+
+    def evaluate_mask(self, context, dates):
+        """
+        Evaluates the condition for many dates at once.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate.
+        :return: Boolean array, True where the condition is met.
+        """
+        profiling = instrumentation.PROFILER.enabled
+        if profiling:
+            start = perf_counter_ns()
+
+        mask = self.condition_mask(context, dates)
+        if profiling:
+            true_count = int(mask.sum())
+            instrumentation.PROFILER.record(
+                instrumentation.NODE, self.name or self.get_label(), perf_counter_ns() - start,
+                evaluations=len(mask), true_count=true_count, false_count=len(mask) - true_count
+            )
+        return mask
 
     def compare(self, value1, operator, value2):
         """
@@ -77,18 +143,7 @@ class DecisionNode(Node):
         :param value2: Second value (threshold).
         :return: Boolean result of the comparison.
         """
-        if operator == '>':
-            return value1 > value2
-        elif operator == '<':
-            return value1 < value2
-        elif operator == '>=':
-            return value1 >= value2
-        elif operator == '<=':
-            return value1 <= value2
-        elif operator == '==':
-            return value1 == value2
-        else:
-            raise ValueError(f"Unsupported operator: {operator}")
+        return compare_values(value1, operator, value2)
 
     def get_label(self):
         """
@@ -105,14 +160,16 @@ class DecisionNode(Node):
 
 
 class ActionNode(Node):
-    def __init__(self, allocations: dict):
+    def __init__(self, allocations: dict, name: str = None):
         """
         Initializes an ActionNode.
 
         :param allocations: Dictionary mapping ETFs to their allocation weights (in decimal).
                             e.g., {'SPY UP EQUITY': 0.5, 'TLT US EQUITY': 0.5}
+        :param name: Optional node name, as given in the action specifications.
         """
         self.allocations = allocations  # e.g., {'SPY UP EQUITY': 0.5, 'TLT US EQUITY': 0.5}
+        self.name = name
 
     def evaluate(self, context):
         """
@@ -121,8 +178,15 @@ class ActionNode(Node):
         :param context: Dictionary containing necessary data and parameters.
         :return: Dictionary representing the order allocations.
         """
-        print(f"[ActionNode] Executing action: {self.get_label()}")
-        return self.action(context)
+        profiling = instrumentation.PROFILER.enabled
+        if profiling:
+            start = perf_counter_ns()
+        allocations = self.action(context)
+        if profiling:
+            instrumentation.PROFILER.record(instrumentation.ACTION, self.name or self.get_label(), perf_counter_ns() - start)
+        if tracing.TRACER.enabled:
+            tracing.TRACER.action(self, context, allocations)
+        return allocations
 
     def action(self, context):
         """
@@ -132,10 +196,9 @@ class ActionNode(Node):
         :return: Dictionary with ETF orders.
         """
         allocations = {
-            etf: self.allocations[etf] * context['initial_cash'] / context['etf_histories'][etf].asof(context['size_date']) 
+            etf: self.allocations[etf] * context['initial_cash'] / size_price(context, etf)
             for etf in self.allocations
         }
-        print(f"[ActionNode] Allocations: {allocations}")
         return allocations
 
     def get_label(self):
@@ -147,13 +210,153 @@ class ActionNode(Node):
         allocations_str = ', '.join([f"{etf}: {weight*100:.1f}%" for etf, weight in self.allocations.items()])
         return f"Allocate {allocations_str}"
 
+
+def evaluate_threshold_series(threshold: Callable, context, dates) -> np.ndarray:
+    """
+    Evaluates a dynamic threshold for many dates at once.
+
+    Thresholds created by `create_comparison_function` expose a vectorized `evaluate_series`;
+    any other callable is evaluated date by date.
+
+    :param threshold: Callable threshold taking a context.
+    :param context: Dictionary containing ETF histories, the feature store and other parameters.
+    :param dates: Dates to evaluate.
+    :return: Array of threshold values aligned with `dates`.
+    """
+    evaluate_series = getattr(threshold, 'evaluate_series', None)
+    if evaluate_series is not None:
+        return np.asarray(evaluate_series(context, dates))
+    return np.array([threshold({**context, 'midnight_dt': date}) for date in dates])
+
+
 class DecisionTree:
-    def __init__(self, root):
+    def __init__(self, root, feature_table=None):
         self.root = root
+        self.feature_table = feature_table
 
     def evaluate(self, context):
         return self.root.evaluate(context)
 
+    def evaluate_leaves(self, context, dates) -> pd.Series:
+        """
+        Routes many dates through the tree at once.
+
+        Each DecisionNode evaluates its condition as a boolean array over the dates reaching it,
+        which are then split between its branches.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate.
+        :return: Series mapping each date to the ActionNode it reaches.
+        """
+        dates = pd.DatetimeIndex(dates)
+        leaves = np.empty(len(dates), dtype=object)
+
+        # Iterative traversal with (node, positions of the dates reaching it)
+        stack = [(self.root, np.arange(len(dates)))]
+        while stack:
+            node, positions = stack.pop()
+            if len(positions) == 0:
+                continue
+            if isinstance(node, DecisionNode):
+                mask = node.evaluate_mask(context, dates[positions])
+                stack.append((node.true_branch, positions[mask]))
+                stack.append((node.false_branch, positions[~mask]))
+            else:
+                leaves[positions] = node
+
+        return pd.Series(leaves, index=dates, dtype=object)
+
+    def decision_nodes(self) -> list:
+        """
+        Lists the DecisionNodes reachable from the root, each once.
+        """
+        nodes = {}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, DecisionNode) and id(node) not in nodes:
+                nodes[id(node)] = node
+                stack.extend([node.false_branch, node.true_branch])
+        return list(nodes.values())
+
+    def flip_calendar(self, context, dates) -> pd.Series:
+        """
+        Finds the dates where the leaf reached can change, with the leaf reached from each of them.
+
+        The condition of every DecisionNode is evaluated once over all the dates, and only the dates
+        where one of them flips are routed through the tree: between two such dates no condition
+        changes outcome, so the same leaf is reached. Flips of conditions that are not on the path
+        taken are dropped, leaving one entry per change of leaf. Routing costs scale with the number
+        of flips rather than the number of dates.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate, in increasing order.
+        :return: Sparse Series mapping the first date and each date where the leaf changes to the leaf reached.
+        """
+        dates = pd.DatetimeIndex(dates)
+        if dates.empty:
+            return pd.Series([], index=dates, dtype=object)
+
+        masks, durations = {}, {}
+        for node in self.decision_nodes():
+            start = perf_counter_ns()
+            masks[id(node)] = node.condition_mask(context, dates)
+            durations[id(node)] = perf_counter_ns() - start
+        if instrumentation.PROFILER.enabled:
+            self._record_routing(masks, durations, len(dates))
+
+        flips = np.zeros(len(dates), dtype=bool)
+        flips[0] = True
+        for mask in masks.values():
+            flips[1:] |= mask[1:] != mask[:-1]
+
+        positions, leaves = [], []
+        for position in np.flatnonzero(flips):
+            node = self.root
+            while isinstance(node, DecisionNode):
+                node = node.true_branch if masks[id(node)][position] else node.false_branch
+            if not leaves or node is not leaves[-1]:
+                positions.append(position)
+                leaves.append(node)
+        return pd.Series(leaves, index=dates[positions], dtype=object)
+
+    def _record_routing(self, masks, durations, date_count):
+        # Records each node for the dates reaching it, like evaluate_leaves, so branch frequencies are unchanged
+        stack = [(self.root, np.ones(date_count, dtype=bool))]
+        while stack:
+            node, reached = stack.pop()
+            if not isinstance(node, DecisionNode) or not reached.any():
+                continue
+            met = reached & masks[id(node)]
+            evaluations, true_count = int(reached.sum()), int(met.sum())
+            instrumentation.PROFILER.record(
+                instrumentation.NODE, node.name or node.get_label(),
+                durations[id(node)] * evaluations // date_count,
+                evaluations=evaluations, true_count=true_count, false_count=evaluations - true_count
+            )
+            stack.append((node.true_branch, met))
+            stack.append((node.false_branch, reached & ~met))
+
+    def evaluate_series(self, context, dates, leaves=None) -> pd.DataFrame:
+        """
+        Evaluates the tree for many dates at once.
+
+        :param context: Dictionary containing ETF histories, the feature store and other parameters.
+        :param dates: Dates to evaluate.
+        :param leaves: Leaves of the dates already returned by `evaluate_leaves`.
+        :return: DataFrame of allocation weights, one row per date and one column per ETF.
+        """
+        if leaves is None:
+            leaves = self.evaluate_leaves(context, dates)
+        unique_leaves = list({id(leaf): leaf for leaf in leaves}.values())
+        etfs = list(dict.fromkeys(etf for leaf in unique_leaves for etf in leaf.allocations))
+
+        leaf_weights = np.array([[leaf.allocations.get(etf, 0.0) for etf in etfs] for leaf in unique_leaves])
+        leaf_ids = {id(leaf): i for i, leaf in enumerate(unique_leaves)}
+        rows = np.array([leaf_ids[id(leaf)] for leaf in leaves], dtype=int)
+        weights = leaf_weights[rows] if len(rows) else np.zeros((0, len(etfs)))
+        return pd.DataFrame(weights, index=leaves.index, columns=etfs)
+
     def plot_tree(self, root_node):
         """
         Plots the decision tree using graphviz.
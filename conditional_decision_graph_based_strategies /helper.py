@@ -1,4 +1,20 @@
+from time import perf_counter_ns
 import logging
+import operator as operators
+
+import numpy as np
+
+import instrumentation
+
+# Comparison operators of the condition specifications, shared by every evaluation path
+OPERATORS = {
+    '>': operators.gt,
+    '<': operators.lt,
+    '>=': operators.ge,
+    '<=': operators.le,
+    '==': operators.eq,
+}
+
 
 def get_rsi(data, window):
     delta = data.diff()
@@ -17,9 +33,45 @@ def get_vol(data, window):
 
 
 def get_cum_return(data, window):
-    returns = data.pct_change()
-    cumulative_returns = (returns + 1).rolling(window).apply(lambda x: x.prod(), raw=True) - 1
-    return cumulative_returns.iloc[-1] if len(cumulative_returns) >= window else 0
+    """
+    Computes the cumulative return over the last `window` periods of the history.
+
+    Uses the ratio of the last price to the price `window` periods earlier, which equals the
+    product of the window's (1 + return) terms. Like that product, it is NaN when a price of
+    the window is missing.
+
+    :param data: Price history of a single ETF, up to the evaluation date.
+    :param window: Window size for the cumulative return.
+    :return: Cumulative return, 0 if the history is shorter than the window.
+    """
+    if len(data) < window:
+        return 0
+    if len(data) == window:
+        # The window includes the first date of the history, which has no return
+        return np.nan
+    prices = data.to_numpy(dtype=float)[-1 - window:]
+    if np.isnan(prices).any():
+        return np.nan
+    return prices[-1] / prices[0] - 1
+
+
+def get_cum_return_series(data, window):
+    """
+    Computes the trailing cumulative return for every date of the history in one pass.
+
+    Each value equals get_cum_return evaluated on the history up to that date, so dates
+    with fewer than `window` observations are set to 0.
+
+    :param data: Price history of a single ETF.
+    :param window: Window size for the cumulative return.
+    :return: Series of cumulative returns indexed like `data`.
+    """
+    cumulative_returns = data / data.shift(window) - 1
+    # A missing price makes the returns of the next `window` dates NaN, as in the product of (1 + return) terms
+    missing = data.isna().astype(float).rolling(window + 1, min_periods=1).sum() > 0
+    cumulative_returns[missing] = np.nan
+    cumulative_returns.iloc[:window - 1] = 0
+    return cumulative_returns
 
 
 def allocate_values(default_keys, allocations=None):
@@ -44,7 +96,21 @@ def allocate_values(default_keys, allocations=None):
 
 
 
-def create_comparison_function(indicator_name, etf1, etf2, window=60, operator='>'):
+def compare_values(value1, operator, value2):
+    """
+    Compares two values, or two arrays element-wise, based on the operator.
+
+    :param value1: First value.
+    :param operator: The comparison operator as a string ('>', '<', '>=', '<=', '==').
+    :param value2: Second value.
+    :return: Result of the comparison.
+    """
+    if operator not in OPERATORS:
+        raise ValueError(f"Unsupported operator: {operator}")
+    return OPERATORS[operator](value1, value2)
+
+
+def create_comparison_function(indicator_name, etf1, etf2, window=60, operator='>', feature_table=None):
     """
     Creates a comparison function based on the provided parameters.
 
@@ -53,33 +119,67 @@ def create_comparison_function(indicator_name, etf1, etf2, window=60, operator='
     :param etf2: The secondary ETF to use as a threshold.
     :param window: The window size for indicator calculation.
     :param operator: The comparison operator as a string ('>', '<', '>=', '<=', '==').
+    :param feature_table: Optional FeatureTable shared with the decision nodes, so indicators
+                          they have in common are computed once per date.
     :return: A function that takes context and returns the result of the comparison.
     """
+    if feature_table is not None:
+        feature_id1 = feature_table.register(indicator_name, etf1, window)
+        feature_id2 = feature_table.register(indicator_name, etf2, window)
+
     def comparison(context):
+        profiling = instrumentation.PROFILER.enabled
+        if profiling:
+            start = perf_counter_ns()
+
         # Retrieve indicator values for both ETFs
-        value1 = get_indicator_value(context, {'name': indicator_name, 'etf': etf1}, window)
-        value2 = get_indicator_value(context, {'name': indicator_name, 'etf': etf2}, window)
-        
+        if feature_table is not None:
+            value1 = feature_table.value(context, feature_id1)
+            value2 = feature_table.value(context, feature_id2)
+        else:
+            value1 = get_indicator_value(context, {'name': indicator_name, 'etf': etf1}, window)
+            value2 = get_indicator_value(context, {'name': indicator_name, 'etf': etf2}, window)
+
         # Perform the comparison based on the operator
         try:
-            if operator == '>':
-                return value1 > value2
-            elif operator == '<':
-                return value1 < value2
-            elif operator == '>=':
-                return value1 >= value2
-            elif operator == '<=':
-                return value1 <= value2
-            elif operator == '==':
-                return value1 == value2
-            else:
-                raise ValueError(f"Unsupported operator: {operator}")
+            result = compare_values(value1, operator, value2)
         except Exception as e:
             logging.error(f"Error during comparison: {e}")
-            return False
-    
+            result = False
+
+        if profiling:
+            instrumentation.PROFILER.record(
+                instrumentation.THRESHOLD, comparison.__name__, perf_counter_ns() - start,
+                true_count=int(bool(result)), false_count=int(not result)
+            )
+        return result
+
+    def comparison_series(context, dates):
+        profiling = instrumentation.PROFILER.enabled
+        if profiling:
+            start = perf_counter_ns()
+
+        # Same comparison evaluated for many dates at once
+        values1 = get_indicator_values(context, {'name': indicator_name, 'etf': etf1}, window, dates)
+        values2 = get_indicator_values(context, {'name': indicator_name, 'etf': etf2}, window, dates)
+        try:
+            result = np.asarray(compare_values(values1, operator, values2), dtype=bool)
+        except Exception as e:
+            logging.error(f"Error during comparison: {e}")
+            result = np.zeros(len(dates), dtype=bool)
+
+        if profiling:
+            true_count = int(result.sum())
+            instrumentation.PROFILER.record(
+                instrumentation.THRESHOLD, comparison.__name__, perf_counter_ns() - start,
+                evaluations=len(result), true_count=true_count, false_count=len(result) - true_count
+            )
+        return result
+
     # Assign a name for better logging/debugging
     comparison.__name__ = f"compare_{etf1}_to_{etf2}_{indicator_name}"
+    comparison.evaluate_series = comparison_series
+    comparison.spec = {'indicator': indicator_name, 'etf1': etf1, 'etf2': etf2, 'window': window, 'operator': operator}
     return comparison
     
 
@@ -92,9 +192,31 @@ def get_indicator_value(context, indicator: dict, window: int) -> float:
     :param window: Window size for the indicator (if applicable).
     :return: Indicator value.
     """
+    if instrumentation.PROFILER.enabled:
+        start = perf_counter_ns()
+        value = _get_indicator_value(context, indicator, window)
+        instrumentation.PROFILER.record(
+            instrumentation.INDICATOR, indicator_label(indicator, window), perf_counter_ns() - start
+        )
+        return value
+    return _get_indicator_value(context, indicator, window)
+
+
+def indicator_label(indicator: dict, window: int) -> str:
+    return f"{indicator['name']}({indicator['etf']}, {window})"
+
+
+def _get_indicator_value(context, indicator: dict, window: int) -> float:
     etf = indicator['etf']
     name = indicator['name']
 
+    # Precomputed features are read positionally when a feature store is available
+    feature_store = context.get('feature_store')
+    if feature_store is not None:
+        value = feature_store.value(name, etf, window, context['midnight_dt'])
+        if value is not None:
+            return value
+
     try:
         if name.lower() == 'rsi':
             return get_rsi(context['etf_histories'][etf], window).loc[context['midnight_dt']]
@@ -108,3 +230,39 @@ def get_indicator_value(context, indicator: dict, window: int) -> float:
         logging.error(f"Indicator data for {etf} at {context['midnight_dt']} not found.")
         return 0  # Or handle as per your strategy requirements
 
+
+def get_indicator_values(context, indicator: dict, window: int, dates) -> np.ndarray:
+    """
+    Retrieves the indicator values for many dates at once.
+
+    Reads the feature store when it covers every date, otherwise falls back to
+    `get_indicator_value` for each date.
+
+    :param context: Dictionary containing ETF histories and other parameters.
+    :param indicator: Dictionary with 'name' and 'etf' keys.
+    :param window: Window size for the indicator (if applicable).
+    :param dates: Dates to evaluate.
+    :return: Array of indicator values aligned with `dates`.
+    """
+    if instrumentation.PROFILER.enabled:
+        start = perf_counter_ns()
+        values = _get_indicator_values(context, indicator, window, dates)
+        instrumentation.PROFILER.record(
+            instrumentation.INDICATOR, indicator_label(indicator, window), perf_counter_ns() - start,
+            evaluations=len(values)
+        )
+        return values
+    return _get_indicator_values(context, indicator, window, dates)
+
+
+def _get_indicator_values(context, indicator: dict, window: int, dates) -> np.ndarray:
+    feature_store = context.get('feature_store')
+    if feature_store is not None:
+        values = feature_store.values(indicator['name'], indicator['etf'], window, dates)
+        if values is not None:
+            return values
+
+    return np.array(
+        [_get_indicator_value({**context, 'midnight_dt': date}, indicator, window) for date in dates],
+        dtype=float
+    )
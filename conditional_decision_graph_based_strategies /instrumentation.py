@@ -0,0 +1,152 @@
+from contextlib import contextmanager
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+
+# Kinds of instrumented calls
+NODE = 'node'
+ACTION = 'action'
+THRESHOLD = 'threshold'
+INDICATOR = 'indicator'
+
+
+class CallStats:
+    def __init__(self):
+        """
+        Initializes CallStats: call counts, latencies and branch outcomes of one node, threshold or indicator.
+
+        Latencies are kept per call. A batch call evaluating many dates contributes one sample
+        of its mean latency per date, stored once with a weight.
+        """
+        self.calls = 0
+        self.total_ns = 0
+        self.true_count = 0
+        self.false_count = 0
+        self.samples = []
+        self.weights = []
+
+    def record(self, duration_ns: int, evaluations: int = 1, true_count: int = 0, false_count: int = 0):
+        self.calls += evaluations
+        self.total_ns += duration_ns
+        self.true_count += true_count
+        self.false_count += false_count
+        if evaluations:
+            self.samples.append(duration_ns / evaluations)
+            self.weights.append(evaluations)
+
+    def percentile(self, q: float) -> float:
+        """
+        Weighted percentile of the per-evaluation latency.
+
+        :param q: Percentile, between 0 and 100.
+        :return: Latency in nanoseconds, NaN without calls.
+        """
+        if not self.samples:
+            return np.nan
+        order = np.argsort(self.samples)
+        samples = np.asarray(self.samples)[order]
+        cumulative = np.cumsum(np.asarray(self.weights)[order])
+        return float(samples[np.searchsorted(cumulative, q / 100 * cumulative[-1], side='left')])
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'calls': self.calls,
+            'total_ns': self.total_ns,
+            'p50_ns': self.percentile(50),
+            'p99_ns': self.percentile(99),
+            'true': self.true_count,
+            'false': self.false_count,
+        }
+
+
+class Profiler:
+    """
+    Opt-in instrumentation of decision tree evaluation.
+
+    DecisionNode and ActionNode evaluations, dynamic-threshold closures and indicator lookups
+    record into the global PROFILER when it is enabled, and only test `enabled` otherwise.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+
+    def reset(self):
+        self.stats = {}
+
+    def record(self, kind: str, name: str, duration_ns: int, evaluations: int = 1, true_count: int = 0,
+               false_count: int = 0):
+        """
+        Records one call.
+
+        :param kind: NODE, ACTION, THRESHOLD or INDICATOR.
+        :param name: Name of the node, threshold or indicator.
+        :param duration_ns: Duration of the call in nanoseconds.
+        :param evaluations: Number of dates evaluated by the call.
+        :param true_count: Number of dates for which the condition was met.
+        :param false_count: Number of dates for which the condition was not met.
+        """
+        key = (kind, name)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = CallStats()
+        stats.record(duration_ns, evaluations, true_count, false_count)
+
+    def summary(self, kinds=(NODE, ACTION)) -> Dict[str, Dict[str, float]]:
+        """
+        Returns the statistics of the nodes by name, as used by the `generate_dot` overlay.
+
+        :param kinds: Kinds of calls to include.
+        :return: Dictionary mapping names to the dictionaries of `CallStats.to_dict`.
+        """
+        return {name: stats.to_dict() for (kind, name), stats in self.stats.items() if kind in kinds}
+
+    def report(self) -> pd.DataFrame:
+        """
+        Tabulates every instrumented call.
+
+        :return: DataFrame indexed by (kind, name) with call counts, total time in milliseconds,
+                 p50/p99 latencies in microseconds and branch frequencies, sorted by total time.
+        """
+        rows = {}
+        for key, stats in self.stats.items():
+            row = stats.to_dict()
+            branches = row['true'] + row['false']
+            rows[key] = {
+                'calls': row['calls'],
+                'total_ms': row['total_ns'] / 1e6,
+                'p50_us': row['p50_ns'] / 1e3,
+                'p99_us': row['p99_ns'] / 1e3,
+                'true': row['true'],
+                'false': row['false'],
+                'true_rate': row['true'] / branches if branches else np.nan,
+            }
+        report = pd.DataFrame.from_dict(rows, orient='index')
+        if report.empty:
+            return report
+        report.index = pd.MultiIndex.from_tuples(report.index, names=['kind', 'name'])
+        return report.sort_values('total_ms', ascending=False)
+
+
+PROFILER = Profiler()
+
+
+@contextmanager
+def profile():
+    """
+    Enables the profiler for the duration of a block, starting from empty statistics.
+
+    ---
+    Example
+    with profile() as profiler:
+        run_strategy(..., engine='local')
+    print(profiler.report())
+    """
+    PROFILER.reset()
+    PROFILER.enabled = True
+    try:
+        yield PROFILER
+    finally:
+        PROFILER.enabled = False
@@ -0,0 +1,397 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import datetime as dtm
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from backtest_engine import BacktestResult, compute_metrics, compute_nav_metrics
+from instrumentation import profile
+from spec_dependencies import analyze_specs
+from strategy_builder import load_compiled_strategy
+from strategy_execution import load_strategy_histories, run_strategy
+from strategy_extension import RESUME_STATE_KEY, capture_resume_state, extend_strategy
+from utils.catalog import StrategyCatalog
+from utils.data_utils import load_actions, load_conditions
+from utils.price_cache import PriceCache, default_price_cache_dir, init_sigtech
+from utils.result_store import StoredResult, copy_result, result_path, write_result
+from utils.run_cache import RUN_CACHE_DIR, RunCache, run_cache_key
+
+# Directory of the job progress files
+JOBS_DIR = 'jobs'
+STRATEGY_DIR = 'strategies'
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Minimum number of seconds between two writes of a job's progress file
+PROGRESS_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobProgress:
+    """
+    Progress file of one job: `<jobs_dir>/<job_id>.json`, written by the worker running the job and read by the UI.
+
+    A job is cancelled by creating `<jobs_dir>/<job_id>.cancel`, which the worker checks whenever it reports progress.
+    """
+
+    def __init__(self, jobs_dir: str, job_id: str):
+        self.path = os.path.join(jobs_dir, f"{job_id}.json")
+        self.cancel_path = os.path.join(jobs_dir, f"{job_id}.cancel")
+        self._last_report = 0.0
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def update(self, **fields):
+        job = self.read() or {}
+        job.update(fields, updated_at=time.time())
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(job, f, indent=4)
+        os.replace(self.path + '.tmp', self.path)
+
+    def cancel_requested(self) -> bool:
+        return os.path.exists(self.cancel_path)
+
+    def report(self, dates_done: int, dates_total: int):
+        """
+        Records the dates processed, at most every PROGRESS_INTERVAL seconds, and stops the run if it was cancelled.
+
+        :raises JobCancelled: If the job was cancelled.
+        """
+        now = time.time()
+        if now - self._last_report < PROGRESS_INTERVAL and dates_done not in (0, dates_total):
+            return
+        self._last_report = now
+        if self.cancel_requested():
+            raise JobCancelled()
+        self.update(dates_done=dates_done, dates_total=dates_total)
+
+
+def eta_seconds(job: Dict[str, Any]) -> Optional[float]:
+    """
+    Estimates the remaining time of a running job from its rate so far.
+
+    :param job: Job dictionary, see `JobManager.status`.
+    :return: Seconds, or None before the first date is processed.
+    """
+    dates_done, dates_total = job.get('dates_done') or 0, job.get('dates_total') or 0
+    if job.get('status') != RUNNING or not dates_done or not job.get('started_at'):
+        return None
+    elapsed = job['updated_at'] - job['started_at']
+    return elapsed / dates_done * (dates_total - dates_done)
+
+
+def restore_cached_run(strategy_dir: str, run_cache: RunCache, strategy_name: str, run_key: str,
+                       job_id: Optional[str] = None) -> Optional[StoredResult]:
+    """
+    Serves a run from the run cache: copies the cached result into the strategy folder and records the run.
+
+    :param strategy_dir: Directory of the strategy folders.
+    :param run_cache: RunCache to look the run up in.
+    :param strategy_name: Name of the strategy.
+    :param run_key: Key of the run, see `run_cache_key`.
+    :param job_id: Id of the job serving the run.
+    :return: StoredResult in the strategy folder, or None on a miss.
+    """
+    cached = run_cache.get(run_key)
+    if cached is None:
+        return None
+    stored_result = copy_result(cached, result_path(os.path.join(strategy_dir, strategy_name)),
+                                nav_name=f'{strategy_name} NAV', name=strategy_name, cached=True)
+    StrategyCatalog(strategy_dir).record_run(strategy_name, stored_result.meta, stored_result.path, job_id=job_id)
+    logging.info(f"Run of {strategy_name} served from the run cache: {run_key}")
+    return stored_result
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """
+    Checks whether a process exists, e.g. the worker or manager recorded for a job.
+    """
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Owned by another user, but alive
+        return True
+    return True
+
+
+def _run_job(jobs_dir: str, job_id: str, request: Dict[str, Any]) -> str:
+    """
+    Worker: runs a strategy, reports its progress and saves its result in the strategy folder.
+    """
+    progress = JobProgress(jobs_dir, job_id)
+    if progress.cancel_requested():
+        progress.update(status=CANCELLED, finished_at=time.time())
+        return CANCELLED
+    progress.update(status=RUNNING, started_at=time.time(), pid=os.getpid())
+
+    strategy_name = request['strategy_name']
+    strategy_folder = os.path.join(request['strategy_dir'], strategy_name)
+    conditions_file = os.path.join(strategy_folder, 'conditions.json')
+    actions_file = os.path.join(strategy_folder, 'actions.json')
+    start_date = dtm.date.fromisoformat(request['start_date'])
+    end_date = dtm.date.fromisoformat(request['end_date'])
+    try:
+        if request['engine'] == 'sigtech':
+            init_sigtech()
+        conditions, actions = load_conditions(conditions_file), load_actions(actions_file)
+        compiled_strategy = load_compiled_strategy(conditions_file, actions_file)
+        if compiled_strategy is None:
+            raise ValueError("Invalid condition or action specifications. Strategy build aborted.")
+        price_cache = PriceCache(request['price_cache_dir'])
+
+        if request['extend']:
+            # Only the dates after the saved run are computed
+            stored_result = extend_strategy(strategy_folder, end_date, price_cache=price_cache,
+                                            progress=progress.report)
+            StrategyCatalog(request['strategy_dir']).record_run(strategy_name, stored_result.meta, stored_result.path,
+                                                                job_id=job_id)
+        else:
+            dependencies = analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs)
+            etf_histories = load_strategy_histories(dependencies, start_date, end_date, price_cache=price_cache)
+            run_cache = RunCache(request['run_cache_dir'])
+            run_key = run_cache_key(compiled_strategy.condition_specs, compiled_strategy.action_specs, dependencies,
+                                    start_date, end_date, request['initial_cash'], request['engine'], etf_histories,
+                                    data_source=price_cache.source.name)
+            # Profiled runs are always run, to measure them
+            stored_result = None
+            if not request['profile']:
+                stored_result = restore_cached_run(request['strategy_dir'], run_cache, strategy_name, run_key, job_id)
+
+            if stored_result is None:
+                profile_summary, profile_report = None, None
+                args = (start_date, end_date, request['initial_cash'], conditions_file, actions_file)
+                kwargs = {'engine': request['engine'], 'etf_histories': etf_histories, 'progress': progress.report}
+                if request['profile']:
+                    with profile() as profiler:
+                        result = run_strategy(*args, **kwargs)
+                    profile_summary, profile_report = profiler.summary(), profiler.report()
+                else:
+                    result = run_strategy(*args, **kwargs)
+
+                nav = result.history().rename(f'{strategy_name} NAV')
+                resume_state = None
+                if isinstance(result, BacktestResult):
+                    resume_state = capture_resume_state(compiled_strategy.condition_specs, etf_histories, result)
+                metrics = compute_metrics(result) if isinstance(result, BacktestResult) else compute_nav_metrics(nav)
+                stored_result = write_result(result_path(strategy_folder), {
+                    'name': strategy_name,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'initial_cash': request['initial_cash'],
+                    'engine': request['engine'],
+                    'conditions': conditions,
+                    'actions': actions,
+                    'metrics': metrics,
+                    'profile': profile_summary,
+                    'run_key': run_key,
+                    'cached': False,
+                    'data_source': price_cache.source.name,
+                    RESUME_STATE_KEY: resume_state,
+                }, nav, weights=getattr(result, 'weights', None),
+                    decision_path=getattr(result, 'decision_path', None), profile_report=profile_report,
+                    positions=getattr(result, 'positions', None))
+                StrategyCatalog(request['strategy_dir']).record_run(strategy_name, stored_result.meta,
+                                                                    stored_result.path, job_id=job_id)
+                run_cache.put(run_key, stored_result)
+    except JobCancelled:
+        progress.update(status=CANCELLED, finished_at=time.time())
+        return CANCELLED
+    except Exception as e:
+        logging.error(f"Job {job_id} ({strategy_name}) failed: {e}")
+        progress.update(status=FAILED, error=str(e), finished_at=time.time())
+        return FAILED
+    progress.update(status=DONE, cached=stored_result.meta['cached'], finished_at=time.time())
+    return DONE
+
+
+class JobManager:
+    """
+    Runs backtests in a pool of worker processes.
+
+    `submit` returns a job id right away. Workers write the progress of their job to a file in
+    `jobs_dir`, so any session can follow or cancel the job, and save the result of the run in
+    the strategy folder when it finishes.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str = JOBS_DIR,
+        strategy_dir: str = STRATEGY_DIR,
+        price_cache_dir: Optional[str] = None,
+        run_cache_dir: str = RUN_CACHE_DIR,
+        max_workers: Optional[int] = None
+    ):
+        """
+        Initializes a JobManager.
+
+        :param jobs_dir: Directory of the job progress files.
+        :param strategy_dir: Directory of the strategy folders.
+        :param price_cache_dir: Directory of the price cache the workers read from.
+            Defaults to `default_price_cache_dir()`.
+        :param run_cache_dir: Directory of the run cache serving repeated runs.
+        :param max_workers: Number of worker processes, i.e. of strategies run in parallel.
+        """
+        self.jobs_dir = jobs_dir
+        self.strategy_dir = strategy_dir
+        self.price_cache_dir = price_cache_dir if price_cache_dir is not None else default_price_cache_dir()
+        self.run_cache_dir = run_cache_dir
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._mark_interrupted_jobs()
+
+    def _mark_interrupted_jobs(self):
+        # Jobs left unfinished by a process that exited will never complete. Jobs of other live managers
+        # sharing the directory, or still running in a live worker, are left alone.
+        for job in self.list_jobs():
+            if job['status'] in FINISHED:
+                continue
+            if any(_process_alive(job.get(key)) for key in ('manager_pid', 'pid')):
+                continue
+            JobProgress(self.jobs_dir, job['job_id']).update(status=FAILED, error="Interrupted")
+
+    def submit(self, strategy_name: str, start_date, end_date, initial_cash: float, engine: str = 'sigtech',
+               profile: bool = False, extend: bool = False) -> str:
+        """
+        Queues a run of a strategy.
+
+        :param strategy_name: Name of the strategy folder.
+        :param start_date: Start date of the backtest.
+        :param end_date: End date of the backtest.
+        :param initial_cash: Initial cash of the strategy.
+        :param engine: 'sigtech' or 'local', see `run_strategy`.
+        :param profile: Profiles the decision tree during the run.
+        :param extend: Extends the saved local run of the strategy to `end_date` instead of running it from
+                       `start_date`, see `strategy_extension.extend_strategy`.
+        :return: Job id.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        request = {
+            'strategy_name': strategy_name,
+            'strategy_dir': self.strategy_dir,
+            'price_cache_dir': self.price_cache_dir,
+            'run_cache_dir': self.run_cache_dir,
+            'start_date': dtm.date.fromisoformat(str(start_date)[:10]).isoformat(),
+            'end_date': dtm.date.fromisoformat(str(end_date)[:10]).isoformat(),
+            'initial_cash': initial_cash,
+            'engine': engine,
+            'profile': profile,
+            'extend': extend,
+        }
+        JobProgress(self.jobs_dir, job_id).update(job_id=job_id, status=QUEUED, submitted_at=time.time(),
+                                                  manager_pid=os.getpid(), **request)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(_run_job, self.jobs_dir, job_id, request)
+            self._futures[job_id] = future
+        future.add_done_callback(lambda future: self._job_done(job_id, future))
+        logging.info(f"Submitted job {job_id}: {request}")
+        return job_id
+
+    def _job_done(self, job_id, future):
+        # Records the outcome of jobs the worker could not report: cancelled while queued or crashed
+        progress = JobProgress(self.jobs_dir, job_id)
+        job = progress.read() or {}
+        if job.get('status') in FINISHED:
+            return
+        if future.cancelled():
+            progress.update(status=CANCELLED, finished_at=time.time())
+        elif future.exception() is not None:
+            progress.update(status=FAILED, error=str(future.exception()), finished_at=time.time())
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Reads the state of a job.
+
+        :param job_id: Job id.
+        :return: Dictionary with the request, 'status', 'dates_done', 'dates_total', 'eta_seconds' and
+                 'error' for failed jobs, or None for an unknown job.
+        """
+        job = JobProgress(self.jobs_dir, job_id).read()
+        if job is not None:
+            job['eta_seconds'] = eta_seconds(job)
+        return job
+
+    def list_jobs(self, strategy_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lists the jobs, most recently submitted first.
+
+        :param strategy_name: Only lists the jobs of this strategy.
+        """
+        jobs = []
+        for file_name in os.listdir(self.jobs_dir):
+            if file_name.endswith('.json'):
+                job = self.status(file_name[:-len('.json')])
+                if job is not None and (strategy_name is None or job.get('strategy_name') == strategy_name):
+                    jobs.append(job)
+        return sorted(jobs, key=lambda job: job.get('submitted_at', 0), reverse=True)
+
+    def cancel(self, job_id: str):
+        """
+        Cancels a job. A queued job never starts; a running job stops at the next date it reports.
+        """
+        progress = JobProgress(self.jobs_dir, job_id)
+        open(progress.cancel_path, 'w').close()
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Blocks until a job submitted by this manager finishes.
+
+        :return: Final status of the job.
+        """
+        future = self._futures[job_id]
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
+        # The done callback may still be recording the outcome
+        self._job_done(job_id, future)
+        return self.status(job_id)['status']
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+
+_job_manager = None
+
+
+def get_job_manager() -> JobManager:
+    """
+    Job manager shared by every session of the app process.
+    """
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
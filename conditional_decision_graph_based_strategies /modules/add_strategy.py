@@ -1,6 +1,8 @@
 import streamlit as st
 import os
 
+from utils.catalog import get_catalog
+
 # Directory to store strategy objects
 STRATEGY_DIR = 'strategies'
 DEBUG = False
@@ -29,13 +31,14 @@ def add_strategy():
 
         # Check if strategy with the same name exists
         strategy_folder = os.path.join(STRATEGY_DIR, strategy_name)
-        if os.path.exists(strategy_folder):
+        if os.path.exists(strategy_folder) or get_catalog(STRATEGY_DIR).has_strategy(strategy_name):
             st.error("Strategy name already exists. Please choose another name.")
             return
 
         # Create a new folder for the strategy
         try:
             os.makedirs(strategy_folder)
+            get_catalog(STRATEGY_DIR).add_strategy(strategy_name)
             st.session_state['selected_strategy_name'] = strategy_name
             st.session_state['app_mode'] = 'Manage Conditions'  # Navigate to desired page
             if DEBUG: print("DEBUG [add_strategy] rerunning the app")
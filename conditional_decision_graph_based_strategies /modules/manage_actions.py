@@ -2,7 +2,8 @@
 import streamlit as st
 import os
 
-from utils.data_utils import load_actions, save_actions
+from utils.app_cache import cached_actions
+from utils.data_utils import save_actions
 
 
 def manage_actions(strategy_name):
@@ -11,7 +12,7 @@ def manage_actions(strategy_name):
     strategy_folder = os.path.join(STRATEGY_DIR, strategy_name)
     actions_file = os.path.join(strategy_folder, 'actions.json')
 
-    actions = load_actions(actions_file)
+    actions = cached_actions(actions_file)
 
     # Tabs for Adding and Editing Actions
     tab1, tab2 = st.tabs(["Add New Action", "Edit Existing Actions"])
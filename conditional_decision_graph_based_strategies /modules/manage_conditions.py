@@ -2,7 +2,8 @@
 import streamlit as st
 import os
 
-from utils.data_utils import load_conditions, save_conditions, load_actions
+from utils.app_cache import cached_actions, cached_conditions
+from utils.data_utils import save_conditions
 from utils.decision_tree_utils import generate_dot
 
 # Directory to store strategy objects
@@ -14,8 +15,8 @@ def manage_conditions(strategy_name):
     conditions_file = os.path.join(strategy_folder, 'conditions.json')
     actions_file = os.path.join(strategy_folder, 'actions.json')
 
-    conditions = load_conditions(conditions_file)
-    actions = load_actions(actions_file)
+    conditions = cached_conditions(conditions_file)
+    actions = cached_actions(actions_file)
 
 
     st.header("Manage Conditions")
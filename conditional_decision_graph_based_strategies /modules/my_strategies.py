@@ -2,29 +2,37 @@
 import streamlit as st
 import datetime as dtm
 import os
-import pickle
-from matplotlib import pyplot as plt
 import pandas as pd
 
-import sigtech.framework as sig
+from job_manager import FAILED, FINISHED, RUNNING, get_job_manager
+from strategy_builder import validate_specs, load_compiled_strategy
+from strategy_extension import RESUME_STATE_KEY
 
-from strategy_builder import validate_specs, build_decision_tree_from_specs
-from strategy_execution import run_strategy
-
-from utils.data_utils import load_conditions, load_actions
-from utils.decision_tree_utils import generate_dot
-from utils.plotting_utils import plot_performance
-from utils.strategy_utils import list_saved_strategies, load_strategy
+from utils.app_cache import cached_actions, cached_conditions, cached_dot, cached_performance_figure, cached_strategy
+from utils.catalog import RUN_ORDERS, STRATEGY_ORDERS, get_catalog
 
 
 # Directory to store strategy objects
 STRATEGY_DIR = 'strategies'
 DEBUG = False
 
+# Seconds between two refreshes of the jobs panel, and number of jobs listed
+JOB_POLL_SECONDS = 2
+MAX_JOBS_SHOWN = 10
+
+# Rows shown by the catalog searches
+CATALOG_PAGE_SIZE = 500
+
+# Backtest engines offered in the "Run New Strategy" tab
+ENGINE_OPTIONS = {
+    "SigTech": "sigtech",
+    "Local (NumPy)": "local",
+}
+
 
 def select_strategy_name_selectbox(key: str = None):
     # List all strategy folders
-    strategy_names = [name for name in os.listdir(STRATEGY_DIR) if os.path.isdir(os.path.join(STRATEGY_DIR, name))]
+    strategy_names = get_catalog(STRATEGY_DIR).strategy_names()
 
     if not strategy_names:
         st.info("No strategies have been saved yet.")
@@ -42,7 +50,7 @@ def my_strategies():
         st.session_state.active_tab = "Run New Strategy"  # Default tab
 
     # Tab selection
-    tabs = ["Run New Strategy", "View Saved Strategies"]
+    tabs = ["Run New Strategy", "View Saved Strategies", "Browse Catalog"]
     active_tab = st.radio("Select a Tab", tabs, key="active_tab_selector")
 
     # Update session state with the selected tab
@@ -53,6 +61,8 @@ def my_strategies():
         run_new_strategy()
     elif st.session_state.active_tab == "View Saved Strategies":
         view_saved_strategies()
+    elif st.session_state.active_tab == "Browse Catalog":
+        browse_catalog()
 
 
 def run_new_strategy():
@@ -67,6 +77,11 @@ def run_new_strategy():
         start_date = st.date_input("Start Date", value=dtm.date.today() - dtm.timedelta(days=365))
         end_date = st.date_input("End Date", value=dtm.date.today())
         initial_cash = st.number_input("Initial Cash", min_value=1000, step=100, value=100000)
+        engine_label = st.selectbox("Backtest Engine", list(ENGINE_OPTIONS.keys()),
+                                    help="SigTech for validation runs, the local NumPy engine for fast research iterations.")
+        engine = ENGINE_OPTIONS[engine_label]
+        profile_tree = st.checkbox("Profile Decision Tree",
+                                   help="Record call counts, latencies and branch frequencies of every node.")
 
         submitted = st.form_submit_button("Run Strategy")
         if DEBUG: print('DEBUG [run_new_strategy]', {
@@ -74,6 +89,8 @@ def run_new_strategy():
             "Start Date": start_date,
             "End Date": end_date,
             "Initial Cash": initial_cash,
+            "Engine": engine,
+            "Profile": profile_tree,
             "Submitted": submitted
         })
     if submitted:
@@ -88,73 +105,104 @@ def run_new_strategy():
             st.error("Strategy name does not exists. Please make sure to add your strategy before running it.")
             return
 
-        with st.spinner("Running strategy..."):
-            try:
-                # Initialize SigTech environment
-                sig.init()
-
-                # File paths
-                conditions_file = os.path.join(strategy_folder, 'conditions.json')
-                actions_file = os.path.join(strategy_folder, 'actions.json')
-                if DEBUG: print(f'DEBUG [run_new_strategy] actions_file: {actions_file}')
-                if DEBUG: print(f'DEBUG [run_new_strategy] conditions_file: {conditions_file}')
-
-                # Load conditions and actions
-                conditions = load_conditions(conditions_file)
-                actions = load_actions(actions_file)
-                if DEBUG: print(f'DEBUG [run_new_strategy] conditions: {conditions}')
-                if DEBUG: print(f'DEBUG [run_new_strategy] actions: {actions}')
-
-                # Validate specifications
-                if not validate_specs(conditions, actions):
-                    st.error("Invalid condition or action specifications. Strategy build aborted.")
-                    return
-
-                # Build the decision tree
-                decision_tree = build_decision_tree_from_specs(conditions, actions)
-                if decision_tree is None:
-                    st.error("Failed to build the decision tree.")
-                    return
-                if DEBUG: print(f'DEBUG [run_new_strategy] decision_tree: {decision_tree}')
-
-                try:
-                    sig_strategy_object = run_strategy(start_date, end_date, initial_cash, conditions_file, actions_file)
-                except Exception as e:
-                    st.error(e)
-
-                if DEBUG: print('*' * 50)
-                if DEBUG: print(f'DEBUG [run_new_strategy] new sig strategy object : {sig_strategy_object}')
-                # Get performance data
-                performance = sig_strategy_object.history()
-                # Reset the Series name to a simple string
-                performance.name = f'{selected_strategy_name} NAV'
-                # Convert to DataFrame
-                performance = performance.to_frame()
-
-                # Create a strategy object to save
-                strategy_object = {
-                    'name': selected_strategy_name,
-                    'start_date': start_date,
-                    'end_date': end_date,
-                    'initial_cash': initial_cash,
-                    'performance': performance,
-                    'conditions': conditions,
-                    'actions': actions,
-                }
-                if DEBUG: print('*' * 50)
-                if DEBUG: print(f'DEBUG [run_new_strategy] new strategy object : {strategy_object}')
-                # Save the strategy object in the strategy folder
-                if DEBUG: print(f'DEBUG [run_new_strategy] Updating strategy {selected_strategy_name}')
-                strategy_file = os.path.join(strategy_folder, 'strategy.pkl')
-                with open(strategy_file, 'wb') as f:
-                    pickle.dump(strategy_object, f)
-                if DEBUG: print(f'DEBUG [run_new_strategy] strategy saved to {strategy_file}')
-                if DEBUG: print('*'*50)
-                if DEBUG: print(f'DEBUG [run_new_strategy] new strategy object : {strategy_object}')
-                st.success(f"Strategy '{selected_strategy_name}' has been saved.")
-
-            except Exception as e:
-                st.error(f"An error occurred while running the strategy: {e}")
+        # File paths
+        conditions_file = os.path.join(strategy_folder, 'conditions.json')
+        actions_file = os.path.join(strategy_folder, 'actions.json')
+        if DEBUG: print(f'DEBUG [run_new_strategy] actions_file: {actions_file}')
+        if DEBUG: print(f'DEBUG [run_new_strategy] conditions_file: {conditions_file}')
+
+        # Validate specifications
+        if not validate_specs(cached_conditions(conditions_file), cached_actions(actions_file)):
+            st.error("Invalid condition or action specifications. Strategy build aborted.")
+            return
+
+        # Build the decision tree, reused by every run until the specification files change
+        if load_compiled_strategy(conditions_file, actions_file) is None:
+            st.error("Failed to build the decision tree.")
+            return
+
+        # The run happens in a worker process, which serves it from the run cache when it was computed before,
+        # or runs it and saves the strategy object in the strategy folder
+        job_id = get_job_manager().submit(selected_strategy_name, start_date, end_date, initial_cash,
+                                          engine=engine, profile=profile_tree)
+        if DEBUG: print(f'DEBUG [run_new_strategy] submitted job {job_id}')
+        st.success(f"Strategy '{selected_strategy_name}' submitted as job {job_id}.")
+
+    jobs_panel()
+
+
+def format_seconds(seconds):
+    return str(dtm.timedelta(seconds=int(seconds)))
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def jobs_panel():
+    """
+    Progress of the background jobs, refreshed every JOB_POLL_SECONDS without rerunning the page.
+    """
+    jobs = get_job_manager().list_jobs()[:MAX_JOBS_SHOWN]
+    if not jobs:
+        return
+
+    st.subheader("Jobs")
+    for job in jobs:
+        job_id, status = job['job_id'], job['status']
+        info_column, cancel_column = st.columns([5, 1])
+        with info_column:
+            # Set by the worker when the run was served from the run cache
+            cached = " (cached result)" if job.get('cached') else ""
+            st.markdown(f"**{job['strategy_name']}** `{job_id}` {job['start_date']} to {job['end_date']} "
+                        f"({job['engine']}): {status}{cached}")
+            if status == RUNNING and job.get('dates_total'):
+                text = f"{job.get('dates_done', 0)}/{job['dates_total']} dates"
+                if job['eta_seconds'] is not None:
+                    text += f", ETA {format_seconds(job['eta_seconds'])}"
+                st.progress(job.get('dates_done', 0) / job['dates_total'], text=text)
+            elif status == FAILED:
+                st.error(job.get('error'))
+        with cancel_column:
+            if status not in FINISHED and st.button("Cancel", key=f"cancel_{job_id}"):
+                get_job_manager().cancel(job_id)
+
+
+def browse_catalog():
+    st.subheader("Browse Catalog")
+    catalog = get_catalog(STRATEGY_DIR)
+
+    search = st.text_input("Strategy Name", help="Names starting with the text; use * to match anywhere, e.g. *rsi.")
+    strategies_tab, runs_tab = st.tabs(["Strategies", "Runs"])
+
+    with strategies_tab:
+        order_column, descending_column = st.columns(2)
+        order_by = order_column.selectbox("Sort By", STRATEGY_ORDERS, key='catalog_strategy_order')
+        descending = descending_column.checkbox("Descending", key='catalog_strategy_descending')
+        strategies = catalog.search_strategies(search, order_by=order_by, descending=descending,
+                                               limit=CATALOG_PAGE_SIZE)
+        if strategies:
+            st.dataframe(format_catalog_rows(strategies), hide_index=True)
+        else:
+            st.info("No strategy matches the search.")
+
+    with runs_tab:
+        engine_column, sharpe_column, order_column, descending_column = st.columns(4)
+        engine_label = engine_column.selectbox("Engine", ["All"] + list(ENGINE_OPTIONS.keys()))
+        min_sharpe = sharpe_column.number_input("Minimum Sharpe", value=None, step=0.1)
+        order_by = order_column.selectbox("Sort By", RUN_ORDERS, key='catalog_run_order')
+        descending = descending_column.checkbox("Descending", value=True, key='catalog_run_descending')
+        runs = catalog.search_runs(search, engine=ENGINE_OPTIONS.get(engine_label), min_sharpe=min_sharpe,
+                                   order_by=order_by, descending=descending, limit=CATALOG_PAGE_SIZE)
+        if runs:
+            st.dataframe(format_catalog_rows(runs), hide_index=True)
+        else:
+            st.info("No run matches the filters.")
+
+
+def format_catalog_rows(rows):
+    table = pd.DataFrame(rows)
+    for column in ('created_at', 'updated_at'):
+        if column in table:
+            table[column] = pd.to_datetime(table[column], unit='s').dt.floor('s')
+    return table
 
 
 def view_saved_strategies():
@@ -172,7 +220,7 @@ def view_saved_strategies():
 
         # Load the strategy object
         if DEBUG: print('DEBUG [view_saved_strategies] loading strategy object')
-        strategy_object = load_strategy(selected_strategy_name)
+        strategy_object = cached_strategy(selected_strategy_name)
         if DEBUG: print(f'DEBUG [view_saved_strategies] strategy_object: {strategy_object}')
         if strategy_object is None:
             st.error("Failed to load the strategy. Please ensure to add and run the strategy first.")
@@ -182,11 +230,22 @@ def view_saved_strategies():
         st.write(f"**Start Date:** {strategy_object['start_date']}")
         st.write(f"**End Date:** {strategy_object['end_date']}")
         st.write(f"**Initial Cash:** {strategy_object['initial_cash']}")
+        if strategy_object.get('cached'):
+            st.info("Cached result: this run was served from the run cache.")
+
+        # Local runs saved with their end state only compute the dates after their end date
+        if strategy_object.get(RESUME_STATE_KEY) is not None:
+            today = dtm.date.today()
+            if str(today) > str(strategy_object['end_date']) and st.button("Extend to Today", key='extend_strategy'):
+                job_id = get_job_manager().submit(selected_strategy_name, strategy_object['start_date'], today,
+                                                  strategy_object['initial_cash'], engine='local', extend=True)
+                if DEBUG: print(f'DEBUG [view_saved_strategies] submitted extension job {job_id}')
+                st.success(f"Extension of '{selected_strategy_name}' to {today} submitted as job {job_id}.")
 
         # Load Conditions
         conditions_file = os.path.join(strategy_folder, 'conditions.json')
         if os.path.exists(conditions_file):
-            conditions = load_conditions(conditions_file)
+            conditions = cached_conditions(conditions_file)
             st.subheader("Conditions")
             for condition in conditions:
                 st.markdown(f"**{condition['node_name']}**")
@@ -197,7 +256,7 @@ def view_saved_strategies():
         # Load Actions
         actions_file = os.path.join(strategy_folder, 'actions.json')
         if os.path.exists(actions_file):
-            actions = load_actions(actions_file)
+            actions = cached_actions(actions_file)
             st.subheader("Actions")
             for action_name, alloc in actions.items():
                 st.markdown(f"**{action_name}**")
@@ -208,43 +267,13 @@ def view_saved_strategies():
         # Visualize Decision Tree
         if conditions and actions:
             st.subheader("Decision Tree Visualization")
-            dot = generate_dot(conditions, actions)
+            # Strategies run with profiling show node costs and branch frequencies on the tree
+            dot = cached_dot(conditions, actions, profile=strategy_object.get('profile'))
             st.graphviz_chart(dot)
 
-        # Plot the performance
-        performance = strategy_object['performance']
-
-        # Ensure the index is datetime
-        performance.index = pd.to_datetime(performance.index)
-
-        # Get the dynamic column name
-        performance_column = performance.columns[0]
-
-        # Create a Matplotlib figure and axis
-        fig, ax = plt.subplots(figsize=(10, 6))
-
-        # Plot the performance data using the dynamic column name
-        ax.plot(performance.index, performance[performance_column], label=performance_column, color='blue')
-
-        # Set axis labels and title
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Strategy NAV')
-        ax.set_title('Strategy Performance Over Time')
-
-        # Adjust x-axis date formatting
-        ax.xaxis.set_major_locator(plt.MaxNLocator(10))  # Limit number of x-axis ticks
-        plt.xticks(rotation=45)  # Rotate x-axis labels for readability
-
-        # Adjust y-axis scaling to enhance fluctuations
-        y_min = performance[performance_column].min() * 0.99  # Slightly lower than min value
-        y_max = performance[performance_column].max() * 1.01  # Slightly higher than max value
-        ax.set_ylim([y_min, y_max])
-
-        # Enable grid
-        ax.grid(True)
-
-        # Tight layout to prevent clipping
-        plt.tight_layout()
+        if strategy_object.get('profile_report') is not None:
+            st.subheader("Profile")
+            st.dataframe(strategy_object['profile_report'])
 
-        # Display the plot in Streamlit
-        st.pyplot(fig)
+        # Plot the performance, drawn once per saved run
+        st.pyplot(cached_performance_figure(selected_strategy_name))
@@ -0,0 +1,119 @@
+import streamlit as st
+import datetime as dtm
+import os
+
+from parameter_sweep import expand_sweep, run_sweep
+from spec_dependencies import StrategyDependencies, analyze_specs
+
+from utils.app_cache import cached_actions, cached_conditions, cached_strategy_histories
+
+# Directory to store strategy objects
+STRATEGY_DIR = 'strategies'
+DEBUG = False
+
+CONDITION_FIELDS = ["threshold", "window", "operator", "threshold.window", "threshold.operator"]
+RANK_METRICS = ["sharpe", "cagr", "total_return", "max_drawdown", "volatility", "turnover"]
+
+
+def parse_values(field, text):
+    """
+    Parses the comma-separated values of a sweep parameter.
+
+    :param field: Swept field; windows are integers, operators strings and everything else floats.
+    :param text: Comma-separated values.
+    :return: List of values.
+    """
+    values = [value.strip() for value in text.split(",") if value.strip()]
+    if field.endswith("window"):
+        return [int(value) for value in values]
+    if field.endswith("operator"):
+        return values
+    return [float(value) for value in values]
+
+
+def parameter_sweep(strategy_name):
+    st.header("Parameter Sweep")
+
+    strategy_folder = os.path.join(STRATEGY_DIR, strategy_name)
+    conditions = cached_conditions(os.path.join(strategy_folder, 'conditions.json'))
+    actions = cached_actions(os.path.join(strategy_folder, 'actions.json'))
+
+    if not conditions or not actions:
+        st.info("Define conditions and actions before running a sweep.")
+        return
+
+    if st.session_state.get('sweep_strategy_name') != strategy_name:
+        st.session_state['sweep_strategy_name'] = strategy_name
+        st.session_state['sweep_parameters'] = []
+    sweep_parameters = st.session_state['sweep_parameters']
+
+    tab1, tab2 = st.tabs(["Condition Parameter", "Action Weight"])
+
+    with tab1:
+        with st.form("add_condition_parameter"):
+            node = st.selectbox("Condition Node", [cond['node_name'] for cond in conditions])
+            field = st.selectbox("Field", CONDITION_FIELDS,
+                                 help="'threshold.*' fields apply to dynamic thresholds only.")
+            values = st.text_input("Values (comma-separated)", help="e.g. 60, 70, 80 or >, >=")
+            submitted = st.form_submit_button("Add Parameter")
+            if submitted:
+                try:
+                    sweep_parameters.append({'node': node, 'field': field, 'values': parse_values(field, values)})
+                except ValueError:
+                    st.error("Values must match the field type.")
+
+    with tab2:
+        with st.form("add_action_parameter"):
+            action = st.selectbox("Action", list(actions.keys()))
+            etf = st.text_input("ETF", help="ETF whose weight is swept. Other ETFs of the action are rescaled.")
+            values = st.text_input("Weights (comma-separated, in decimals)", "0.4, 0.5, 0.6")
+            submitted = st.form_submit_button("Add Parameter")
+            if submitted:
+                if etf not in actions[action]:
+                    st.error(f"ETF '{etf}' is not part of action '{action}'.")
+                else:
+                    try:
+                        sweep_parameters.append({'action': action, 'etf': etf, 'values': parse_values('weight', values)})
+                    except ValueError:
+                        st.error("Weights must be numeric.")
+
+    st.subheader("Swept Parameters")
+    if not sweep_parameters:
+        st.info("No parameters added yet.")
+        return
+    for parameter in sweep_parameters:
+        st.json(parameter)
+    if st.button("Clear Parameters"):
+        st.session_state['sweep_parameters'] = []
+        st.rerun()
+
+    with st.form("run_sweep"):
+        start_date = st.date_input("Start Date", value=dtm.date.today() - dtm.timedelta(days=365 * 5))
+        end_date = st.date_input("End Date", value=dtm.date.today())
+        initial_cash = st.number_input("Initial Cash", min_value=1000, step=100, value=100000)
+        rank_by = st.selectbox("Rank By", RANK_METRICS)
+        max_workers = st.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1,
+                                      value=os.cpu_count() or 1, step=1)
+        submitted = st.form_submit_button("Run Sweep")
+
+    if submitted:
+        variants = expand_sweep(conditions, actions, sweep_parameters)
+        if DEBUG: print(f'DEBUG [parameter_sweep] {len(variants)} variants')
+        if not variants:
+            st.error("No valid variant to run.")
+            return
+
+        with st.spinner(f"Running {len(variants)} variants..."):
+            try:
+                dependencies = StrategyDependencies.union(
+                    analyze_specs(variant['conditions'], variant['actions']) for variant in variants
+                )
+                etf_histories = cached_strategy_histories(dependencies, start_date, end_date)
+                results = run_sweep(variants, etf_histories, start_date, end_date, initial_cash,
+                                    rank_by=rank_by, max_workers=int(max_workers))
+            except Exception as e:
+                st.error(f"An error occurred while running the sweep: {e}")
+                return
+
+        st.subheader("Results")
+        st.dataframe(results)
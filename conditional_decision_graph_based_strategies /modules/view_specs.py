@@ -3,7 +3,7 @@ import base64
 import json
 import os
 
-from utils.data_utils import load_conditions, load_actions
+from utils.app_cache import cached_actions, cached_conditions
 
 
 # Directory to store strategy objects
@@ -17,8 +17,8 @@ def view_specs(strategy_name):
     conditions_file = os.path.join(strategy_folder, 'conditions.json')
     actions_file = os.path.join(strategy_folder, 'actions.json')
 
-    conditions = load_conditions(conditions_file)
-    actions = load_actions(actions_file)
+    conditions = cached_conditions(conditions_file)
+    actions = cached_actions(actions_file)
 
     # Display Conditions
     st.subheader("Conditions")
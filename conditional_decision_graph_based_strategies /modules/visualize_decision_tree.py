@@ -2,8 +2,7 @@
 import streamlit as st
 import os
 
-from utils.data_utils import load_conditions, load_actions
-from utils.decision_tree_utils import generate_dot
+from utils.app_cache import cached_actions, cached_conditions, cached_dot
 
 # Directory to store strategy objects
 STRATEGY_DIR = 'strategies'
@@ -17,15 +16,15 @@ def visualize_decision_tree(strategy_name):
     conditions_file = os.path.join(strategy_folder, 'conditions.json')
     actions_file = os.path.join(strategy_folder, 'actions.json')
 
-    conditions = load_conditions(conditions_file)
-    actions = load_actions(actions_file)
+    conditions = cached_conditions(conditions_file)
+    actions = cached_actions(actions_file)
 
     if not conditions and not actions:
         st.info("No conditions or actions defined to visualize.")
         return
 
     # Generate DOT code
-    dot = generate_dot(conditions, actions)
+    dot = cached_dot(conditions, actions)
 
     # Display the graph
     st.graphviz_chart(dot)
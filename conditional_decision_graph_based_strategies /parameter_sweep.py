@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+import copy
+import itertools
+import logging
+
+import pandas as pd
+
+from backtest_engine import compute_metrics, run_local_backtest
+from feature_store import FeatureStore, collect_feature_keys
+from shared_run_data import attach_shared_data, share_run_data, shared_feature_store, shared_prices
+from strategy_builder import build_decision_tree_from_specs, validate_specs
+
+
+# Condition fields a sweep parameter can vary. 'threshold.<key>' varies a key of a dynamic threshold.
+CONDITION_FIELDS = ('threshold', 'window', 'operator')
+
+
+def parameter_label(parameter: Dict[str, Any]) -> str:
+    """
+    Generates a descriptive label for a sweep parameter.
+
+    :param parameter: Sweep parameter (see `expand_sweep`).
+    :return: String label.
+    """
+    if 'node' in parameter:
+        return f"{parameter['node']}.{parameter['field']}"
+    return f"{parameter['action']}.{parameter['etf']}"
+
+
+def apply_parameter(
+        condition_specs: List[Dict[str, Any]],
+        action_specs: Dict[str, Any],
+        parameter: Dict[str, Any],
+        value: Any
+):
+    """
+    Sets one sweep parameter in place in the specifications.
+
+    :param condition_specs: List of condition specifications (modified in place).
+    :param action_specs: Dictionary of action specifications (modified in place).
+    :param parameter: Sweep parameter (see `expand_sweep`).
+    :param value: Value to set.
+    """
+    if 'node' in parameter:
+        spec = next((spec for spec in condition_specs if spec['node_name'] == parameter['node']), None)
+        if spec is None:
+            raise ValueError(f"Unknown condition node: {parameter['node']}")
+        field = parameter['field']
+        if field.startswith('threshold.'):
+            if not isinstance(spec['threshold'], dict):
+                raise ValueError(f"Node '{parameter['node']}' does not have a dynamic threshold")
+            spec['threshold'][field.split('.', 1)[1]] = value
+        elif field in CONDITION_FIELDS:
+            spec[field] = value
+        else:
+            raise ValueError(f"Unsupported condition field: {field}")
+    else:
+        allocations = action_specs.get(parameter['action'])
+        if allocations is None:
+            raise ValueError(f"Unknown action: {parameter['action']}")
+        # The other ETFs of the action are rescaled so the total allocation is unchanged
+        total = sum(allocations.values())
+        others = total - allocations.get(parameter['etf'], 0.0)
+        for etf in allocations:
+            if etf != parameter['etf'] and others:
+                allocations[etf] *= (total - value) / others
+        allocations[parameter['etf']] = value
+
+
+def expand_sweep(
+        condition_specs: List[Dict[str, Any]],
+        action_specs: Dict[str, Any],
+        parameters: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Expands a base specification and parameter ranges into the full grid of variants.
+
+    ---
+    Example parameters
+    parameters = [
+        {'node': 'decision_node_root', 'field': 'threshold', 'values': [60, 70, 80]},
+        {'node': 'decision_node_root', 'field': 'window', 'values': [14, 20]},
+        {'node': 'decision_node_cum_return', 'field': 'threshold.window', 'values': [40, 60]},
+        {'action': 'SPY/TLT 50/50', 'etf': 'SPY UP EQUITY', 'values': [0.4, 0.6]},
+    ]
+
+    :param condition_specs: Base list of condition specifications.
+    :param action_specs: Base dictionary of action specifications.
+    :param parameters: Parameters to vary, each with the values to try.
+    :return: List of variants with 'parameters', 'conditions' and 'actions' keys. Invalid variants are dropped.
+    """
+    variants = []
+    labels = [parameter_label(parameter) for parameter in parameters]
+    for values in itertools.product(*[parameter['values'] for parameter in parameters]):
+        conditions = copy.deepcopy(condition_specs)
+        actions = copy.deepcopy(action_specs)
+        for parameter, value in zip(parameters, values):
+            apply_parameter(conditions, actions, parameter, value)
+        if not validate_specs(conditions, actions):
+            logging.warning(f"Skipping invalid sweep variant: {dict(zip(labels, values))}")
+            continue
+        variants.append({'parameters': dict(zip(labels, values)), 'conditions': conditions, 'actions': actions})
+    return variants
+
+
+def _run_variant(task):
+    """
+    Runs one sweep variant against the shared data.
+    """
+    position, variant, run_dates, initial_cash, sizing = task
+    parameters = variant['parameters']
+    try:
+        decision_tree = build_decision_tree_from_specs(variant['conditions'], variant['actions'])
+        context = {'etf_histories': {}, 'feature_store': shared_feature_store()}
+        weights = decision_tree.evaluate_series(context, run_dates)
+        prices = shared_prices().reindex(index=run_dates, columns=weights.columns)
+        metrics = compute_metrics(run_local_backtest(prices, weights, initial_cash, sizing=sizing))
+    except Exception as e:
+        logging.error(f"Sweep variant {parameters} failed: {e}")
+        metrics = {}
+    return position, {**parameters, **metrics}
+
+
+def run_sweep(
+        variants: List[Dict[str, Any]],
+        etf_histories: Dict[str, pd.Series],
+        start_date,
+        end_date,
+        initial_cash: float,
+        rank_by: str = 'sharpe',
+        max_workers: Optional[int] = None,
+        sizing: str = 'initial_cash'
+) -> pd.DataFrame:
+    """
+    Backtests every variant with the local engine in a process pool.
+
+    Prices and the union of the variants' features are computed once and placed in shared
+    memory, which every worker maps instead of receiving a copy per task.
+
+    :param variants: Variants returned by `expand_sweep`.
+    :param etf_histories: Dictionary mapping ETFs to their price histories.
+    :param start_date: Start date of the backtests.
+    :param end_date: End date of the backtests.
+    :param initial_cash: Initial cash of the strategies.
+    :param rank_by: Metric used to rank the variants (descending, except 'volatility' and 'turnover').
+    :param max_workers: Number of worker processes. 1 runs the sweep in the current process.
+    :param sizing: Sizing method of the local engine.
+    :return: DataFrame with one row per variant: swept parameter values then metrics, ranked.
+    """
+    if not variants:
+        return pd.DataFrame()
+
+    feature_keys = list(dict.fromkeys(key for variant in variants for key in collect_feature_keys(variant['conditions'])))
+    feature_store = FeatureStore(etf_histories, feature_keys)
+    calendar = feature_store.calendar
+    tickers = list(etf_histories)
+    prices = pd.DataFrame({ticker: etf_histories[ticker] for ticker in tickers}).reindex(calendar).ffill().reindex(columns=tickers)
+    run_dates = calendar[(calendar >= pd.Timestamp(start_date)) & (calendar <= pd.Timestamp(end_date))]
+    tasks = [(position, variant, run_dates, initial_cash, sizing) for position, variant in enumerate(variants)]
+
+    with share_run_data(prices, feature_store, feature_keys) as initializer_args:
+        if max_workers == 1:
+            results = [_run_variant(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=attach_shared_data, initargs=initializer_args
+            ) as executor:
+                results = list(executor.map(_run_variant, tasks, chunksize=max(1, len(tasks) // 32)))
+
+    table = pd.DataFrame([row for _, row in sorted(results, key=lambda result: result[0])])
+    if rank_by in table.columns:
+        ascending = rank_by in ('volatility', 'turnover')
+        table = table.sort_values(rank_by, ascending=ascending, na_position='last').reset_index(drop=True)
+    return table
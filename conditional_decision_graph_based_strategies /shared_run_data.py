@@ -0,0 +1,94 @@
+"""
+Price panel and feature matrix shared between worker processes.
+
+The parent process places the arrays in shared memory once; every worker maps them in its
+initializer instead of receiving a copy per task. Used by parameter sweeps and batch runs.
+"""
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureKey, FeatureStore
+
+# Shared data of the current process, see attach_shared_data
+_SHARED = {}
+
+
+def _share_array(array: np.ndarray):
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block
+
+
+def _set_shared_data(calendar, tickers, feature_keys, arrays, handles=None):
+    calendar = pd.DatetimeIndex(calendar)
+    _SHARED.clear()
+    _SHARED.update({
+        'handles': handles,
+        'prices': pd.DataFrame(arrays['prices'], index=calendar, columns=tickers, copy=False),
+        'feature_store': FeatureStore.from_columns(
+            calendar, {key: arrays['features'][:, i] for i, key in enumerate(feature_keys)}
+        ),
+    })
+
+
+def attach_shared_data(calendar, tickers, feature_keys, blocks, shapes):
+    """
+    Worker initializer: maps the shared price panel and feature matrix without copying them.
+    """
+    handles = {name: shared_memory.SharedMemory(name=block_name) for name, block_name in blocks.items()}
+    arrays = {name: np.ndarray(shapes[name], dtype=np.float64, buffer=handles[name].buf) for name in handles}
+    _set_shared_data(calendar, tickers, feature_keys, arrays, handles)
+
+
+def shared_prices() -> pd.DataFrame:
+    """
+    Shared price panel: one row per calendar date, one column per ticker, forward-filled.
+    """
+    return _SHARED['prices']
+
+
+def shared_feature_store() -> FeatureStore:
+    """
+    FeatureStore wrapping the shared feature matrix.
+    """
+    return _SHARED['feature_store']
+
+
+@contextmanager
+def share_run_data(prices: pd.DataFrame, feature_store: FeatureStore,
+                   feature_keys: List[FeatureKey]) -> Iterator[Tuple]:
+    """
+    Places a price panel and features in shared memory for the duration of the block.
+
+    The data is also set in the current process, so tasks can run in it without a pool.
+
+    :param prices: Price panel aligned to the calendar of the feature store.
+    :param feature_store: FeatureStore holding the features.
+    :param feature_keys: Features to share. Keys the store could not compute are skipped.
+    :yield: Arguments of `attach_shared_data`, the initializer of the worker processes.
+    """
+    calendar = feature_store.calendar
+    tickers = list(prices.columns)
+    feature_keys = [key for key in feature_keys if key in feature_store.columns]
+    arrays = {
+        'prices': np.ascontiguousarray(prices.reindex(calendar).to_numpy(dtype=np.float64)),
+        'features': np.column_stack([feature_store.columns[key] for key in feature_keys])
+        if feature_keys else np.zeros((len(calendar), 0)),
+    }
+    blocks = {name: _share_array(array) for name, array in arrays.items()}
+    try:
+        _set_shared_data(calendar, tickers, feature_keys, arrays)
+        yield (
+            calendar, tickers, feature_keys,
+            {name: block.name for name, block in blocks.items()},
+            {name: array.shape for name, array in arrays.items()},
+        )
+    finally:
+        _SHARED.clear()
+        for block in blocks.values():
+            block.close()
+            block.unlink()
@@ -0,0 +1,129 @@
+from typing import Any, Dict, Iterable, List
+import logging
+import math
+
+import pandas as pd
+
+
+# RSI uses exponential averages over the whole history. Starting it RSI_WARMUP_FACTOR windows
+# before the first date leaves a relative weight of about (1 - 1/window)^(factor * window) < e^-factor
+# to the prices that are not loaded.
+RSI_WARMUP_FACTOR = 10
+
+# Lookbacks are counted in trading days; the margin covers holidays when converting to business days
+HOLIDAY_MARGIN = 1.1
+
+# Action ETFs only need their price as of the sizing date
+MIN_LOOKBACK = 1
+
+
+def indicator_lookback(indicator_name: str, window: int) -> int:
+    """
+    Number of prices an indicator needs before the first evaluated date.
+
+    :param indicator_name: Name of the indicator (e.g., 'RSI', 'Volatility', 'Cumulative Return').
+    :param window: Window size for the indicator.
+    :return: Lookback in trading days.
+    """
+    if indicator_name.lower() == 'rsi':
+        return int(window) * RSI_WARMUP_FACTOR
+    # Volatility and cumulative return use `window` returns, i.e. `window` + 1 prices
+    return int(window) + 1
+
+
+class StrategyDependencies:
+    def __init__(self, lookbacks: Dict[str, int] = None):
+        """
+        Initializes StrategyDependencies.
+
+        :param lookbacks: Dictionary mapping tickers to the number of trading days needed before the start date.
+        """
+        self.lookbacks = dict(lookbacks or {})
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.lookbacks)
+
+    def add(self, ticker: str, lookback: int):
+        self.lookbacks[ticker] = max(self.lookbacks.get(ticker, 0), int(lookback))
+
+    @classmethod
+    def union(cls, dependencies: Iterable['StrategyDependencies']) -> 'StrategyDependencies':
+        """
+        Merges the dependencies of several strategies, keeping the longest lookback per ticker.
+
+        :param dependencies: StrategyDependencies objects.
+        :return: StrategyDependencies object.
+        """
+        merged = cls()
+        for dependency in dependencies:
+            for ticker, lookback in dependency.lookbacks.items():
+                merged.add(ticker, lookback)
+        return merged
+
+    def history_start(self, ticker: str, start_date) -> pd.Timestamp:
+        """
+        First date of history a ticker needs for a run starting on `start_date`.
+
+        :param ticker: Ticker of the history.
+        :param start_date: Start date of the run.
+        :return: Timestamp of the first date to load.
+        """
+        business_days = math.ceil(self.lookbacks[ticker] * HOLIDAY_MARGIN)
+        return pd.Timestamp(start_date) - pd.offsets.BDay(business_days)
+
+    def restrict(self, etf_histories: Dict[str, pd.Series], start_date, end_date) -> Dict[str, pd.Series]:
+        """
+        Keeps the tickers the strategy uses, from their lookback before `start_date` to `end_date`.
+
+        :param etf_histories: Dictionary mapping ETFs to their price histories.
+        :param start_date: Start date of the run.
+        :param end_date: End date of the run.
+        :return: Dictionary mapping the strategy's ETFs to their restricted histories.
+        """
+        restricted = {}
+        for ticker in self.tickers:
+            if ticker not in etf_histories:
+                logging.error(f"Price history for {ticker} not found.")
+                continue
+            restricted[ticker] = etf_histories[ticker].loc[self.history_start(ticker, start_date):pd.Timestamp(end_date)]
+        return restricted
+
+
+def analyze_specs(condition_specs: List[Dict[str, Any]], action_specs: Dict[str, Any]) -> StrategyDependencies:
+    """
+    Finds the tickers a strategy uses and how much history each one needs.
+
+    Only the nodes and actions reachable from the root (the first condition) are considered,
+    as the others are never evaluated.
+
+    :param condition_specs: List of condition specifications (dictionaries).
+    :param action_specs: Dictionary mapping action names to allocation dictionaries.
+    :return: StrategyDependencies object.
+    """
+    dependencies = StrategyDependencies()
+    specs = {spec['node_name']: spec for spec in condition_specs}
+    if not condition_specs:
+        return dependencies
+
+    visited = set()
+    pending = [condition_specs[0]['node_name']]
+    while pending:
+        name = pending.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+
+        if name in specs:
+            spec = specs[name]
+            dependencies.add(spec['etf'], indicator_lookback(spec['indicator'], spec['window']))
+            threshold = spec.get('threshold')
+            if isinstance(threshold, dict):
+                lookback = indicator_lookback(threshold['indicator'], threshold.get('window', 60))
+                dependencies.add(threshold['etf1'], lookback)
+                dependencies.add(threshold['etf2'], lookback)
+            pending.extend([spec['true_branch'], spec['false_branch']])
+        elif name in action_specs:
+            for etf in action_specs[name]:
+                dependencies.add(etf, MIN_LOOKBACK)
+    return dependencies
@@ -1,7 +1,12 @@
 from typing import List, Dict, Any, Optional
+import hashlib
+import json
 import logging
+import os
 
 from graph_factory import ActionNode, DecisionNode, DecisionTree
+from compiled_tree import CompiledTree, compile_tree
+from feature_store import FeatureTable
 from helper import get_cum_return, get_rsi, get_vol, allocate_values, create_comparison_function, get_indicator_value
 
 
@@ -35,10 +40,12 @@ def build_decision_tree_from_specs(
         return None
         
     nodes = {}
+    # Indicators shared by several nodes or dynamic thresholds are computed once per date
+    feature_table = FeatureTable()
 
     # Create ActionNodes
     for action_name, allocations in action_specs.items():
-        nodes[action_name] = ActionNode(allocations=allocations)
+        nodes[action_name] = ActionNode(allocations=allocations, name=action_name)
     
     # Create DecisionNodes in reverse order to ensure dependencies are resolved
     for spec in reversed(condition_specs):
@@ -50,7 +57,8 @@ def build_decision_tree_from_specs(
                 etf1=threshold['etf1'],
                 etf2=threshold['etf2'],
                 window=threshold.get('window', 60),
-                operator=threshold.get('operator', '>')
+                operator=threshold.get('operator', '>'),
+                feature_table=feature_table
             )
         elif callable(threshold):
             # If threshold is a callable function
@@ -66,12 +74,19 @@ def build_decision_tree_from_specs(
             operator=spec['operator'],
             threshold=comparison_func,
             true_branch=nodes.get(spec['true_branch']),
-            false_branch=nodes.get(spec['false_branch'])
+            false_branch=nodes.get(spec['false_branch']),
+            name=spec['node_name'],
+            feature_table=feature_table
         )
-    
+
+    logging.info(
+        f"Feature table: {feature_table.references} indicator references, {len(feature_table.keys)} distinct "
+        f"features, {feature_table.evaluations_saved} evaluations saved per date"
+    )
+
     # The first node in the list is the root node
     root_node = nodes[condition_specs[0]['node_name']]
-    decision_tree = DecisionTree(root_node)
+    decision_tree = DecisionTree(root_node, feature_table=feature_table)
     return decision_tree
 
 
@@ -110,6 +125,96 @@ def validate_specs(
     return valid
 
 
+class CompiledStrategy:
+    def __init__(
+        self,
+        condition_specs: List[Dict[str, Any]],
+        action_specs: Dict[str, Any],
+        decision_tree: DecisionTree,
+        content_hash: str,
+        compiled_tree: Optional[CompiledTree] = None
+    ):
+        """
+        Initializes a CompiledStrategy.
+
+        :param condition_specs: Validated list of condition specifications.
+        :param action_specs: Validated dictionary of action specifications.
+        :param decision_tree: DecisionTree built from the specifications.
+        :param content_hash: SHA-256 of the conditions and actions files the strategy was built from.
+        :param compiled_tree: Flat array form of the decision tree, if it could be compiled.
+        """
+        self.condition_specs = condition_specs
+        self.action_specs = action_specs
+        self.decision_tree = decision_tree
+        self.content_hash = content_hash
+        self.compiled_tree = compiled_tree
+
+
+# (conditions path, actions path) -> (file signatures, content hash, CompiledStrategy or None)
+_COMPILED_STRATEGIES = {}
+
+
+def _file_signature(file_path: str):
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_compiled_strategy(conditions_file: str, actions_file: str) -> Optional[CompiledStrategy]:
+    """
+    Loads, validates and builds the strategy defined by the two specification files, once.
+
+    Compiled strategies are cached per pair of files. A cache entry is reused while the files'
+    mtime and size are unchanged; otherwise the files are re-read and the strategy is only
+    rebuilt if their content hash differs from the cached one.
+
+    :param conditions_file: Path to the conditions JSON file.
+    :param actions_file: Path to the actions JSON file.
+    :return: CompiledStrategy object, or None if the specifications are invalid.
+    """
+    cache_key = (os.path.abspath(conditions_file), os.path.abspath(actions_file))
+    signatures = (_file_signature(conditions_file), _file_signature(actions_file))
+
+    cached = _COMPILED_STRATEGIES.get(cache_key)
+    if cached is not None and cached[0] == signatures:
+        return cached[2]
+
+    with open(conditions_file, 'rb') as f:
+        conditions_content = f.read()
+    with open(actions_file, 'rb') as f:
+        actions_content = f.read()
+    content_hash = hashlib.sha256(conditions_content + b'\0' + actions_content).hexdigest()
+
+    if cached is not None and cached[1] == content_hash:
+        _COMPILED_STRATEGIES[cache_key] = (signatures, content_hash, cached[2])
+        return cached[2]
+
+    condition_specs = json.loads(conditions_content)
+    action_specs = json.loads(actions_content)
+
+    compiled_strategy = None
+    decision_tree = build_decision_tree_from_specs(condition_specs, action_specs)
+    if decision_tree is not None:
+        try:
+            compiled_tree = compile_tree(decision_tree)
+        except Exception as e:
+            logging.warning(f"Decision tree could not be compiled to flat arrays: {e}")
+            compiled_tree = None
+        compiled_strategy = CompiledStrategy(condition_specs, action_specs, decision_tree, content_hash, compiled_tree)
+    _COMPILED_STRATEGIES[cache_key] = (signatures, content_hash, compiled_strategy)
+    return compiled_strategy
+
+
+def invalidate_compiled_strategies(file_path: str):
+    """
+    Drops the cached strategies built from a specification file, for writes the file signature may not reveal.
+
+    :param file_path: Path to a conditions or actions JSON file.
+    """
+    file_path = os.path.abspath(file_path)
+    for cache_key in [key for key in _COMPILED_STRATEGIES if file_path in key]:
+        del _COMPILED_STRATEGIES[cache_key]
+
+
 #  ---- the below functions are not used anymore. Will be removed in future versions
 def build_decision_tree():
     """
@@ -1,59 +1,145 @@
+import bisect
+import itertools
 import os
-from strategy_builder import build_decision_tree_from_specs
+import instrumentation
+import tracing
+from strategy_builder import load_compiled_strategy
 from helper import allocate_values
+from evaluation_context import EvaluationContext, PriceMatrix, TradingCalendar
+from feature_store import FeatureStore
+from backtest_engine import build_price_panel, run_local_backtest
+from spec_dependencies import StrategyDependencies, analyze_specs
+from utils.price_cache import PriceCache, init_sigtech
+from utils.sig_backend import sig
 import logging
 import pandas as pd
-import json
 
-import sigtech.framework as sig
+# Backtest engines available to run_strategy
+ENGINES = ('sigtech', 'local')
+
+# ETFs loaded when no histories are provided
+DEFAULT_ETF_NAMES = [
+    'TLT US EQUITY',
+    'TQQQ US EQUITY',
+    'SVXY US EQUITY',
+    'VIXY US EQUITY',
+    'QQQ UP EQUITY',
+    'SPY UP EQUITY',
+    'BND UP EQUITY',
+    'BIL UP EQUITY',
+    'GLD UP EQUITY',
+]
+
+
+def get_sig_instruments(etf_names):
+    """
+    Initializes the SigTech environment and retrieves the ETF instruments.
+
+    :param etf_names: Names of the ETFs.
+    :return: Dictionary mapping ETF names to SigTech instruments.
+    """
+    # Initialize SigTech environment
+    init_sigtech()
+    return {name: sig.obj.get(name) for name in etf_names}
+
+
+def load_etf_histories(etf_names=None, end_date=None, price_cache=None, start_dates=None):
+    """
+    Retrieves the price histories of the ETFs through the price cache.
+
+    :param etf_names: Names of the ETFs. Defaults to DEFAULT_ETF_NAMES.
+    :param end_date: Last date needed. Cached histories covering it are not refreshed.
+    :param price_cache: PriceCache to read from. Defaults to a SigTech-backed cache in `default_price_cache_dir()`.
+    :param start_dates: Optional dictionary mapping ETF names to the first date needed, so that histories
+        missing from the cache are only fetched from it. Defaults to the start of the histories.
+    :return: Dictionary mapping ETF names to their price histories.
+    """
+    price_cache = price_cache if price_cache is not None else PriceCache()
+    return price_cache.get(etf_names or DEFAULT_ETF_NAMES, end_date=end_date, start_dates=start_dates)
+
+
+def load_strategy_histories(dependencies, start_date, end_date, price_cache=None):
+    """
+    Retrieves only the histories a strategy needs: its tickers, from their lookback before the start date to the end date.
+
+    :param dependencies: StrategyDependencies object, see `spec_dependencies.analyze_specs`.
+    :param start_date: Start date of the run.
+    :param end_date: End date of the run.
+    :param price_cache: PriceCache to read from. Defaults to a SigTech-backed cache in `default_price_cache_dir()`.
+    :return: Dictionary mapping ETF names to their price histories.
+    """
+    start_dates = {ticker: dependencies.history_start(ticker, start_date) for ticker in dependencies.tickers}
+    etf_histories = load_etf_histories(dependencies.tickers, end_date=end_date, price_cache=price_cache,
+                                       start_dates=start_dates)
+    etf_histories = dependencies.restrict(etf_histories, start_date, end_date)
+    logging.info(
+        f"Loaded {sum(len(history) for history in etf_histories.values())} prices for "
+        f"{len(etf_histories)} tickers: {dependencies.lookbacks}"
+    )
+    return etf_histories
 
 
 def basket_creation_method(strategy, dt, positions, **additional_parameters):
     size_date = pd.Timestamp(strategy.size_date_from_decision_dt(dt))
     midnight_dt = dt.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
-    example_dates = additional_parameters.get('example_dates', [])
+    # Hashed membership test; a list of example dates is still accepted from older callers
+    calendar = additional_parameters.get('calendar')
+    if calendar is None:
+        calendar = TradingCalendar(additional_parameters.get('example_dates', []))
     order = {}
 
-    if midnight_dt not in example_dates:
+    if midnight_dt not in calendar:
         return {}
 
-    # Build the context for the decision tree
-    context = {
-        'strategy': strategy,
-        'dt': dt,
-        'positions': positions,
-        'additional_parameters': additional_parameters,
-        'size_date': size_date,
-        'midnight_dt': midnight_dt,
-        'initial_cash': strategy.initial_cash,
-        'etf_histories': additional_parameters.get('etf_histories', {}),
-        'etfs': additional_parameters.get('etfs', {}),
-    }
-
-    # Retrieve condition and action specifications from JSON files
-    conditions_file = additional_parameters.get('conditions_file', 'conditions.json')
-    actions_file = additional_parameters.get('actions_file', 'actions.json')
-
-    with open(conditions_file, 'r') as f:
-        condition_specs = json.load(f)
+    # Report the date to the job running the strategy, which may cancel the run
+    progress = additional_parameters.get('progress')
+    if progress is not None:
+        progress()
 
-    with open(actions_file, 'r') as f:
-        action_specs = json.load(f)
+    # Build the context for the decision tree
+    context = EvaluationContext(
+        midnight_dt=midnight_dt,
+        size_date=size_date,
+        initial_cash=strategy.initial_cash,
+        etf_histories=additional_parameters.get('etf_histories', {}),
+        feature_store=additional_parameters.get('feature_store'),
+        calendar=calendar,
+        price_matrix=additional_parameters.get('price_matrix'),
+        etfs=additional_parameters.get('etfs', {}),
+        strategy=strategy,
+        dt=dt,
+        positions=positions,
+        additional_parameters=additional_parameters,
+    )
 
-    # Validate specifications
-    from strategy_builder import validate_specs
-    if not validate_specs(condition_specs, action_specs):
+    # Use the compiled strategy resolved once by run_strategy; older callers only pass the specification files
+    compiled_strategy = additional_parameters.get('compiled_strategy')
+    if compiled_strategy is None:
+        compiled_strategy = load_compiled_strategy(additional_parameters.get('conditions_file', 'conditions.json'),
+                                                   additional_parameters.get('actions_file', 'actions.json'))
+    if compiled_strategy is None:
         logging.error("Invalid condition or action specifications. Aborting order generation.")
         return {}
 
-    # Build and evaluate the decision tree
+    # Reuse the leaf reached since the last flip of a condition when available, otherwise evaluate the decision tree.
+    # Only the tree's node objects trace and profile their evaluation, so traced and profiled runs walk them
+    # on every date.
     try:
-        decision_tree = build_decision_tree_from_specs(condition_specs, action_specs)
-        if decision_tree is None:
-            logging.error("Decision tree could not be built.")
-            return {}
-        order = decision_tree.evaluate(context)
-        logging.info(f"Decision Tree Evaluation Result: {order}")
+        leaf = None
+        flip_dates = additional_parameters.get('flip_dates')
+        if flip_dates:
+            position = bisect.bisect_right(flip_dates, midnight_dt) - 1
+            if position >= 0:
+                leaf = additional_parameters['flip_leaves'][position]
+        if tracing.TRACER.enabled or instrumentation.PROFILER.enabled:
+            order = compiled_strategy.decision_tree.evaluate(context)
+        elif leaf is not None:
+            order = leaf.evaluate(context)
+        elif compiled_strategy.compiled_tree is not None:
+            order = compiled_strategy.compiled_tree.evaluate(context)
+        else:
+            order = compiled_strategy.decision_tree.evaluate(context)
+        logging.info("Decision Tree Evaluation Result: %s", order)
     except Exception as e:
         logging.error(f"Error evaluating decision tree: {e}")
         return {}
@@ -61,47 +147,107 @@ def basket_creation_method(strategy, dt, positions, **additional_parameters):
     # Convert allocations to orders
     try:
         orders = {context['etfs'][symbol]: weight for symbol, weight in allocate_values(context['etfs'], order).items()}
-        logging.info(f"Generated Orders: {orders}")
+        logging.info("Generated Orders: %s", orders)
         return orders
     except Exception as e:
         logging.error(f"Error during order allocation: {e}")
         return {}
 
 
-def run_strategy(start_date, end_date, initial_cash, conditions_file, actions_file):
-    print('\n')
-    print('*'*30)
-    print('\n')
+def run_strategy(start_date, end_date, initial_cash, conditions_file, actions_file, engine='sigtech', etf_histories=None,
+                 price_cache=None, feature_store=None, progress=None):
+    """
+    Runs the strategy defined by the specification files.
 
-    print(f'DEBUG [run_strategy] start_date {start_date}, end_date {end_date}, initial_cash {initial_cash}, conditions_file {conditions_file}, actions_file {actions_file}')
-    # Initialize SigTech environment
-    sig.init()
-
-    # Define ETFs
-    etf_names = [
-        'TLT US EQUITY',
-        'TQQQ US EQUITY',
-        'SVXY US EQUITY',
-        'VIXY US EQUITY',
-        'QQQ UP EQUITY',
-        'SPY UP EQUITY',
-        'BND UP EQUITY',
-        'BIL UP EQUITY',
-        'GLD UP EQUITY',
-    ]
-    etfs = {name: sig.obj.get(name) for name in etf_names}
-    print(f'DEBUG [run_strategy] etfs: {etfs}')
-    # Retrieve ETF histories
-    etf_histories = {name: etfs[name].history() for name in etf_names}
-
-    # Prepare additional parameters
+    :param start_date: Start date of the backtest.
+    :param end_date: End date of the backtest.
+    :param initial_cash: Initial cash of the strategy.
+    :param conditions_file: Path to the conditions JSON file.
+    :param actions_file: Path to the actions JSON file.
+    :param engine: 'sigtech' to build a sig.DynamicStrategy, 'local' for the NumPy backtest engine.
+    :param etf_histories: Optional dictionary of ETF price histories. The local engine then runs without SigTech.
+    :param price_cache: PriceCache the histories are read from when `etf_histories` is not given.
+    :param feature_store: Optional FeatureStore of `etf_histories` holding the indicators of the conditions.
+                          Computed for the run when not given.
+    :param progress: Optional callable receiving the numbers of dates processed and to process during the run.
+    :return: Built sig.DynamicStrategy, or BacktestResult for the local engine. Both provide `history()`.
+    """
+    logging.debug(
+        "run_strategy: start_date %s, end_date %s, initial_cash %s, conditions_file %s, actions_file %s, engine %s",
+        start_date, end_date, initial_cash, conditions_file, actions_file, engine
+    )
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported engine: {engine}")
+
+    compiled_strategy = load_compiled_strategy(conditions_file, actions_file)
+
+    # Retrieve the histories of the tickers the strategy uses, served by the price cache when it is fresh
+    if etf_histories is None:
+        if compiled_strategy is None:
+            dependencies = StrategyDependencies({name: 0 for name in DEFAULT_ETF_NAMES})
+        else:
+            dependencies = analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs)
+        etf_histories = load_strategy_histories(dependencies, start_date, end_date, price_cache=price_cache)
+
+    if engine == 'sigtech':
+        etfs = get_sig_instruments(list(etf_histories))
+        logging.debug("run_strategy: etfs %s", etfs)
+    else:
+        etfs = {name: name for name in etf_histories}
+
+    # Compute every indicator referenced by the conditions once for the whole run
+    if feature_store is None:
+        if compiled_strategy is None:
+            logging.error("Invalid condition or action specifications. No features precomputed.")
+            feature_store = FeatureStore(etf_histories)
+        else:
+            feature_store = FeatureStore.from_specs(etf_histories, compiled_strategy.condition_specs)
+
+    example_dates = feature_store.calendar
+    run_dates = example_dates[(example_dates >= pd.Timestamp(start_date)) & (example_dates <= pd.Timestamp(end_date))]
+    batch_context = {'etf_histories': etf_histories, 'feature_store': feature_store}
+    if progress is not None:
+        progress(0, len(run_dates))
+
+    if engine == 'local':
+        if compiled_strategy is None:
+            raise ValueError("Invalid condition or action specifications. Strategy build aborted.")
+        leaves = compiled_strategy.decision_tree.evaluate_leaves(batch_context, run_dates)
+        weights = compiled_strategy.decision_tree.evaluate_series(batch_context, run_dates, leaves=leaves)
+        prices = build_price_panel(etf_histories, run_dates, weights.columns)
+        result = run_local_backtest(prices, weights, initial_cash)
+        result.decision_path = pd.Series([leaf.name for leaf in leaves], index=leaves.index)
+        if progress is not None:
+            progress(len(run_dates), len(run_dates))
+        return result
+
+    # Find the dates where a condition flips, so the daily callback only changes leaf on those dates.
+    # Not for profiled runs: their callback evaluates the nodes on every date, which would count them twice.
+    flip_calendar = None
+    if compiled_strategy is not None and not instrumentation.PROFILER.enabled:
+        try:
+            flip_calendar = compiled_strategy.decision_tree.flip_calendar(batch_context, run_dates)
+            logging.info(f"Flip calendar: {len(flip_calendar)} changes of leaf over {len(run_dates)} dates")
+        except Exception as e:
+            logging.warning(f"Batch evaluation failed, falling back to daily evaluation: {e}")
+
+    # Prepare additional parameters. The calendar and price matrix make the daily lookups O(1).
+    calendar = TradingCalendar(example_dates)
     additional_parameters = {
-        'example_dates': etf_histories[next(iter(etf_histories))].index.tolist(),
+        'calendar': calendar,
+        'price_matrix': PriceMatrix(etf_histories, calendar),
         'etf_histories': etf_histories,
+        'feature_store': feature_store,
+        'flip_dates': flip_calendar.index.to_pydatetime().tolist() if flip_calendar is not None else None,
+        'flip_leaves': flip_calendar.tolist() if flip_calendar is not None else None,
         'etfs': etfs,
+        'compiled_strategy': compiled_strategy,
         'conditions_file': conditions_file,
         'actions_file': actions_file,
     }
+    if progress is not None:
+        dates_done = itertools.count(1)
+        additional_parameters['progress'] = lambda: progress(next(dates_done), len(run_dates))
 
     # Initialize the Dynamic Strategy
     sig_strategy_object = sig.DynamicStrategy(
@@ -0,0 +1,216 @@
+"""
+Extension of saved local runs to later dates.
+
+A local run saves its end state with its result: the backtest's units, cash flow and last
+prices, and the streaming state of every indicator its conditions read. Extending the run feeds
+only the prices after its last date to those states, evaluates the decision tree and the backtest
+on the new dates and appends them to the stored series, instead of running again from the start date.
+"""
+from typing import Any, Dict, List, Optional
+import datetime as dtm
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import BacktestResult, build_price_panel, compute_nav_metrics, run_local_backtest
+from feature_store import FeatureStore, collect_feature_keys
+from spec_dependencies import analyze_specs
+from strategy_builder import load_compiled_strategy
+from strategy_execution import load_etf_histories
+from streaming_indicators import create_indicator_state, load_indicator_state
+from utils.result_store import DERIVED_META_KEYS, StoredResult, open_strategy_result, result_path, write_result
+
+# Metadata entry of a stored result holding the state a run resumes from
+RESUME_STATE_KEY = 'resume_state'
+
+
+def capture_resume_state(condition_specs: List[Dict[str, Any]], etf_histories: Dict[str, pd.Series],
+                         result: BacktestResult) -> Optional[Dict[str, Any]]:
+    """
+    Captures the state a local run resumes from: the backtest state and the streaming state of each feature.
+
+    :param condition_specs: Condition specifications of the run.
+    :param etf_histories: Histories the run read.
+    :param result: BacktestResult of the run.
+    :return: JSON-serializable dictionary, or None if the run cannot be resumed.
+    """
+    if result.state is None:
+        return None
+    last_date = result.nav.index[-1]
+
+    features = []
+    for key in collect_feature_keys(condition_specs):
+        name, etf, window = key
+        if etf not in etf_histories:
+            # The feature store reads 0 for the whole run
+            features.append({'key': list(key), 'state': None})
+            continue
+        try:
+            state = create_indicator_state(name, window)
+        except ValueError as e:
+            logging.warning(f"Run cannot be resumed: {e}")
+            return None
+        history = etf_histories[etf].loc[:last_date]
+        value = state.warm_up(history.to_numpy(dtype=float))
+        features.append({
+            'key': list(key),
+            'state': state.to_dict(),
+            'value': value,
+            'date': history.index[-1] if len(history) else None,
+        })
+
+    turnover = result.turnover.dropna()
+    return {
+        'date': last_date,
+        'backtest': result.state,
+        'features': features,
+        'turnover_sum': float(turnover.sum()),
+        'turnover_count': len(turnover),
+    }
+
+
+def _extend_feature(feature: Dict[str, Any], history: Optional[pd.Series], calendar: pd.DatetimeIndex):
+    """
+    Continues a feature on new dates, aligned to the calendar like `feature_store.compute_feature`.
+
+    :return: Tuple (values aligned to the calendar, feature state after the last new price).
+    """
+    name, _, _ = feature['key']
+    if feature['state'] is None or history is None:
+        return np.zeros(len(calendar)), feature
+
+    state = load_indicator_state(feature['state'])
+    if feature['date'] is not None:
+        history = history.loc[history.index > pd.Timestamp(feature['date'])]
+    values = np.array([state.update(price) for price in history.to_numpy(dtype=float)], dtype=float)
+
+    if name == 'cumulative return':
+        # Read as of the date: dates before the first new price keep the last value of the run
+        positions = history.index.searchsorted(calendar, side='right') - 1
+        previous = feature['value'] if feature['date'] is not None else 0.0
+    else:
+        # Read on the exact date, 0 when the ETF has no price on it
+        positions = history.index.get_indexer(calendar)
+        previous = 0.0
+    column = values[positions.clip(min=0)] if len(values) else np.zeros(len(calendar))
+    column = np.where(positions >= 0, column, previous)
+
+    extended = dict(feature)
+    if len(history):
+        extended.update(state=state.to_dict(), value=values[-1], date=history.index[-1])
+    return column, extended
+
+
+def extend_strategy(strategy_folder: str, end_date, etf_histories: Optional[Dict[str, pd.Series]] = None,
+                    price_cache=None, progress=None) -> StoredResult:
+    """
+    Extends the saved local run of a strategy to `end_date`, computing only the dates after its last one.
+
+    The extended result equals a run from the original start date to `end_date` on the same prices.
+
+    :param strategy_folder: Strategy folder holding the specification files and the result.
+    :param end_date: New end date of the run.
+    :param etf_histories: Optional histories covering the new dates. Read from the price cache when not given.
+    :param price_cache: PriceCache the histories are read from when `etf_histories` is not given.
+    :param progress: Optional callable receiving the numbers of dates processed and to process.
+    :return: StoredResult of the extended run, or the saved one if there are no new dates.
+    :raises ValueError: If the saved run cannot be extended.
+    """
+    stored_result = open_strategy_result(strategy_folder)
+    if stored_result is None:
+        raise ValueError(f"No saved run in {strategy_folder}")
+    resume_state = stored_result.get(RESUME_STATE_KEY)
+    if stored_result.get('engine') != 'local' or resume_state is None:
+        raise ValueError("Only local runs saved with their end state can be extended. Run the strategy again.")
+
+    compiled_strategy = load_compiled_strategy(os.path.join(strategy_folder, 'conditions.json'),
+                                               os.path.join(strategy_folder, 'actions.json'))
+    if compiled_strategy is None:
+        raise ValueError("Invalid condition or action specifications. Strategy build aborted.")
+    if (compiled_strategy.condition_specs != stored_result['conditions']
+            or compiled_strategy.action_specs != stored_result['actions']):
+        raise ValueError("The specifications changed since the saved run. Run the strategy again.")
+
+    # Only the prices after the last date of the run are read
+    last_date, end_date = pd.Timestamp(resume_state['date']), pd.Timestamp(end_date)
+    dependencies = analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs)
+    if etf_histories is None:
+        etf_histories = load_etf_histories(dependencies.tickers, end_date=end_date, price_cache=price_cache,
+                                           start_dates=dict.fromkeys(dependencies.tickers, last_date))
+    new_histories = {etf: etf_histories[etf].loc[(etf_histories[etf].index > last_date)
+                                                 & (etf_histories[etf].index <= end_date)]
+                     for etf in dependencies.tickers if etf in etf_histories}
+    calendar = pd.DatetimeIndex([])
+    for history in new_histories.values():
+        calendar = calendar.union(history.index)
+    if calendar.empty:
+        logging.info(f"No new dates to extend {strategy_folder} with")
+        return stored_result
+    if progress is not None:
+        progress(0, len(calendar))
+
+    columns, features = {}, []
+    for feature in resume_state['features']:
+        name, etf, window = feature['key']
+        columns[(name, etf, window)], extended_feature = _extend_feature(feature, new_histories.get(etf), calendar)
+        features.append(extended_feature)
+    feature_store = FeatureStore.from_columns(calendar, columns, new_histories)
+
+    batch_context = {'etf_histories': new_histories, 'feature_store': feature_store}
+    decision_tree = compiled_strategy.decision_tree
+    leaves = decision_tree.evaluate_leaves(batch_context, calendar)
+    weights = decision_tree.evaluate_series(batch_context, calendar, leaves=leaves)
+
+    # Columns keep the order of the run, so the NAV sums the positions in the same order as a full run
+    backtest_state = resume_state['backtest']
+    weights = weights.reindex(columns=list(dict.fromkeys([*backtest_state['columns'], *weights.columns])),
+                              fill_value=0.0)
+
+    # Prices of ETFs without a new price yet are carried from the last date of the run
+    prices = build_price_panel(new_histories, calendar, weights.columns)
+    last_prices = pd.Series(backtest_state['prices'], index=backtest_state['columns'], dtype=float)
+    prices = pd.concat([last_prices.reindex(prices.columns).to_frame(last_date).T, prices]).ffill().iloc[1:]
+    result = run_local_backtest(prices, weights, backtest_state['initial_cash'], sizing=backtest_state['sizing'],
+                                transaction_cost_bps=backtest_state['transaction_cost_bps'],
+                                initial_state=backtest_state)
+    if progress is not None:
+        progress(len(calendar), len(calendar))
+
+    performance = stored_result['performance']
+    nav = pd.concat([performance.iloc[:, 0], result.nav.rename(performance.columns[0])])
+    series = {'weights': result.weights, 'positions': result.positions}
+    for key, new_values in series.items():
+        if stored_result[key] is not None:
+            series[key] = pd.concat([stored_result[key], new_values.rename(columns=str)]).fillna(0.0)
+    decision_path = pd.Series([leaf.name for leaf in leaves], index=calendar)
+    if stored_result['decision_path'] is not None:
+        decision_path = pd.concat([stored_result['decision_path'].astype(object), decision_path])
+
+    turnover = result.turnover.dropna()
+    turnover_sum = resume_state['turnover_sum'] + float(turnover.sum())
+    turnover_count = resume_state['turnover_count'] + len(turnover)
+    metrics = compute_nav_metrics(nav)
+    metrics['turnover'] = np.nan if np.isnan(metrics['total_return']) or not turnover_count \
+        else turnover_sum / turnover_count
+
+    meta = {key: value for key, value in stored_result.meta.items() if key not in DERIVED_META_KEYS}
+    meta.update({
+        'end_date': end_date.date(),
+        'metrics': metrics,
+        'profile': None,
+        'run_key': None,
+        'cached': False,
+        'extended_at': dtm.datetime.now().isoformat(timespec='seconds'),
+        RESUME_STATE_KEY: {
+            'date': calendar[-1],
+            'backtest': result.state,
+            'features': features,
+            'turnover_sum': turnover_sum,
+            'turnover_count': turnover_count,
+        },
+    })
+    logging.info(f"Extended {strategy_folder} from {last_date.date()} to {calendar[-1].date()} ({len(calendar)} dates)")
+    return write_result(result_path(strategy_folder), meta, nav, weights=series['weights'],
+                        decision_path=decision_path, positions=series['positions'])
@@ -0,0 +1,257 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Dict, Iterable
+import math
+
+
+class IndicatorState(ABC):
+    """
+    Incremental counterpart of the batch indicators in `helper.py`.
+
+    `update` takes one new price and returns the indicator value after it in constant time.
+    The state round-trips through a JSON-serializable dictionary, so a run can be resumed
+    from a checkpoint without re-reading the price history.
+    """
+    name = None
+
+    def __init__(self, window: int):
+        self.window = int(window)
+
+    @abstractmethod
+    def update(self, price: float) -> float:
+        pass
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'IndicatorState':
+        pass
+
+    def warm_up(self, prices: Iterable[float]) -> float:
+        """
+        Feeds a sequence of prices to the state.
+
+        :param prices: Prices in chronological order.
+        :return: Indicator value after the last price (NaN if no price was given).
+        """
+        value = math.nan
+        for price in prices:
+            value = self.update(price)
+        return value
+
+
+class RsiState(IndicatorState):
+    """
+    Streaming RSI matching `get_rsi`: adjusted exponential averages of gains and losses with
+    com = window - 1, where older observations keep decaying across missing prices.
+    """
+    name = 'rsi'
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.decay = 1 - 1 / self.window
+        self.previous_price = None
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.weight_sum = 0.0
+        self.value = math.nan
+
+    def update(self, price: float) -> float:
+        delta = math.nan if self.previous_price is None else price - self.previous_price
+        self.previous_price = price
+
+        if math.isnan(delta):
+            # No new observation: existing weights decay, the averages are unchanged
+            self.gain_sum *= self.decay
+            self.loss_sum *= self.decay
+            self.weight_sum *= self.decay
+            return self.value
+
+        self.gain_sum = self.gain_sum * self.decay + max(delta, 0.0)
+        self.loss_sum = self.loss_sum * self.decay + max(-delta, 0.0)
+        self.weight_sum = self.weight_sum * self.decay + 1.0
+
+        avg_gain = self.gain_sum / self.weight_sum
+        avg_loss = self.loss_sum / self.weight_sum
+        if avg_loss == 0:
+            self.value = 100.0 if avg_gain > 0 else math.nan
+        else:
+            self.value = 100 - 100 / (1 + avg_gain / avg_loss)
+        return self.value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'indicator': self.name,
+            'window': self.window,
+            'previous_price': self.previous_price,
+            'gain_sum': self.gain_sum,
+            'loss_sum': self.loss_sum,
+            'weight_sum': self.weight_sum,
+            'value': self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'RsiState':
+        rsi_state = cls(state['window'])
+        rsi_state.previous_price = state['previous_price']
+        rsi_state.gain_sum = state['gain_sum']
+        rsi_state.loss_sum = state['loss_sum']
+        rsi_state.weight_sum = state['weight_sum']
+        rsi_state.value = state['value']
+        return rsi_state
+
+
+class VolatilityState(IndicatorState):
+    """
+    Streaming volatility matching `get_vol`: sample standard deviation of the last `window`
+    returns, kept with Welford updates over a ring buffer of returns.
+    """
+    name = 'volatility'
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.previous_price = None
+        self.returns = deque(maxlen=self.window)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.nan_count = 0
+
+    def _add(self, value: float):
+        if math.isnan(value):
+            self.nan_count += 1
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float):
+        if math.isnan(value):
+            self.nan_count -= 1
+            return
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def update(self, price: float) -> float:
+        if self.previous_price is None:
+            value = math.nan
+        else:
+            value = price / self.previous_price - 1
+        self.previous_price = price
+
+        if len(self.returns) == self.window:
+            self._remove(self.returns[0])
+        self.returns.append(value)
+        self._add(value)
+
+        # Like a pandas rolling window, any missing return in the window gives NaN
+        if len(self.returns) < self.window or self.nan_count > 0 or self.window < 2:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'indicator': self.name,
+            'window': self.window,
+            'previous_price': self.previous_price,
+            'returns': list(self.returns),
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'nan_count': self.nan_count,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'VolatilityState':
+        volatility_state = cls(state['window'])
+        volatility_state.previous_price = state['previous_price']
+        volatility_state.returns.extend(state['returns'])
+        volatility_state.count = state['count']
+        volatility_state.mean = state['mean']
+        volatility_state.m2 = state['m2']
+        volatility_state.nan_count = state['nan_count']
+        return volatility_state
+
+
+class CumulativeReturnState(IndicatorState):
+    """
+    Streaming cumulative return matching `get_cum_return`. The rolling product of the window's
+    (1 + return) terms is the ratio of the last price to the price `window` periods earlier,
+    so only the last `window` + 1 prices are kept, with the number of missing ones among them.
+    """
+    name = 'cumulative return'
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.prices = deque(maxlen=self.window + 1)
+        self.count = 0
+        self.nan_count = 0
+
+    def update(self, price: float) -> float:
+        if len(self.prices) == self.prices.maxlen and math.isnan(self.prices[0]):
+            self.nan_count -= 1
+        if math.isnan(price):
+            self.nan_count += 1
+        self.prices.append(price)
+        self.count += 1
+        if self.count < self.window:
+            return 0
+        if self.count == self.window or self.nan_count:
+            return math.nan
+        return price / self.prices[0] - 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'indicator': self.name,
+            'window': self.window,
+            'prices': list(self.prices),
+            'count': self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> 'CumulativeReturnState':
+        cumulative_return_state = cls(state['window'])
+        cumulative_return_state.prices.extend(state['prices'])
+        cumulative_return_state.count = state['count']
+        cumulative_return_state.nan_count = sum(math.isnan(price) for price in cumulative_return_state.prices)
+        return cumulative_return_state
+
+
+INDICATOR_STATES = {state_class.name: state_class for state_class in (RsiState, VolatilityState, CumulativeReturnState)}
+
+
+def create_indicator_state(indicator_name: str, window: int) -> IndicatorState:
+    """
+    Creates an empty streaming state for an indicator.
+
+    :param indicator_name: Name of the indicator (e.g., 'RSI', 'Volatility', 'Cumulative Return').
+    :param window: Window size for the indicator.
+    :return: IndicatorState object.
+    """
+    state_class = INDICATOR_STATES.get(indicator_name.lower())
+    if state_class is None:
+        raise ValueError(f"Unsupported indicator: {indicator_name}")
+    return state_class(window)
+
+
+def load_indicator_state(state: Dict[str, Any]) -> IndicatorState:
+    """
+    Restores a streaming state saved with `IndicatorState.to_dict`.
+
+    :param state: Dictionary returned by `to_dict`.
+    :return: IndicatorState object.
+    """
+    state_class = INDICATOR_STATES.get(state['indicator'])
+    if state_class is None:
+        raise ValueError(f"Unsupported indicator: {state['indicator']}")
+    return state_class.from_dict(state)
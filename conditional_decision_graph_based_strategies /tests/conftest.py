@@ -0,0 +1,4 @@
+import os
+
+# Tests run on the offline SigTech stand-in, never on the platform. See utils/sig_backend.py.
+os.environ['SIG_BACKEND'] = 'offline'
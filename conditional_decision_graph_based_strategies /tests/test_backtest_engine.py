@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from backtest_engine import run_local_backtest
+
+
+def make_inputs():
+    dates = pd.bdate_range('2021-01-01', periods=5)
+    prices = pd.DataFrame({'A': [10.0, 11.0, 12.0, 12.0, 6.0], 'B': [20.0, 20.0, 10.0, 10.0, 10.0]}, index=dates)
+    weights = pd.DataFrame({'A': [1.0, 1.0, 0.5, 0.5, 0.5], 'B': [0.0, 0.0, 0.5, 0.5, 0.5]}, index=dates)
+    return prices, weights
+
+
+def test_initial_cash_sizing_matches_action_node_orders():
+    prices, weights = make_inputs()
+    result = run_local_backtest(prices, weights, initial_cash=100.0)
+
+    expected_units = weights * 100.0 / prices
+    np.testing.assert_allclose(result.positions.to_numpy(), expected_units.to_numpy())
+    # NAV is cash left after each trade plus the market value of the units held
+    cash = 100.0 - ((expected_units.diff().fillna(expected_units)) * prices).sum(axis=1).cumsum()
+    np.testing.assert_allclose(result.history().to_numpy(), (cash + (expected_units * prices).sum(axis=1)).to_numpy())
+
+
+def test_nav_sizing_compounds_portfolio_returns():
+    prices, weights = make_inputs()
+    result = run_local_backtest(prices, weights, initial_cash=100.0, sizing='nav')
+
+    portfolio_returns = (weights.shift(1).fillna(0.0) * prices.pct_change().fillna(0.0)).sum(axis=1)
+    np.testing.assert_allclose(result.nav.to_numpy(), 100.0 * (1 + portfolio_returns).cumprod().to_numpy())
+    assert result.turnover.iloc[0] == 1.0
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from batch_runner import DONE, SKIPPED, discover_strategies, run_batch
+from spec_dependencies import analyze_specs
+from strategy_builder import load_compiled_strategy
+from strategy_execution import run_strategy
+from strategy_extension import RESUME_STATE_KEY
+from utils.catalog import StrategyCatalog
+from utils.result_store import open_strategy_result
+
+from test_decision_tree import make_histories
+
+STRATEGIES = ('strat1', 'strat3')
+
+
+@pytest.fixture
+def strategy_dir(tmp_path):
+    for name in STRATEGIES:
+        shutil.copytree(os.path.join('strategies', name), tmp_path / 'strategies' / name,
+                        ignore=shutil.ignore_patterns('result', 'strategy.pkl'))
+    os.makedirs(tmp_path / 'strategies' / 'empty')
+    return str(tmp_path / 'strategies')
+
+
+def single_run(strategy_dir, name, etf_histories, start_date, end_date):
+    conditions_file = os.path.join(strategy_dir, name, 'conditions.json')
+    actions_file = os.path.join(strategy_dir, name, 'actions.json')
+    compiled_strategy = load_compiled_strategy(conditions_file, actions_file)
+    dependencies = analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs)
+    return run_strategy(start_date, end_date, 100000, conditions_file, actions_file, engine='local',
+                        etf_histories=dependencies.restrict(etf_histories, start_date, end_date))
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_batch_matches_single_runs(strategy_dir, max_workers):
+    assert discover_strategies(strategy_dir) == list(STRATEGIES)
+    assert discover_strategies(strategy_dir, ['*3']) == ['strat3']
+
+    etfs = set()
+    for name in STRATEGIES:
+        compiled_strategy = load_compiled_strategy(os.path.join(strategy_dir, name, 'conditions.json'),
+                                                   os.path.join(strategy_dir, name, 'actions.json'))
+        etfs |= set(analyze_specs(compiled_strategy.condition_specs, compiled_strategy.action_specs).tickers)
+    histories = make_histories(sorted(etfs), periods=700)
+    start_date, end_date = pd.Timestamp('2020-03-02'), pd.Timestamp('2021-06-30')
+    summary = run_batch(strategy_dir, start_date=start_date, end_date=end_date, initial_cash=100000,
+                        max_workers=max_workers, etf_histories=histories)
+    assert list(summary['status']) == [DONE, DONE]
+
+    for name in STRATEGIES:
+        expected = single_run(strategy_dir, name, histories, start_date, end_date)
+        result = open_strategy_result(os.path.join(strategy_dir, name))
+        pd.testing.assert_series_equal(result['performance'].iloc[:, 0], expected.history(), check_names=False,
+                                       check_freq=False)
+        assert list(result['decision_path']) == list(expected.decision_path)
+        assert result[RESUME_STATE_KEY] is not None
+        assert StrategyCatalog(strategy_dir).search_runs(name)[0]['job_id'] == result['batch_id']
+
+    # Later batches keep the start date and initial cash of the saved runs
+    summary = run_batch(strategy_dir, patterns=['strat1'], end_date=end_date, max_workers=1, etf_histories=histories)
+    assert summary.loc[0, 'start_date'] == start_date and summary.loc[0, 'initial_cash'] == 100000
+
+
+def test_strategies_without_a_start_date_are_skipped(strategy_dir):
+    summary = run_batch(strategy_dir, end_date='2021-06-30', max_workers=1, etf_histories=make_histories(['SPY']))
+    assert list(summary['status']) == [SKIPPED, SKIPPED]
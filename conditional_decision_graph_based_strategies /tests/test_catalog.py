@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pytest
+
+from backtest_engine import compute_nav_metrics
+from utils.catalog import CATALOG_FILE, StrategyCatalog
+from utils.result_store import list_results, result_path, write_result
+
+
+def test_catalog_indexes_strategies_specs_and_runs(tmp_path):
+    strategy_dir = tmp_path / 'strategies'
+    strategy_dir.mkdir()
+    for name in ('momentum', 'Mean Reversion', 'rsi_100%'):
+        (strategy_dir / name).mkdir()
+    nav = pd.Series([100.0, 101.0, 99.0, 103.0], index=pd.bdate_range('2022-01-03', periods=4), name='NAV')
+    meta = {'engine': 'local', 'start_date': '2022-01-03', 'end_date': '2022-01-06', 'initial_cash': 100.0,
+            'conditions': [], 'actions': {}, 'metrics': compute_nav_metrics(nav)}
+    write_result(result_path(str(strategy_dir / 'momentum')), meta, nav)
+
+    catalog = StrategyCatalog(str(strategy_dir))
+    catalog.sync()
+    # The database stays out of the strategy directory, whose entries are all scanned as strategy folders
+    assert os.path.isfile(tmp_path / CATALOG_FILE) and CATALOG_FILE not in os.listdir(strategy_dir)
+    assert [meta['path'] for meta in list_results(str(strategy_dir))] == [result_path(str(strategy_dir / 'momentum'))]
+    assert catalog.strategy_names() == ['Mean Reversion', 'momentum', 'rsi_100%']
+    assert [row['name'] for row in catalog.search_strategies('m')] == ['Mean Reversion', 'momentum']
+    assert [row['name'] for row in catalog.search_strategies('*100%')] == ['rsi_100%']
+    assert catalog.search_strategies('mom')[0]['runs'] == 1
+
+    # Syncing again does not record the stored result twice
+    catalog.sync()
+    runs = catalog.search_runs(engine='local', order_by='sharpe')
+    assert len(runs) == 1 and runs[0]['total_return'] == pytest.approx(0.03)
+    assert catalog.search_runs(min_sharpe=runs[0]['sharpe'] + 1) == []
+
+    catalog.record_spec('momentum', 'actions', {'a': {'SPY': 1.0}})
+    catalog.record_spec('momentum', 'actions', {'a': {'SPY': 1.0}})
+    catalog.record_spec('momentum', 'actions', {'a': {'TLT': 1.0}})
+    assert [version['content'] for version in catalog.spec_versions('momentum', 'actions')] == [
+        {'a': {'TLT': 1.0}}, {'a': {'SPY': 1.0}}
+    ]
+
+    (strategy_dir / 'rsi_100%').rmdir()
+    catalog.sync()
+    assert 'rsi_100%' not in catalog.strategy_names()
+
+
+def test_legacy_catalog_is_moved_out_of_the_strategy_directory(tmp_path):
+    strategy_dir = tmp_path / 'strategies'
+    (strategy_dir / 'momentum').mkdir(parents=True)
+    StrategyCatalog(str(strategy_dir), db_path=str(strategy_dir / CATALOG_FILE)).add_strategy('momentum')
+    # Files next to the strategy folders are skipped by the folder scans
+    assert list_results(str(strategy_dir)) == []
+
+    catalog = StrategyCatalog(str(strategy_dir))
+    assert catalog.db_path == str(tmp_path / CATALOG_FILE)
+    assert catalog.strategy_names() == ['momentum']
+    assert CATALOG_FILE not in os.listdir(strategy_dir)
@@ -0,0 +1,29 @@
+import os
+
+import strategy_builder
+from strategy_builder import invalidate_compiled_strategies, load_compiled_strategy
+from utils import data_utils
+from utils.data_utils import add_write_listener, load_actions, load_conditions, save_actions, save_conditions
+
+
+def test_saves_notify_write_listeners_and_invalidate_compiled_strategies(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_utils, '_write_listeners', [])
+    written = []
+    add_write_listener(written.append)
+    add_write_listener(invalidate_compiled_strategies)
+
+    conditions_file = str(tmp_path / 'conditions.json')
+    actions_file = str(tmp_path / 'actions.json')
+    strategy_folder = os.path.join('strategies', 'strat1')
+    save_conditions(conditions_file, load_conditions(os.path.join(strategy_folder, 'conditions.json')))
+    save_actions(actions_file, load_actions(os.path.join(strategy_folder, 'actions.json')))
+    assert written == [conditions_file, actions_file]
+
+    compiled_strategy = load_compiled_strategy(conditions_file, actions_file)
+    assert compiled_strategy is not None
+    assert load_compiled_strategy(conditions_file, actions_file) is compiled_strategy
+
+    # Rewriting a file drops the compiled strategy even if its signature is unchanged
+    save_conditions(conditions_file, compiled_strategy.condition_specs)
+    cache_key = (os.path.abspath(conditions_file), os.path.abspath(actions_file))
+    assert cache_key not in strategy_builder._COMPILED_STRATEGIES
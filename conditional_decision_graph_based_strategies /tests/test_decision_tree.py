@@ -0,0 +1,128 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_tree import OPERATOR_CODES, OPERATOR_FUNCTIONS, compile_tree
+from feature_store import FeatureStore
+from graph_factory import ActionNode, DecisionNode, DecisionTree
+from strategy_builder import build_decision_tree_from_specs
+
+STRATEGY_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'strategies', 'strat1')
+
+
+def load_specs():
+    with open(os.path.join(STRATEGY_FOLDER, 'conditions.json')) as f:
+        conditions = json.load(f)
+    with open(os.path.join(STRATEGY_FOLDER, 'actions.json')) as f:
+        actions = json.load(f)
+    return conditions, actions
+
+
+def make_histories(etfs, periods=400):
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range('2019-01-01', periods=periods)
+    return {
+        etf: pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates)))), index=dates)
+        for etf in etfs
+    }
+
+
+def test_evaluate_series_matches_daily_evaluation():
+    conditions, actions = load_specs()
+    etfs = {etf for allocations in actions.values() for etf in allocations}
+    etfs |= {'QQQ UP EQUITY', 'VIXY US EQUITY', 'BND UP EQUITY', 'BIL UP EQUITY'}
+    histories = make_histories(sorted(etfs))
+    tree = build_decision_tree_from_specs(conditions, actions)
+    store = FeatureStore.from_specs(histories, conditions)
+
+    dates = store.calendar[30:]
+    batch_context = {'etf_histories': histories, 'feature_store': store}
+    leaves = tree.evaluate_leaves(batch_context, dates)
+    weights = tree.evaluate_series(batch_context, dates)
+    assert len({id(leaf) for leaf in leaves}) > 1
+
+    for date in dates:
+        context = {
+            'etf_histories': histories,
+            'feature_store': store,
+            'midnight_dt': date,
+            'size_date': date,
+            'initial_cash': 100000,
+        }
+        assert tree.evaluate(context) == leaves[date].evaluate(context)
+        expected_weights = {etf: weights.loc[date, etf] for etf in leaves[date].allocations}
+        assert expected_weights == leaves[date].allocations
+        assert weights.loc[date].sum() == sum(leaves[date].allocations.values())
+
+
+def test_flip_calendar_holds_the_leaf_between_flips():
+    conditions, actions = load_specs()
+    etfs = {etf for allocations in actions.values() for etf in allocations}
+    etfs |= {'QQQ UP EQUITY', 'VIXY US EQUITY', 'BND UP EQUITY', 'BIL UP EQUITY'}
+    histories = make_histories(sorted(etfs))
+    tree = build_decision_tree_from_specs(conditions, actions)
+    store = FeatureStore.from_specs(histories, conditions)
+
+    dates = store.calendar[30:]
+    batch_context = {'etf_histories': histories, 'feature_store': store}
+    leaves = tree.evaluate_leaves(batch_context, dates)
+    flip_calendar = tree.flip_calendar(batch_context, dates)
+
+    assert flip_calendar.index[0] == dates[0] and len(flip_calendar) < len(dates)
+    held = flip_calendar.reindex(dates, method='ffill')
+    assert [leaf.name for leaf in held] == [leaf.name for leaf in leaves]
+    assert all(a is not b for a, b in zip(flip_calendar.iloc[1:], flip_calendar.iloc[:-1]))
+
+
+def test_compiled_tree_matches_decision_tree():
+    conditions, actions = load_specs()
+    etfs = {etf for allocations in actions.values() for etf in allocations}
+    etfs |= {'QQQ UP EQUITY', 'VIXY US EQUITY', 'BND UP EQUITY', 'BIL UP EQUITY'}
+    histories = make_histories(sorted(etfs))
+    tree = build_decision_tree_from_specs(conditions, actions)
+    compiled = compile_tree(tree)
+    store = FeatureStore.from_specs(histories, conditions)
+
+    dates = store.calendar[30:]
+    batch_context = {'etf_histories': histories, 'feature_store': store}
+    leaves = tree.evaluate_leaves(batch_context, dates)
+    leaf_ids = compiled.evaluate_leaf_ids(batch_context, dates)
+    assert [compiled.leaves[i].name for i in leaf_ids] == [leaf.name for leaf in leaves]
+
+    for date in dates[::5]:
+        context = dict(batch_context, midnight_dt=date, size_date=date, initial_cash=100000)
+        assert compiled.evaluate(context) == tree.evaluate(context)
+
+
+def test_both_engines_share_the_operator_dispatch():
+    node = DecisionNode({'name': 'RSI', 'etf': 'SPY UP EQUITY'}, 5, '>', 50, None, None)
+    values = np.array([40.0, 50.0, 60.0, np.nan])
+    for symbol, code in OPERATOR_CODES.items():
+        np.testing.assert_array_equal(node.compare(values, symbol, 50), OPERATOR_FUNCTIONS[code](values, 50))
+    with pytest.raises(ValueError):
+        node.compare(1, '!=', 2)
+
+
+def test_compiled_tree_evaluates_deep_trees_iteratively():
+    histories = make_histories(['SPY UP EQUITY'], periods=50)
+    node = ActionNode({'SPY UP EQUITY': 1.0}, name='leaf')
+    for depth in range(5000):
+        node = DecisionNode({'name': 'RSI', 'etf': 'SPY UP EQUITY'}, 5, '>=', -1, node, node)
+    compiled = compile_tree(DecisionTree(node))
+
+    date = histories['SPY UP EQUITY'].index[-1]
+    context = {'etf_histories': histories, 'midnight_dt': date, 'size_date': date, 'initial_cash': 100}
+    assert compiled.evaluate_leaf(context).name == 'leaf'
+    assert len(compiled.features) == 1
+
+
+def test_shared_features_are_registered_once():
+    conditions, actions = load_specs()
+    tree = build_decision_tree_from_specs(conditions, actions)
+    # Cumulative Return(BND UP EQUITY, 60) is read by a node and by its own dynamic threshold
+    assert tree.feature_table.references == 6
+    assert len(tree.feature_table.keys) == 5
+    assert tree.feature_table.evaluations_saved == 1
@@ -0,0 +1,65 @@
+import datetime as dtm
+
+import numpy as np
+import pandas as pd
+
+from evaluation_context import EvaluationContext, PriceMatrix, TradingCalendar, size_price
+from feature_store import FeatureStore
+from strategy_builder import build_decision_tree_from_specs
+from test_decision_tree import load_specs, make_histories
+
+
+def test_price_matrix_matches_series_asof():
+    histories = make_histories(['A', 'B'], periods=60)
+    # B starts later and misses some dates
+    histories['B'] = histories['B'].iloc[10:].drop(histories['B'].index[[20, 21, 35]])
+    calendar = TradingCalendar(histories['A'].index)
+    price_matrix = PriceMatrix(histories, calendar)
+
+    dates = list(histories['A'].index) + [pd.Timestamp('2018-12-31'), pd.Timestamp('2019-01-05'),
+                                          pd.Timestamp('2020-01-01')]
+    for date in dates:
+        for etf, history in histories.items():
+            np.testing.assert_equal(price_matrix.asof(etf, date), history.asof(date))
+    assert price_matrix.asof('C', dates[0]) is None
+
+    assert dtm.datetime(2019, 1, 1) in calendar and dtm.datetime(2019, 1, 5) not in calendar
+    assert calendar.position(pd.Timestamp('2019-01-02')) == 1
+    assert calendar.asof_position(pd.Timestamp('2019-01-06')) == calendar.position(pd.Timestamp('2019-01-04'))
+
+
+def test_context_resolves_the_size_row_of_a_non_trading_date():
+    histories = make_histories(['A', 'B'], periods=30)
+    calendar = TradingCalendar(histories['A'].index)
+    price_matrix = PriceMatrix(histories, calendar)
+    friday, sunday = pd.Timestamp('2019-01-04'), dtm.datetime(2019, 1, 6, 15, 30)
+    assert sunday not in calendar
+
+    context = EvaluationContext(pd.Timestamp('2019-01-07'), sunday, 100000, histories, calendar=calendar,
+                                price_matrix=price_matrix)
+    assert context.size_position == calendar.position(friday)
+    assert calendar.day_positions[pd.Timestamp('2019-01-05')] == calendar.position(friday)
+    for etf, history in histories.items():
+        assert size_price(context, etf) == history.asof(sunday)
+        assert size_price({'price_matrix': price_matrix, 'size_date': sunday}, etf) == history.asof(sunday)
+    assert calendar.asof_position(pd.Timestamp('2030-01-01')) == len(calendar) - 1
+
+
+def test_tree_evaluates_the_typed_context_like_a_dictionary():
+    conditions, actions = load_specs()
+    etfs = {etf for allocations in actions.values() for etf in allocations}
+    etfs |= {'QQQ UP EQUITY', 'VIXY US EQUITY', 'BND UP EQUITY', 'BIL UP EQUITY'}
+    histories = make_histories(sorted(etfs))
+    tree = build_decision_tree_from_specs(conditions, actions)
+    store = FeatureStore.from_specs(histories, conditions)
+    calendar = TradingCalendar(store.calendar)
+    price_matrix = PriceMatrix(histories, calendar)
+
+    for date in store.calendar[30::7]:
+        context = EvaluationContext(date, date, 100000, histories, feature_store=store, calendar=calendar,
+                                    price_matrix=price_matrix)
+        expected = tree.evaluate({'etf_histories': histories, 'feature_store': store, 'midnight_dt': date,
+                                  'size_date': date, 'initial_cash': 100000})
+        assert tree.evaluate(context) == expected
+        assert context.position == calendar.position(date) and context['feature_values'] is not None
+        assert {**context, 'midnight_dt': None}['initial_cash'] == 100000
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureStore
+from helper import get_indicator_value
+
+
+def make_histories():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', periods=300)
+    histories = {
+        etf: pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates)))), index=dates)
+        for etf in ['QQQ UP EQUITY', 'BND UP EQUITY']
+    }
+    # A shorter history exercises dates missing from one of the ETFs
+    histories['BIL UP EQUITY'] = histories['BND UP EQUITY'].iloc[40:] * 0.5
+    return histories
+
+
+def test_feature_store_matches_per_call_indicators():
+    histories = make_histories()
+    indicators = [('RSI', 20), ('Volatility', 11), ('Cumulative Return', 60)]
+    keys = [(name.lower(), etf, window) for name, window in indicators for etf in histories]
+    store = FeatureStore(histories, keys)
+
+    for date in store.calendar[::7]:
+        for name, window in indicators:
+            for etf in histories:
+                indicator = {'name': name, 'etf': etf}
+                expected = get_indicator_value({'etf_histories': histories, 'midnight_dt': date}, indicator, window)
+                actual = get_indicator_value(
+                    {'etf_histories': histories, 'midnight_dt': date, 'feature_store': store}, indicator, window
+                )
+                np.testing.assert_allclose(actual, expected, rtol=1e-12, equal_nan=True)
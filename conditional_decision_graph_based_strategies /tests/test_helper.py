@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helper import get_cum_return, get_cum_return_series
+
+
+def rolling_product_cum_return_series(data, window):
+    # Formula get_cum_return used before it became a price ratio
+    returns = data.pct_change()
+    cumulative_returns = (returns + 1).rolling(window).apply(lambda x: x.prod(), raw=True) - 1
+    cumulative_returns.iloc[:window - 1] = 0
+    return cumulative_returns
+
+
+@pytest.mark.parametrize('window', [1, 5, 20])
+def test_cum_return_matches_the_rolling_product(window):
+    rng = np.random.default_rng(4)
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 120))),
+                       index=pd.bdate_range('2021-01-01', periods=120))
+    # Interior missing prices, one of them at the end of a window
+    prices.iloc[[40, 41, 90]] = np.nan
+
+    expected = rolling_product_cum_return_series(prices, window)
+    np.testing.assert_allclose(get_cum_return_series(prices, window), expected, rtol=1e-9, atol=1e-12, equal_nan=True)
+    for end in range(1, len(prices) + 1):
+        np.testing.assert_allclose(get_cum_return(prices.iloc[:end], window), expected.iloc[end - 1], rtol=1e-9,
+                                   atol=1e-12, equal_nan=True, err_msg=f"{end} prices")
+    # Warm-up: 0 before the window is filled, NaN while it holds the first date, which has no return
+    assert (expected.iloc[:window - 1] == 0).all() and np.isnan(get_cum_return(prices.iloc[:window], window))
+    assert get_cum_return(prices.iloc[:window - 1], window) == 0
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+
+import strategy_execution
+from feature_store import FeatureStore
+from instrumentation import PROFILER, profile
+from spec_dependencies import analyze_specs
+from strategy_builder import build_decision_tree_from_specs
+from strategy_execution import run_strategy
+from test_decision_tree import load_specs, make_histories
+from utils import offline_sig
+from utils.decision_tree_utils import generate_dot
+from utils.synthetic_data import generate_prices
+
+
+def test_profiler_counts_calls_and_branches():
+    conditions, actions = load_specs()
+    etfs = {etf for allocations in actions.values() for etf in allocations}
+    etfs |= {'QQQ UP EQUITY', 'VIXY US EQUITY', 'BND UP EQUITY', 'BIL UP EQUITY'}
+    histories = make_histories(sorted(etfs))
+    tree = build_decision_tree_from_specs(conditions, actions)
+    store = FeatureStore.from_specs(histories, conditions)
+    dates = store.calendar[30:]
+
+    tree.evaluate_leaves({'etf_histories': histories, 'feature_store': store}, dates)
+    assert not PROFILER.stats
+
+    with profile() as profiler:
+        leaves = tree.evaluate_leaves({'etf_histories': histories, 'feature_store': store}, dates)
+    summary = profiler.summary()
+
+    root = summary['decision_node_root']
+    assert root['calls'] == len(dates) == root['true'] + root['false']
+    assert root['true'] == sum(leaf.name == 'SPY/TLT 50/50' for leaf in leaves)
+    assert summary['decision_node_volatility']['calls'] == root['false']
+    assert not np.isnan(root['p99_ns'])
+    assert ('indicator', 'RSI(QQQ UP EQUITY, 20)') in profiler.report().index
+
+    # The flip calendar records the same branch frequencies
+    with profile() as flip_profiler:
+        tree.flip_calendar({'etf_histories': histories, 'feature_store': store}, dates)
+    for name, stats in flip_profiler.summary().items():
+        assert (stats['calls'], stats['true']) == (summary[name]['calls'], summary[name]['true'])
+
+    dot = generate_dot(conditions, actions, profile=summary)
+    assert f"True ({root['true']}, " in dot and 'penwidth=' in dot
+
+
+def test_profiled_sigtech_runs_record_the_nodes_every_date(tmp_path, monkeypatch):
+    conditions, actions = load_specs()
+    histories = generate_prices(analyze_specs(conditions, actions).tickers, '2019-01-01', periods=300, seed=3)
+    for name, specs in (('conditions.json', conditions), ('actions.json', actions)):
+        with open(tmp_path / name, 'w') as f:
+            json.dump(specs, f)
+    monkeypatch.setattr(strategy_execution, 'sig', offline_sig)
+
+    dates = next(iter(histories.values())).index
+    offline_sig.set_market_data(histories)
+    try:
+        with profile() as profiler:
+            run_strategy(dates[200], dates[-1], 100000, str(tmp_path / 'conditions.json'),
+                         str(tmp_path / 'actions.json'), engine='sigtech', etf_histories=histories)
+    finally:
+        offline_sig.clear_market_data()
+    # The compiled tree and the flip calendar would skip the daily timings: the callback walks the node objects
+    root = profiler.summary()['decision_node_root']
+    assert root['calls'] == len(dates) - 200 == root['true'] + root['false']
+    assert len(profiler.stats[('node', 'decision_node_root')].samples) == len(dates) - 200
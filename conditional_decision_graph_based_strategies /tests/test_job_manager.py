@@ -0,0 +1,73 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from job_manager import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobCancelled, JobManager, JobProgress
+from utils.result_store import open_strategy_result
+
+
+@pytest.fixture
+def manager(tmp_path):
+    shutil.copytree(os.path.join('strategies', 'strat1'), tmp_path / 'strategies' / 'strat1')
+    manager = JobManager(str(tmp_path / 'jobs'), str(tmp_path / 'strategies'), str(tmp_path / 'price_cache'),
+                         str(tmp_path / 'run_cache'), max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_job_runs_in_a_worker_and_saves_its_result(manager, tmp_path):
+    job_id = manager.submit('strat1', '2020-01-01', '2020-12-31', 100000, engine='local')
+    assert manager.status(job_id)['strategy_name'] == 'strat1'
+
+    assert manager.wait(job_id, timeout=120) == DONE
+    job = manager.status(job_id)
+    assert job['dates_done'] == job['dates_total'] > 200
+    result = open_strategy_result(str(tmp_path / 'strategies' / 'strat1'))
+    assert len(result['performance']) == len(result['decision_path']) == job['dates_total']
+    assert [job['job_id'] for job in manager.list_jobs('strat1')] == [job_id]
+    assert not job['cached'] and not result['cached']
+
+    # The same run again is served from the run cache
+    repeat_id = manager.submit('strat1', '2020-01-01', '2020-12-31', 100000, engine='local')
+    assert manager.wait(repeat_id, timeout=120) == DONE
+    assert manager.status(repeat_id)['cached']
+    repeat = open_strategy_result(str(tmp_path / 'strategies' / 'strat1'))
+    assert repeat['cached'] and repeat['run_key'] == result['run_key']
+    pd.testing.assert_frame_equal(repeat['performance'], result['performance'])
+    pd.testing.assert_frame_equal(repeat['positions'], result['positions'])
+
+
+def test_cancelled_jobs_stop_reporting(manager, tmp_path):
+    running = manager.submit('strat1', '2020-01-01', '2020-12-31', 100000, engine='local')
+    queued = manager.submit('strat1', '2020-01-01', '2020-12-31', 100000, engine='local')
+    manager.cancel(queued)
+    manager.wait(running, timeout=120)
+    assert manager.wait(queued, timeout=120) == CANCELLED
+
+    progress = JobProgress(manager.jobs_dir, running)
+    manager.cancel(running)
+    with pytest.raises(JobCancelled):
+        progress.report(1, 10)
+
+
+def test_only_jobs_of_exited_processes_are_marked_interrupted(tmp_path):
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    jobs_dir = str(tmp_path / 'jobs')
+    os.makedirs(jobs_dir)
+    JobProgress(jobs_dir, 'orphan').update(job_id='orphan', status=RUNNING, pid=exited.pid, manager_pid=exited.pid)
+    JobProgress(jobs_dir, 'running').update(job_id='running', status=RUNNING, pid=os.getpid())
+    JobProgress(jobs_dir, 'queued').update(job_id='queued', status=QUEUED, manager_pid=os.getpid())
+
+    manager = JobManager(jobs_dir, str(tmp_path / 'strategies'), str(tmp_path / 'price_cache'),
+                         str(tmp_path / 'run_cache'), max_workers=1)
+    try:
+        assert manager.status('orphan')['status'] == FAILED
+        assert manager.status('running')['status'] == RUNNING
+        assert manager.status('queued')['status'] == QUEUED
+    finally:
+        manager.shutdown()
@@ -0,0 +1,53 @@
+import importlib.util
+import json
+
+import numpy as np
+import pytest
+
+import strategy_execution
+from spec_dependencies import analyze_specs
+from strategy_execution import run_strategy
+from test_decision_tree import load_specs
+from utils import offline_sig
+from utils.sig_backend import load_sig_backend, selected_sig_backend
+from utils.synthetic_data import generate_prices
+
+
+def test_generator_is_seeded_and_independent_of_the_other_tickers():
+    both = generate_prices(['A', 'B'], '2000-01-03', periods=500, seed=3)
+    alone = generate_prices(['B'], '2000-01-03', periods=500, seed=3)
+    np.testing.assert_array_equal(both['B'].to_numpy(), alone['B'].to_numpy())
+    assert not np.array_equal(both['A'].to_numpy(), both['B'].to_numpy())
+    assert len(generate_prices(2000, '1975-01-01', '2024-12-31', model='gbm')) == 2000
+
+
+def test_offline_dynamic_strategy_matches_local_engine(tmp_path, monkeypatch):
+    conditions, actions = load_specs()
+    histories = generate_prices(analyze_specs(conditions, actions).tickers, '2015-01-01', periods=800, seed=7)
+    for name, specs in (('conditions.json', conditions), ('actions.json', actions)):
+        with open(tmp_path / name, 'w') as f:
+            json.dump(specs, f)
+    monkeypatch.setattr(strategy_execution, 'sig', offline_sig)
+    monkeypatch.setattr('utils.price_cache.sig', offline_sig)
+    offline_sig.set_market_data(histories)
+
+    dates = next(iter(histories.values())).index
+    args = (dates[300], dates[-1], 100000, str(tmp_path / 'conditions.json'), str(tmp_path / 'actions.json'))
+    try:
+        offline = run_strategy(*args, engine='sigtech', etf_histories=histories)
+    finally:
+        offline_sig.clear_market_data()
+    local = run_strategy(*args, engine='local', etf_histories=histories)
+
+    assert offline.history().index.equals(local.history().index)
+    np.testing.assert_allclose(offline.history().to_numpy(), local.history().to_numpy(), rtol=1e-9)
+
+
+def test_offline_backend_is_opt_in(monkeypatch):
+    monkeypatch.delenv('SIG_BACKEND')
+    assert selected_sig_backend() == 'sigtech'
+    assert load_sig_backend('offline') is offline_sig
+    if importlib.util.find_spec('sigtech') is None:
+        # A missing SigTech installation is an error, never a silent switch to synthetic prices
+        with pytest.raises(ImportError, match='SIG_BACKEND=offline'):
+            load_sig_backend()
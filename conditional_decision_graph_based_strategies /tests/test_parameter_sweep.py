@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from backtest_engine import compute_metrics
+from parameter_sweep import apply_parameter, expand_sweep, run_sweep
+from spec_dependencies import analyze_specs
+from strategy_execution import run_strategy
+from utils.synthetic_data import generate_prices
+
+from test_decision_tree import load_specs
+
+PARAMETERS = [
+    {'node': 'decision_node_root', 'field': 'threshold', 'values': [60, 70]},
+    {'node': 'decision_node_cum_return', 'field': 'threshold.window', 'values': [40, 60]},
+    {'action': 'SPY/TLT 50/50', 'etf': 'SPY UP EQUITY', 'values': [0.3, 0.5]},
+]
+
+
+def test_expand_sweep_builds_the_grid_and_rescales_action_weights():
+    conditions, actions = load_specs()
+    variants = expand_sweep(conditions, actions, PARAMETERS)
+
+    assert len(variants) == 8
+    assert variants[-1]['parameters'] == {
+        'decision_node_root.threshold': 70,
+        'decision_node_cum_return.threshold.window': 60,
+        'SPY/TLT 50/50.SPY UP EQUITY': 0.5,
+    }
+    variant = variants[0]
+    assert variant['conditions'][0]['threshold'] == 60
+    assert variant['conditions'][2]['threshold']['window'] == 40
+    assert variant['actions']['SPY/TLT 50/50'] == pytest.approx({'SPY UP EQUITY': 0.3, 'TLT US EQUITY': 0.7})
+    # The base specifications are left untouched
+    assert (conditions, actions) == load_specs()
+
+    with pytest.raises(ValueError):
+        apply_parameter(conditions, actions, {'node': 'decision_node_root', 'field': 'threshold.window'}, 10)
+    with pytest.raises(ValueError):
+        apply_parameter(conditions, actions, {'action': 'unknown', 'etf': 'SPY UP EQUITY'}, 0.5)
+
+
+def test_run_sweep_matches_single_runs(tmp_path):
+    conditions, actions = load_specs()
+    variants = expand_sweep(conditions, actions, PARAMETERS[:1] + PARAMETERS[2:])
+    histories = generate_prices(analyze_specs(conditions, actions).tickers, '2019-01-01', periods=500)
+    args = (histories, '2019-06-03', '2020-06-30', 100000)
+
+    table = run_sweep(variants, *args, rank_by='sharpe', max_workers=1)
+    parallel = run_sweep(variants, *args, rank_by='sharpe', max_workers=2)
+    assert list(table['sharpe']) == sorted(table['sharpe'], reverse=True)
+    assert table.equals(parallel)
+    assert table['total_return'].nunique() == len(variants)
+
+    labels = list(variants[0]['parameters'])
+    for variant in variants:
+        conditions_file, actions_file = tmp_path / 'conditions.json', tmp_path / 'actions.json'
+        conditions_file.write_text(json.dumps(variant['conditions']))
+        actions_file.write_text(json.dumps(variant['actions']))
+        expected = compute_metrics(run_strategy('2019-06-03', '2020-06-30', 100000, str(conditions_file),
+                                                str(actions_file), engine='local', etf_histories=histories))
+        row = table[(table[labels] == list(variant['parameters'].values())).all(axis=1)].iloc[0]
+        for metric, value in expected.items():
+            np.testing.assert_allclose(row[metric], value, rtol=1e-12, err_msg=metric)
@@ -0,0 +1,143 @@
+import datetime as dtm
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils import offline_sig
+from utils.price_store import TICKERS_FILE, PriceStore
+from utils.price_cache import (OFFLINE_PRICE_CACHE_DIR, FilePriceSource, PriceCache, SigTechPriceSource,
+                               default_price_cache_dir, save_price_files)
+
+
+class CountingSource(FilePriceSource):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.calls = []
+
+    def fetch(self, ticker, start_date=None):
+        self.calls.append((ticker, start_date))
+        return super().fetch(ticker, start_date)
+
+
+def make_history(periods):
+    dates = pd.bdate_range('2022-01-03', periods=periods)
+    return pd.Series(100 + np.arange(periods, dtype=float) / 8, index=dates)
+
+
+def test_price_cache_serves_fresh_reads_locally_and_fetches_only_the_tail(tmp_path):
+    source = CountingSource(str(tmp_path / 'source'))
+    save_price_files(source.directory, {'SPY UP EQUITY': make_history(100)})
+    cache = PriceCache(str(tmp_path / 'cache'), source=source)
+
+    first = cache.get(['SPY UP EQUITY'])['SPY UP EQUITY']
+    second = PriceCache(str(tmp_path / 'cache'), source=source).get(['SPY UP EQUITY'])['SPY UP EQUITY']
+    assert source.calls == [('SPY UP EQUITY', None)]
+    pd.testing.assert_series_equal(first, second)
+
+    # New prices arrive and the cache has expired: only the tail is fetched
+    full = make_history(130)
+    save_price_files(source.directory, {'SPY UP EQUITY': full})
+    stale = PriceCache(str(tmp_path / 'cache'), source=source, max_age=dtm.timedelta(0))
+    refreshed = stale.get(['SPY UP EQUITY'])['SPY UP EQUITY']
+    assert source.calls[-1] == ('SPY UP EQUITY', first.index[-1].isoformat())
+    np.testing.assert_array_equal(refreshed.to_numpy(), full.to_numpy())
+    assert refreshed.index.equals(full.index)
+
+    # A history already covering the requested end date is served even when expired
+    stale.get(['SPY UP EQUITY'], end_date=full.index[-1])
+    assert len(source.calls) == 2
+
+
+def test_price_cache_fetches_only_the_window_a_run_needs(tmp_path):
+    source = CountingSource(str(tmp_path / 'source'))
+    full = make_history(100)
+    save_price_files(source.directory, {'SPY UP EQUITY': full})
+    cache = PriceCache(str(tmp_path / 'cache'), source=source)
+
+    history = cache.get(['SPY UP EQUITY'], start_dates={'SPY UP EQUITY': full.index[60]})['SPY UP EQUITY']
+    assert source.calls == [('SPY UP EQUITY', full.index[60].isoformat())]
+    assert history.index.equals(full.index[60:])
+    # Later windows are served from the cache, earlier ones are fetched from their start
+    cache.get(['SPY UP EQUITY'], start_dates={'SPY UP EQUITY': full.index[70]})
+    assert len(source.calls) == 1
+    history = cache.get(['SPY UP EQUITY'], start_dates={'SPY UP EQUITY': full.index[10]})['SPY UP EQUITY']
+    assert source.calls[-1] == ('SPY UP EQUITY', full.index[10].isoformat())
+    assert history.index.equals(full.index[10:])
+    cache.get(['SPY UP EQUITY'])
+    assert source.calls[-1] == ('SPY UP EQUITY', None)
+
+
+def test_reads_are_served_from_the_memory_mapped_store(tmp_path):
+    source = FilePriceSource(str(tmp_path / 'source'))
+    save_price_files(source.directory, {'SPY UP EQUITY': make_history(100), 'TLT US EQUITY': make_history(50)})
+    cache = PriceCache(str(tmp_path / 'cache'), source=source, max_age=dtm.timedelta(0))
+
+    cache.get(['SPY UP EQUITY'])
+    store = cache.open_store(['SPY UP EQUITY'])
+    assert isinstance(store.columns['SPY UP EQUITY'][1], np.memmap) and list(store) == ['SPY UP EQUITY']
+
+    # A refresh rewrites the refreshed tickers and adds the new ones; the store mapped before stays readable
+    save_price_files(source.directory, {'SPY UP EQUITY': make_history(120)})
+    histories = cache.get(['SPY UP EQUITY', 'TLT US EQUITY'])
+    assert len(histories['SPY UP EQUITY']) == 120 and len(histories['TLT US EQUITY']) == 50
+    assert len(store['SPY UP EQUITY']) == 100
+    assert list(PriceStore.open(str(tmp_path / 'cache' / 'store'))) == ['SPY UP EQUITY', 'TLT US EQUITY']
+
+    # Refreshing one ticker leaves the files of the others untouched
+    manifest_file = tmp_path / 'cache' / 'store' / TICKERS_FILE
+    before = json.loads(manifest_file.read_text())
+    cache.refresh('SPY UP EQUITY')
+    cache.open_store(['SPY UP EQUITY', 'TLT US EQUITY'])
+    after = json.loads(manifest_file.read_text())
+    assert after['TLT US EQUITY'] == before['TLT US EQUITY'] and after['SPY UP EQUITY'] != before['SPY UP EQUITY']
+
+
+def test_sigtech_source_requests_only_the_tail(monkeypatch):
+    requested = []
+
+    class Instrument(offline_sig.Instrument):
+        def history(self, datetime_start=None):
+            requested.append(datetime_start)
+            return super().history(datetime_start)
+
+    history = make_history(100)
+    monkeypatch.setattr('utils.price_cache.sig.obj.get', lambda ticker: Instrument(ticker, history))
+    tail = SigTechPriceSource().fetch('SPY UP EQUITY', start_date=history.index[90].isoformat())
+    assert requested == [history.index[90]]
+    assert tail.index.equals(history.index[90:])
+
+
+def test_concurrent_caches_keep_each_others_index_entries(tmp_path):
+    source = FilePriceSource(str(tmp_path / 'source'))
+    save_price_files(source.directory, {'SPY UP EQUITY': make_history(100), 'TLT US EQUITY': make_history(50)})
+    first = PriceCache(str(tmp_path / 'cache'), source=source)
+    second = PriceCache(str(tmp_path / 'cache'), source=source)
+
+    first.get(['SPY UP EQUITY'])
+    second.get(['TLT US EQUITY'])
+    assert set(PriceCache(str(tmp_path / 'cache'), source=source).index) == {'SPY UP EQUITY', 'TLT US EQUITY'}
+
+
+def test_histories_of_another_source_are_fetched_again(tmp_path):
+    class OtherSource(CountingSource):
+        @property
+        def name(self):
+            return 'other'
+
+    source = CountingSource(str(tmp_path / 'source'))
+    save_price_files(source.directory, {'SPY UP EQUITY': make_history(100)})
+    PriceCache(str(tmp_path / 'cache'), source=source).get(['SPY UP EQUITY'])
+
+    other = OtherSource(source.directory)
+    cache = PriceCache(str(tmp_path / 'cache'), source=other)
+    assert not cache.is_fresh('SPY UP EQUITY')
+    cache.get(['SPY UP EQUITY'])
+    assert other.calls == [('SPY UP EQUITY', None)]
+    assert cache.index['SPY UP EQUITY']['source'] == 'other'
+
+
+def test_offline_prices_have_their_own_cache_directory():
+    # The tests run with SIG_BACKEND=offline, see conftest.py
+    assert SigTechPriceSource().name == 'offline'
+    assert default_price_cache_dir() == OFFLINE_PRICE_CACHE_DIR
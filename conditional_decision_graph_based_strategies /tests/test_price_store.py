@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureStore
+from utils.price_store import (DATES_SUFFIX, PRICES_SUFFIX, TICKERS_FILE, PriceStore, update_price_store,
+                               write_price_store)
+
+
+def make_histories():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range('2020-01-01', periods=200)
+    histories = {
+        etf: pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates)))), index=dates)
+        for etf in ['SPY UP EQUITY', 'TLT US EQUITY']
+    }
+    # A shorter history with a gap exercises dates missing from one ticker
+    histories['GLD UP EQUITY'] = histories['TLT US EQUITY'].iloc[30:].drop(dates[100])
+    return histories
+
+
+def test_price_store_round_trips_histories(tmp_path):
+    histories = make_histories()
+    write_price_store(str(tmp_path), histories)
+    store = PriceStore.open(str(tmp_path))
+
+    assert list(store) == list(histories)
+    for etf, history in histories.items():
+        pd.testing.assert_series_equal(store[etf], history, check_names=False, check_freq=False)
+        # Histories are views on the ticker's own mapped file
+        dates, prices = store.columns[etf]
+        assert isinstance(prices, np.memmap) and np.shares_memory(store[etf].to_numpy(), prices)
+    assert sorted(os.listdir(tmp_path)) == sorted([TICKERS_FILE] + [
+        stem + suffix for stem in json.loads((tmp_path / TICKERS_FILE).read_text()).values()
+        for suffix in (DATES_SUFFIX, PRICES_SUFFIX)
+    ])
+
+    window = store.between('2020-03-02', '2020-04-30')
+    assert window.calendar[0] == pd.Timestamp('2020-03-02') and window.calendar[-1] == pd.Timestamp('2020-04-30')
+    pd.testing.assert_series_equal(
+        window['GLD UP EQUITY'], histories['GLD UP EQUITY'].loc['2020-03-02':'2020-04-30'],
+        check_names=False, check_freq=False
+    )
+    assert np.shares_memory(window['GLD UP EQUITY'].to_numpy(), store.columns['GLD UP EQUITY'][1])
+    pd.testing.assert_frame_equal(store.frame(), pd.DataFrame(histories), check_freq=False)
+
+
+def test_price_store_is_a_drop_in_for_etf_histories(tmp_path):
+    histories = make_histories()
+    store = write_price_store(str(tmp_path), histories)
+    keys = [('rsi', 'GLD UP EQUITY', 14), ('cumulative return', 'SPY UP EQUITY', 20)]
+
+    expected = FeatureStore(histories, keys)
+    actual = FeatureStore(store, keys)
+    for key in keys:
+        np.testing.assert_array_equal(actual.columns[key], expected.columns[key])
+
+
+def test_rewriting_a_store_keeps_mapped_stores_readable(tmp_path):
+    histories = make_histories()
+    store = write_price_store(str(tmp_path / 'store'), histories)
+    write_price_store(str(tmp_path / 'store'), {'SPY UP EQUITY': histories['SPY UP EQUITY'].iloc[:10]})
+    pd.testing.assert_series_equal(store['SPY UP EQUITY'], histories['SPY UP EQUITY'], check_names=False,
+                                   check_freq=False)
+    assert list(PriceStore.open(str(tmp_path / 'store'))) == ['SPY UP EQUITY']
+    assert sorted(os.listdir(tmp_path)) == ['store']
+
+
+def test_updating_a_store_rewrites_only_the_given_tickers(tmp_path):
+    histories = make_histories()
+    store = write_price_store(str(tmp_path), histories)
+    stems = json.loads((tmp_path / TICKERS_FILE).read_text())
+
+    longer = histories['TLT US EQUITY'].iloc[:150]
+    updated = update_price_store(str(tmp_path), {'TLT US EQUITY': longer, 'QQQ UP EQUITY': longer})
+    assert list(updated) == list(histories) + ['QQQ UP EQUITY']
+    pd.testing.assert_series_equal(updated['TLT US EQUITY'], longer, check_names=False, check_freq=False)
+    new_stems = json.loads((tmp_path / TICKERS_FILE).read_text())
+    assert new_stems['SPY UP EQUITY'] == stems['SPY UP EQUITY'] and new_stems['TLT US EQUITY'] != stems['TLT US EQUITY']
+    assert not (tmp_path / (stems['TLT US EQUITY'] + PRICES_SUFFIX)).exists()
+    # The replaced files were unlinked, not truncated: the store mapped before still reads them
+    pd.testing.assert_series_equal(store['TLT US EQUITY'], histories['TLT US EQUITY'], check_names=False,
+                                   check_freq=False)
@@ -0,0 +1,59 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from utils.result_store import LEGACY_RESULT_FILE, MIGRATED_SUFFIX, StoredResult, list_results, \
+    open_strategy_result, result_path, write_result
+
+
+def make_run():
+    dates = pd.bdate_range('2021-01-01', periods=50)
+    nav = pd.Series(100000 * np.exp(np.linspace(0, 0.1, len(dates))), index=dates, name='strat NAV')
+    weights = pd.DataFrame({'SPY UP EQUITY': 0.6, 'TLT US EQUITY': 0.4}, index=dates)
+    decision_path = pd.Series(np.where(np.arange(len(dates)) % 7 < 3, 'risk_on', 'risk_off'), index=dates)
+    return nav, weights, decision_path
+
+
+def test_result_round_trips_lazily(tmp_path):
+    nav, weights, decision_path = make_run()
+    meta = {'name': 'strat', 'start_date': nav.index[0].date(), 'initial_cash': 100000, 'profile': None}
+    write_result(str(tmp_path), meta, nav, weights=weights, decision_path=decision_path)
+
+    result = StoredResult.open(str(tmp_path))
+    assert result['name'] == 'strat' and result['start_date'] == '2021-01-01'
+    assert result._series == {}
+    pd.testing.assert_series_equal(result['performance']['strat NAV'], nav, check_freq=False)
+    assert isinstance(result['performance']['strat NAV'].to_numpy(), np.ndarray)
+    pd.testing.assert_frame_equal(result['weights'], weights, check_freq=False)
+    assert list(result['decision_path'].astype(str)) == list(decision_path)
+    assert result['profile_report'] is None
+
+
+def test_legacy_pickle_is_migrated(tmp_path):
+    nav, _, _ = make_run()
+    strategy_folder = tmp_path / 'strat'
+    strategy_folder.mkdir()
+    with open(strategy_folder / LEGACY_RESULT_FILE, 'wb') as f:
+        pickle.dump({'name': 'strat', 'start_date': nav.index[0].date(), 'performance': nav.to_frame()}, f)
+
+    result = open_strategy_result(str(strategy_folder))
+    pd.testing.assert_series_equal(result['performance']['strat NAV'], nav, check_freq=False)
+    assert not os.path.exists(strategy_folder / LEGACY_RESULT_FILE)
+    assert os.path.exists(str(strategy_folder / LEGACY_RESULT_FILE) + MIGRATED_SUFFIX)
+    assert [meta['path'] for meta in list_results(str(tmp_path))] == [result_path(str(strategy_folder))]
+
+
+def test_rewriting_a_result_keeps_mapped_series_readable(tmp_path):
+    nav, weights, _ = make_run()
+    path = str(tmp_path / 'result')
+    result = write_result(path, {'name': 'strat'}, nav, weights=weights)
+    mapped_nav = result['performance']['strat NAV']
+
+    # A shorter run replaces the result, as a new job or an extension would
+    write_result(path, {'name': 'strat'}, nav.iloc[:10] * 2)
+    pd.testing.assert_series_equal(mapped_nav, nav, check_freq=False)
+    rewritten = StoredResult.open(path)
+    assert len(rewritten['performance']) == 10 and rewritten['weights'] is None
+    assert os.listdir(tmp_path) == ['result']
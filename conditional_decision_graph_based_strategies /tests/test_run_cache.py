@@ -0,0 +1,57 @@
+import os
+import shutil
+
+import pandas as pd
+
+from spec_dependencies import analyze_specs
+from test_decision_tree import load_specs
+from utils.result_store import StoredResult, write_result
+from utils.run_cache import RunCache, run_cache_key
+from utils.synthetic_data import generate_prices
+
+
+def test_key_covers_specs_cash_and_data():
+    conditions, actions = load_specs()
+    dependencies = analyze_specs(conditions, actions)
+    histories = generate_prices(dependencies.tickers, '2019-01-01', periods=300)
+    args = (dependencies, '2019-06-03', '2020-01-31', 100000, 'local')
+
+    key = run_cache_key(conditions, actions, *args, histories)
+    assert run_cache_key(list(conditions), dict(reversed(list(actions.items()))), *args, histories) == key
+    assert run_cache_key(conditions, actions, *args[:3], 200000, 'local', histories) != key
+    assert run_cache_key(conditions, actions, *args, histories, data_source='offline') != key
+    revised = {**histories, dependencies.tickers[0]: histories[dependencies.tickers[0]] * 1.001}
+    assert run_cache_key(conditions, actions, *args, revised) != key
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    nav = pd.Series([100.0, 101.0, 102.0], index=pd.bdate_range('2022-01-03', periods=3), name='NAV')
+    result = write_result(str(tmp_path / 'result'), {'name': 'strat'}, nav)
+    cache = RunCache(str(tmp_path / 'cache'), max_entries=2)
+
+    cache.put('a', result)
+    cache.put('b', result)
+    os.utime(os.path.join(cache.cache_dir, 'a', 'last_used'), (0, 0))
+    os.utime(os.path.join(cache.cache_dir, 'b', 'last_used'), (1, 1))
+    assert cache.get('a') is not None
+    cache.put('c', result)
+
+    assert [key for key, _, _ in cache.entries()] == ['a', 'c']
+    assert cache.get('b') is None
+    pd.testing.assert_series_equal(cache.get('c')['performance']['NAV'], nav, check_freq=False)
+
+
+def test_entry_evicted_while_being_read_is_a_miss(tmp_path, monkeypatch):
+    nav = pd.Series([100.0, 101.0], index=pd.bdate_range('2022-01-03', periods=2), name='NAV')
+    cache = RunCache(str(tmp_path / 'cache'))
+    cache.put('a', write_result(str(tmp_path / 'result'), {'name': 'strat'}, nav))
+
+    open_result = StoredResult.open
+
+    def open_then_evict(path):
+        result = open_result(path)
+        shutil.rmtree(path)
+        return result
+
+    monkeypatch.setattr(StoredResult, 'open', staticmethod(open_then_evict))
+    assert cache.get('a') is None
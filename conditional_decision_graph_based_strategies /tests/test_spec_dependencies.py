@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from feature_store import FeatureStore, collect_feature_keys
+from spec_dependencies import RSI_WARMUP_FACTOR, analyze_specs
+from strategy_execution import load_strategy_histories
+from utils.price_cache import FilePriceSource, PriceCache, save_price_files
+from test_decision_tree import load_specs, make_histories
+
+
+def test_analyze_specs_finds_reachable_tickers_and_lookbacks():
+    conditions, actions = load_specs()
+    actions = {**actions, 'Unused': {'XLE UP EQUITY': 1.0}}
+    dependencies = analyze_specs(conditions, actions)
+
+    assert 'XLE UP EQUITY' not in dependencies.lookbacks
+    # The longest of the two RSI windows on QQQ
+    assert dependencies.lookbacks['QQQ UP EQUITY'] == 31 * RSI_WARMUP_FACTOR
+    assert dependencies.lookbacks['VIXY US EQUITY'] == 12
+    assert dependencies.lookbacks['BIL UP EQUITY'] == 61
+    assert dependencies.lookbacks['GLD UP EQUITY'] == 1
+
+
+def test_restricted_histories_reproduce_features_over_the_run():
+    conditions, actions = load_specs()
+    dependencies = analyze_specs(conditions, actions)
+    histories = make_histories(dependencies.tickers + ['XLE UP EQUITY'], periods=900)
+    start_date, end_date = histories['XLE UP EQUITY'].index[[500, 700]]
+
+    restricted = dependencies.restrict(histories, start_date, end_date)
+    assert set(restricted) == set(dependencies.tickers)
+    assert all(len(restricted[etf]) < len(histories[etf]) for etf in restricted)
+
+    keys = collect_feature_keys(conditions)
+    run_dates = pd.bdate_range(start_date, end_date)
+    full = FeatureStore(histories, keys)
+    partial = FeatureStore(restricted, keys)
+    for key in keys:
+        expected = full.values(*key, run_dates)
+        actual = partial.values(*key, run_dates)
+        # Only the RSI is approximated, through its warm-up
+        np.testing.assert_allclose(actual, expected, rtol=1e-12 if key[0] != 'rsi' else 1e-4)
+
+
+def test_strategy_histories_are_fetched_from_their_lookback(tmp_path):
+    conditions, actions = load_specs()
+    dependencies = analyze_specs(conditions, actions)
+    histories = make_histories(dependencies.tickers, periods=900)
+    source = FilePriceSource(str(tmp_path / 'source'))
+    save_price_files(source.directory, histories)
+    cache = PriceCache(str(tmp_path / 'cache'), source=source)
+    start_date, end_date = histories['GLD UP EQUITY'].index[[500, 700]]
+
+    load_strategy_histories(dependencies, start_date, end_date, price_cache=cache)
+    for ticker in dependencies.tickers:
+        assert cache.index[ticker]['start_date'] == dependencies.history_start(ticker, start_date).isoformat()
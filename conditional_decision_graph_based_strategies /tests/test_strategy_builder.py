@@ -1,5 +1,14 @@
-from strategy_builder import build_decision_tree_from_specs
+import json
+import os
+
+import strategy_execution
+from spec_dependencies import analyze_specs
+from strategy_builder import build_decision_tree_from_specs, load_compiled_strategy
+from strategy_execution import run_strategy
+from test_decision_tree import load_specs
+from utils import offline_sig
 from utils.data_utils import load_conditions, load_actions
+from utils.synthetic_data import generate_prices
 
 actions = load_actions('actions.json')
 conditions = load_actions('conditions.json')
@@ -8,4 +17,49 @@ if __name__ == '__main__':
     build_decision_tree_from_specs(
         condition_specs=conditions,
         action_specs=actions,
-    )
\ No newline at end of file
+    )
+
+def test_compiled_strategies_are_rebuilt_only_when_the_files_change(tmp_path):
+    conditions_file, actions_file = tmp_path / 'conditions.json', tmp_path / 'actions.json'
+    with open(os.path.join('strategies', 'strat1', 'conditions.json')) as f:
+        conditions_file.write_text(f.read())
+    with open(os.path.join('strategies', 'strat1', 'actions.json')) as f:
+        actions_file.write_text(f.read())
+
+    compiled_strategy = load_compiled_strategy(str(conditions_file), str(actions_file))
+    assert compiled_strategy is not None
+    assert load_compiled_strategy(str(conditions_file), str(actions_file)) is compiled_strategy
+
+    # A new mtime with the same content is resolved by the content hash without rebuilding
+    os.utime(conditions_file, ns=(0, 0))
+    assert load_compiled_strategy(str(conditions_file), str(actions_file)) is compiled_strategy
+
+    specs = json.loads(conditions_file.read_text())
+    specs[0]['threshold'] = 75
+    conditions_file.write_text(json.dumps(specs))
+    rebuilt = load_compiled_strategy(str(conditions_file), str(actions_file))
+    assert rebuilt is not compiled_strategy and rebuilt.condition_specs == specs
+
+
+def test_sigtech_runs_resolve_the_compiled_strategy_once(tmp_path, monkeypatch):
+    conditions, actions = load_specs()
+    histories = generate_prices(analyze_specs(conditions, actions).tickers, '2019-01-01', periods=300, seed=3)
+    for name, specs in (('conditions.json', conditions), ('actions.json', actions)):
+        with open(tmp_path / name, 'w') as f:
+            json.dump(specs, f)
+    calls = []
+
+    def counting_load(*files):
+        calls.append(files)
+        return load_compiled_strategy(*files)
+
+    monkeypatch.setattr(strategy_execution, 'sig', offline_sig)
+    monkeypatch.setattr(strategy_execution, 'load_compiled_strategy', counting_load)
+    dates = next(iter(histories.values())).index
+    offline_sig.set_market_data(histories)
+    try:
+        run_strategy(dates[200], dates[-1], 100000, str(tmp_path / 'conditions.json'), str(tmp_path / 'actions.json'),
+                     engine='sigtech', etf_histories=histories)
+    finally:
+        offline_sig.clear_market_data()
+    assert len(calls) == 1
@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import run_local_backtest
+from spec_dependencies import analyze_specs
+from strategy_execution import run_strategy
+from strategy_extension import RESUME_STATE_KEY, capture_resume_state, extend_strategy
+from test_backtest_engine import make_inputs
+from test_decision_tree import load_specs
+from utils.result_store import result_path, write_result
+from utils.synthetic_data import generate_prices
+
+
+def test_resumed_backtest_equals_single_backtest():
+    prices, weights = make_inputs()
+    for sizing in ('initial_cash', 'nav'):
+        full = run_local_backtest(prices, weights, 100.0, sizing=sizing, transaction_cost_bps=10.0)
+        head = run_local_backtest(prices.iloc[:2], weights.iloc[:2], 100.0, sizing=sizing, transaction_cost_bps=10.0)
+        tail = run_local_backtest(prices.iloc[2:], weights.iloc[2:], 100.0, sizing=sizing, transaction_cost_bps=10.0,
+                                  initial_state=head.state)
+        np.testing.assert_array_equal(pd.concat([head.nav, tail.nav]), full.nav)
+        np.testing.assert_array_equal(pd.concat([head.positions, tail.positions]), full.positions)
+
+
+def test_extended_run_equals_full_run(tmp_path):
+    strategy_folder = str(tmp_path / 'strat1')
+    shutil.copytree(os.path.join('strategies', 'strat1'), strategy_folder, ignore=shutil.ignore_patterns('*.pkl'))
+    conditions_file = os.path.join(strategy_folder, 'conditions.json')
+    actions_file = os.path.join(strategy_folder, 'actions.json')
+    conditions, actions = load_specs()
+    dependencies = analyze_specs(conditions, actions)
+    histories = generate_prices(dependencies.tickers, '2018-01-01', periods=900)
+    start_date, end_date, extended_date = '2019-06-03', '2020-06-30', '2021-06-30'
+
+    # Saved run up to end_date, as written by the job worker
+    run_histories = dependencies.restrict(histories, start_date, end_date)
+    result = run_strategy(start_date, end_date, 100000, conditions_file, actions_file, engine='local',
+                          etf_histories=run_histories)
+    write_result(result_path(strategy_folder), {
+        'name': 'strat1', 'start_date': start_date, 'end_date': end_date, 'initial_cash': 100000, 'engine': 'local',
+        'conditions': conditions, 'actions': actions,
+        RESUME_STATE_KEY: capture_resume_state(conditions, run_histories, result),
+    }, result.nav.rename('strat1 NAV'), weights=result.weights, decision_path=result.decision_path,
+        positions=result.positions)
+
+    extended = extend_strategy(strategy_folder, extended_date, etf_histories=histories)
+    full = run_strategy(start_date, extended_date, 100000, conditions_file, actions_file, engine='local',
+                        etf_histories=dependencies.restrict(histories, start_date, extended_date))
+
+    assert extended['end_date'] == '2021-06-30'
+    assert len(extended['performance']) == len(full.nav) > len(result.nav)
+    assert list(extended['decision_path'].astype(str)) == list(full.decision_path)
+    np.testing.assert_array_equal(extended['performance']['strat1 NAV'], full.nav)
+    np.testing.assert_array_equal(extended['positions'].to_numpy(), full.positions.to_numpy())
+    np.testing.assert_array_equal(extended['weights'].to_numpy(), full.weights.to_numpy())
+
+    # Extending again to the same date has nothing left to compute
+    assert extend_strategy(strategy_folder, extended_date, etf_histories=histories).meta == extended.meta
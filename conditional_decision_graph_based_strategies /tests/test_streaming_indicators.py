@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from helper import get_cum_return_series, get_rsi, get_vol
+from streaming_indicators import create_indicator_state, load_indicator_state
+
+
+def make_prices():
+    rng = np.random.default_rng(2)
+    prices = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1500))))
+    prices.iloc[700] = np.nan
+    return prices
+
+
+def test_streaming_states_match_batch_indicators():
+    prices = make_prices()
+    batch = {
+        'RSI': get_rsi(prices, 14),
+        'Volatility': get_vol(prices, 20),
+        'Cumulative Return': get_cum_return_series(prices, 60),
+    }
+    for name, expected in batch.items():
+        window = {'RSI': 14, 'Volatility': 20, 'Cumulative Return': 60}[name]
+        state = create_indicator_state(name, window)
+        values = []
+        for i, price in enumerate(prices):
+            if i == 1000:
+                # Resume from a JSON checkpoint half way through the history
+                state = load_indicator_state(json.loads(json.dumps(state.to_dict())))
+            values.append(state.update(price))
+        np.testing.assert_allclose(values, expected.to_numpy(), rtol=1e-9, atol=1e-12, equal_nan=True)
@@ -0,0 +1,76 @@
+import json
+
+import pandas as pd
+
+import strategy_execution
+import tracing
+from graph_factory import ActionNode, DecisionNode
+from spec_dependencies import analyze_specs
+from strategy_execution import run_strategy
+from test_decision_tree import load_specs
+from utils import offline_sig
+from utils.synthetic_data import generate_prices
+
+
+def make_tree():
+    low = ActionNode({'A': 1.0}, name='low')
+    high = ActionNode({'B': 1.0}, name='high')
+    return DecisionNode({'name': 'Cumulative Return', 'etf': 'A'}, 1, '>', 0.0, high, low, name='root')
+
+
+def run(tree, histories, dates):
+    for date in dates:
+        tree.evaluate({'etf_histories': histories, 'midnight_dt': date, 'size_date': date, 'initial_cash': 100})
+
+
+def test_tracing_is_off_by_default_and_samples_when_enabled(caplog):
+    dates = pd.bdate_range('2021-01-04', periods=8)
+    # Up, up, down, down... so the branch taken changes every other date
+    prices = pd.Series([100, 101, 102, 101, 100, 101, 102, 101, 100], index=pd.bdate_range('2021-01-01', periods=9))
+    histories = {'A': prices, 'B': prices}
+    tree = make_tree()
+    caplog.set_level(tracing.TRACE, logger='decision_tree')
+
+    run(tree, histories, dates)
+    assert not caplog.records
+
+    try:
+        tracing.enable_tracing(every=2)
+        run(tree, histories, dates)
+        # One decision and one action record on every other date
+        assert len(caplog.records) == 8
+        assert caplog.records[0].getMessage().startswith(
+            '[DecisionNode] 2021-01-04 00:00:00 root: Cumulative Return(A, 1)'
+        )
+
+        caplog.clear()
+        tracing.enable_tracing(on_branch_change=True, nodes=['root'])
+        run(tree, histories, dates)
+        branches = [record.getMessage().endswith('True branch') for record in caplog.records]
+        assert branches == [True, False, True, False]
+    finally:
+        tracing.disable_tracing()
+
+
+def test_sigtech_callback_traces_the_nodes(tmp_path, monkeypatch, caplog):
+    conditions, actions = load_specs()
+    histories = generate_prices(analyze_specs(conditions, actions).tickers, '2019-01-01', periods=300, seed=3)
+    for name, specs in (('conditions.json', conditions), ('actions.json', actions)):
+        with open(tmp_path / name, 'w') as f:
+            json.dump(specs, f)
+    monkeypatch.setattr(strategy_execution, 'sig', offline_sig)
+    caplog.set_level(tracing.TRACE, logger='decision_tree')
+
+    dates = next(iter(histories.values())).index
+    args = (dates[200], dates[-1], 100000, str(tmp_path / 'conditions.json'), str(tmp_path / 'actions.json'))
+    offline_sig.set_market_data(histories)
+    try:
+        tracing.enable_tracing(nodes=['decision_node_root'])
+        run_strategy(*args, engine='sigtech', etf_histories=histories)
+    finally:
+        tracing.disable_tracing()
+        offline_sig.clear_market_data()
+    # The callback goes through the flip calendar, yet the root is traced on every date
+    messages = [record.getMessage() for record in caplog.records if record.name == 'decision_tree']
+    assert len(messages) == len(dates) - 200
+    assert all(message.startswith('[DecisionNode]') and 'decision_node_root' in message for message in messages)
@@ -0,0 +1,136 @@
+from typing import Iterable, Optional
+import logging
+
+
+# Level below DEBUG for the per-node trace
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+
+logger = logging.getLogger('decision_tree')
+
+
+class LazyLabel:
+    """
+    Defers building a node label until a log record is actually formatted.
+    """
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    def __str__(self):
+        return self.node.get_label()
+
+
+class Tracer:
+    """
+    Per-node trace of decision tree evaluations, disabled by default.
+
+    Nodes only test `enabled` on the hot path; everything else, including sampling and message
+    formatting, happens when tracing is on. Messages are passed to the `decision_tree` logger
+    with %-style arguments, so they are formatted only if the logger emits them.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.level = TRACE
+        self.every = 1
+        self.on_branch_change = False
+        self.nodes = None
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the sampling state (date counter and last branches).
+        """
+        self._date = None
+        self._date_count = -1
+        self._branches = {}
+
+    def configure(
+        self,
+        enabled: bool = True,
+        level: int = TRACE,
+        every: int = 1,
+        on_branch_change: bool = False,
+        nodes: Optional[Iterable[str]] = None
+    ):
+        """
+        Configures the trace.
+
+        :param enabled: Turns the trace on or off.
+        :param level: Logging level of the trace messages.
+        :param every: Trace every Nth evaluated date only.
+        :param on_branch_change: Trace a node only when its outcome differs from its previous evaluation.
+        :param nodes: Names of the nodes to trace. Defaults to every node.
+        """
+        self.enabled = enabled
+        self.level = level
+        self.every = max(int(every), 1)
+        self.on_branch_change = on_branch_change
+        self.nodes = set(nodes) if nodes is not None else None
+        self.reset()
+
+    def _sampled(self, node, context, outcome, key=None) -> bool:
+        if self.nodes is not None and node.name not in self.nodes:
+            return False
+        if not logger.isEnabledFor(self.level):
+            return False
+
+        date = context.get('midnight_dt')
+        if date != self._date:
+            self._date = date
+            self._date_count += 1
+        if self._date_count % self.every:
+            return False
+
+        if self.on_branch_change:
+            key = id(node) if key is None else key
+            previous = self._branches.get(key, self)
+            self._branches[key] = outcome
+            return previous is self or previous != outcome
+        return True
+
+    def decision(self, node, context, indicator_value, threshold_value, condition_met):
+        """
+        Traces the evaluation of a DecisionNode.
+        """
+        if self._sampled(node, context, condition_met):
+            logger.log(
+                self.level, "[DecisionNode] %s %s: %s = %s, threshold %s -> %s branch",
+                context.get('midnight_dt'), node.name, LazyLabel(node), indicator_value, threshold_value,
+                'True' if condition_met else 'False'
+            )
+
+    def action(self, node, context, allocations):
+        """
+        Traces the orders of an ActionNode. With `on_branch_change`, only changes of action are traced.
+        """
+        if self._sampled(node, context, id(node), key='action'):
+            logger.log(
+                self.level, "[ActionNode] %s %s: %s, orders %s",
+                context.get('midnight_dt'), node.name, LazyLabel(node), allocations
+            )
+
+
+TRACER = Tracer()
+
+
+def enable_tracing(level: int = TRACE, every: int = 1, on_branch_change: bool = False, nodes=None):
+    """
+    Turns on the per-node trace and makes sure the `decision_tree` logger lets it through.
+
+    :param level: Logging level of the trace messages.
+    :param every: Trace every Nth evaluated date only.
+    :param on_branch_change: Trace a node only when its outcome differs from its previous evaluation.
+    :param nodes: Names of the nodes to trace. Defaults to every node.
+    """
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    if not logger.handlers and not logging.getLogger().handlers:
+        logger.addHandler(logging.StreamHandler())
+    TRACER.configure(True, level, every, on_branch_change, nodes)
+
+
+def disable_tracing():
+    TRACER.configure(False)
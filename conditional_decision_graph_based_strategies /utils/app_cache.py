@@ -0,0 +1,128 @@
+"""
+Caches of the Streamlit pages.
+
+Streamlit reruns the page script on every widget interaction and page switch. The loaders below
+are keyed by the mtime and size of the files they read, so a rerun only touches the disk with
+an `os.stat` and only recomputes when a file actually changed. Writes through `save_conditions`
+and `save_actions` also clear the specification caches explicitly.
+
+Data caches (`st.cache_data`) hand out copies, so pages may modify what they load. Resource
+caches (`st.cache_resource`) share one object between reruns and sessions, which must not be modified.
+"""
+from typing import Dict, Optional, Tuple
+import os
+
+import pandas as pd
+import streamlit as st
+
+from spec_dependencies import StrategyDependencies
+from strategy_builder import invalidate_compiled_strategies
+from strategy_execution import load_strategy_histories
+from utils.data_utils import STRATEGY_DIR, add_write_listener, load_actions, load_conditions
+from utils.decision_tree_utils import generate_dot
+from utils.plotting_utils import plot_performance
+from utils.price_cache import DEFAULT_MAX_AGE, INDEX_FILE, default_price_cache_dir
+from utils.result_store import META_FILE, result_path
+from utils.strategy_utils import load_strategy
+
+# Number of entries kept by the caches of large objects
+MAX_STRATEGY_ENTRIES = 16
+MAX_HISTORY_ENTRIES = 4
+MAX_DOT_ENTRIES = 64
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Cache key of a file or directory: its mtime in nanoseconds and size, or None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@st.cache_data(show_spinner=False)
+def _load_conditions(file_path, signature):
+    return load_conditions(file_path)
+
+
+@st.cache_data(show_spinner=False)
+def _load_actions(file_path, signature):
+    return load_actions(file_path)
+
+
+def cached_conditions(file_path: str) -> list:
+    return _load_conditions(file_path, file_signature(file_path))
+
+
+def cached_actions(file_path: str) -> dict:
+    return _load_actions(file_path, file_signature(file_path))
+
+
+def _strategy_file(strategy_name):
+    # Every saved run swaps in a new result directory, so its signature changes with every run
+    return os.path.join(result_path(os.path.join(STRATEGY_DIR, strategy_name)), META_FILE)
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_STRATEGY_ENTRIES)
+def _load_strategy(strategy_name, signature):
+    return load_strategy(strategy_name)
+
+
+def cached_strategy(strategy_name: str):
+    """
+    Saved result of a strategy, see `utils.result_store.StoredResult`, opened once per saved run.
+    """
+    return _load_strategy(strategy_name, file_signature(_strategy_file(strategy_name)))
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_STRATEGY_ENTRIES)
+def _performance_figure(strategy_name, signature):
+    strategy_object = _load_strategy(strategy_name, signature)
+    if strategy_object is None:
+        return None
+    return plot_performance(strategy_object['performance'])
+
+
+def cached_performance_figure(strategy_name: str):
+    """
+    Matplotlib figure of the saved performance of a strategy, drawn once per saved run.
+    """
+    return _performance_figure(strategy_name, file_signature(_strategy_file(strategy_name)))
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_DOT_ENTRIES)
+def cached_dot(conditions: list, actions: dict, profile: Optional[dict] = None) -> str:
+    """
+    `generate_dot`, keyed by the content of the specifications and profile.
+    """
+    return generate_dot(conditions, actions, profile=profile)
+
+
+def _price_signature():
+    return file_signature(os.path.join(default_price_cache_dir(), INDEX_FILE))
+
+
+@st.cache_resource(show_spinner=False, max_entries=MAX_HISTORY_ENTRIES, ttl=DEFAULT_MAX_AGE)
+def _strategy_histories(lookbacks, start_date, end_date, price_signature):
+    return load_strategy_histories(StrategyDependencies(dict(lookbacks)), start_date, end_date)
+
+
+def cached_strategy_histories(dependencies: StrategyDependencies, start_date, end_date) -> Dict[str, pd.Series]:
+    """
+    `load_strategy_histories` through the default price cache, shared until its index changes.
+    Entries expire with the price cache's maximum age so stale histories get refreshed.
+    """
+    lookbacks = tuple(sorted(dependencies.lookbacks.items()))
+    return _strategy_histories(lookbacks, start_date, end_date, _price_signature())
+
+
+def _invalidate_specs(file_path):
+    # A rewrite within the filesystem's timestamp resolution can keep the same signature
+    _load_conditions.clear()
+    _load_actions.clear()
+    invalidate_compiled_strategies(file_path)
+
+
+add_write_listener(_invalidate_specs)
@@ -0,0 +1,330 @@
+"""
+SQLite catalog of the strategies, their specification versions and their runs.
+
+The catalog is an index over the strategy folders, kept in sync by the code that writes them:
+`add_strategy` registers new strategies, `save_conditions`/`save_actions` record specification
+versions through a data_utils write listener, and jobs record their runs. `sync` rebuilds the
+strategy and run entries from the folders, e.g. for strategies copied in by hand.
+"""
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils.data_utils import STRATEGY_DIR, add_write_listener
+from utils.result_store import StoredResult, result_path
+
+# Written next to the strategy directory: every entry of the directory itself is a strategy folder
+CATALOG_FILE = 'catalog.sqlite3'
+
+# Seconds a writer waits for another process holding the database lock
+LOCK_TIMEOUT = 30
+
+METRICS = ('total_return', 'cagr', 'volatility', 'sharpe', 'max_drawdown', 'turnover')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS strategies (
+    name TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS strategies_updated_at ON strategies (updated_at);
+-- Serves the case-insensitive prefix searches on names (LIKE)
+CREATE INDEX IF NOT EXISTS strategies_name_nocase ON strategies (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS spec_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    strategy TEXT NOT NULL REFERENCES strategies (name) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    content TEXT NOT NULL,
+    UNIQUE (strategy, kind, content_hash)
+);
+CREATE INDEX IF NOT EXISTS spec_versions_strategy ON spec_versions (strategy, kind, saved_at);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    strategy TEXT NOT NULL REFERENCES strategies (name) ON DELETE CASCADE,
+    job_id TEXT,
+    engine TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    initial_cash REAL,
+    created_at REAL NOT NULL,
+    result_path TEXT,
+    conditions_hash TEXT,
+    actions_hash TEXT,
+    {', '.join(f'{metric} REAL' for metric in METRICS)}
+);
+CREATE INDEX IF NOT EXISTS runs_strategy ON runs (strategy, created_at);
+CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS runs_sharpe ON runs (sharpe);
+CREATE INDEX IF NOT EXISTS runs_cagr ON runs (cagr);
+CREATE INDEX IF NOT EXISTS runs_max_drawdown ON runs (max_drawdown);
+"""
+
+# Columns the searches can sort on, all indexed
+STRATEGY_ORDERS = ('name', 'updated_at', 'created_at')
+RUN_ORDERS = ('created_at', 'sharpe', 'cagr', 'max_drawdown')
+
+
+def spec_hash(content: Any) -> str:
+    """
+    Hash of a specification, independent of key order and formatting.
+    """
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def catalog_path(strategy_dir: str = STRATEGY_DIR) -> str:
+    """
+    Default path of the catalog of a strategy directory: CATALOG_FILE in its parent directory.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(strategy_dir)), CATALOG_FILE)
+
+
+def _move_legacy_catalog(strategy_dir: str, db_path: str):
+    # Catalogs used to be written inside the strategy directory, where folder scans tripped over them
+    legacy_path = os.path.join(strategy_dir, CATALOG_FILE)
+    if not os.path.isfile(legacy_path) or os.path.exists(db_path):
+        return
+    for suffix in ('-wal', '-shm', ''):
+        if os.path.exists(legacy_path + suffix):
+            os.replace(legacy_path + suffix, db_path + suffix)
+
+
+class StrategyCatalog:
+    def __init__(self, strategy_dir: str = STRATEGY_DIR, db_path: Optional[str] = None):
+        """
+        Initializes a StrategyCatalog, creating the database on first use.
+
+        :param strategy_dir: Directory of the strategy folders.
+        :param db_path: Path of the SQLite database. Defaults to `catalog_path(strategy_dir)`.
+        """
+        self.strategy_dir = strategy_dir
+        self.db_path = db_path or catalog_path(strategy_dir)
+        if db_path is None:
+            _move_legacy_catalog(strategy_dir, self.db_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as connection:
+            # WAL lets the app read while job workers record their runs
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=LOCK_TIMEOUT)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def _write(self, statements):
+        with closing(self._connect()) as connection, connection:
+            for statement, parameters in statements:
+                connection.execute(statement, parameters)
+
+    def _query(self, statement: str, parameters=()) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as connection:
+            return [dict(row) for row in connection.execute(statement, parameters)]
+
+    def _strategy_statement(self, name: str, now: float):
+        return (
+            "INSERT INTO strategies (name, folder, created_at, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET updated_at = excluded.updated_at",
+            (name, os.path.join(self.strategy_dir, name), now, now)
+        )
+
+    def add_strategy(self, name: str):
+        """
+        Registers a strategy, or marks an existing one as updated.
+        """
+        self._write([self._strategy_statement(name, time.time())])
+
+    def remove_strategy(self, name: str):
+        self._write([("DELETE FROM strategies WHERE name = ?", (name,))])
+
+    def has_strategy(self, name: str) -> bool:
+        return bool(self._query("SELECT 1 FROM strategies WHERE name = ?", (name,)))
+
+    def record_spec(self, name: str, kind: str, content: Any):
+        """
+        Records a version of a strategy's conditions or actions. Saving identical content again adds no version.
+
+        :param name: Name of the strategy.
+        :param kind: 'conditions' or 'actions'.
+        :param content: Specification as saved.
+        """
+        now = time.time()
+        self._write([
+            self._strategy_statement(name, now),
+            ("INSERT OR IGNORE INTO spec_versions (strategy, kind, content_hash, saved_at, content) "
+             "VALUES (?, ?, ?, ?, ?)", (name, kind, spec_hash(content), now, json.dumps(content))),
+        ])
+
+    def spec_versions(self, name: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lists the specification versions of a strategy, most recent first, with their content.
+        """
+        statement = "SELECT * FROM spec_versions WHERE strategy = ?"
+        parameters = [name]
+        if kind is not None:
+            statement += " AND kind = ?"
+            parameters.append(kind)
+        rows = self._query(statement + " ORDER BY saved_at DESC, id DESC", parameters)
+        for row in rows:
+            row['content'] = json.loads(row['content'])
+        return rows
+
+    def record_run(self, name: str, meta: Dict[str, Any], result_path: Optional[str] = None,
+                   job_id: Optional[str] = None, created_at: Optional[float] = None):
+        """
+        Records a run of a strategy.
+
+        :param name: Name of the strategy.
+        :param meta: Run metadata as stored with the result: dates, initial cash, engine, specifications, metrics.
+        :param result_path: Directory of the stored result.
+        :param job_id: Id of the job that ran it.
+        :param created_at: Time of the run. Defaults to now.
+        """
+        created_at = created_at or time.time()
+        metrics = meta.get('metrics') or {}
+        columns = ['strategy', 'job_id', 'engine', 'start_date', 'end_date', 'initial_cash', 'created_at',
+                   'result_path', 'conditions_hash', 'actions_hash', *METRICS]
+        values = [
+            name, job_id, meta.get('engine'), str(meta.get('start_date')), str(meta.get('end_date')),
+            meta.get('initial_cash'), created_at, result_path,
+            spec_hash(meta['conditions']) if 'conditions' in meta else None,
+            spec_hash(meta['actions']) if 'actions' in meta else None,
+            *[_finite(metrics.get(metric)) for metric in METRICS],
+        ]
+        self._write([
+            self._strategy_statement(name, created_at),
+            (f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values),
+        ])
+
+    def strategy_names(self) -> List[str]:
+        return [row['name'] for row in self._query("SELECT name FROM strategies ORDER BY name")]
+
+    def search_strategies(self, text: str = '', order_by: str = 'name', descending: bool = False,
+                          limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Searches strategies by name, with their number of runs and best Sharpe ratio.
+
+        :param text: Text the name starts with; '*' matches anywhere in the name.
+        :param order_by: One of STRATEGY_ORDERS.
+        :param descending: Sorts in descending order.
+        :param limit: Maximum number of strategies returned.
+        :param offset: Number of strategies skipped, for paging.
+        """
+        if order_by not in STRATEGY_ORDERS:
+            raise ValueError(f"Unsupported order: {order_by}")
+        return self._query(
+            "SELECT s.name, s.created_at, s.updated_at, "
+            "(SELECT COUNT(*) FROM runs r WHERE r.strategy = s.name) AS runs, "
+            "(SELECT MAX(r.sharpe) FROM runs r WHERE r.strategy = s.name) AS best_sharpe "
+            f"FROM strategies s WHERE s.name LIKE ? ESCAPE '\\' "
+            f"ORDER BY s.{order_by} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?",
+            (_like_pattern(text), limit, offset)
+        )
+
+    def search_runs(self, strategy: Optional[str] = None, engine: Optional[str] = None,
+                    min_sharpe: Optional[float] = None, order_by: str = 'created_at', descending: bool = True,
+                    limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Searches runs.
+
+        :param strategy: Only runs of strategies whose name starts with this text ('*' matches anywhere).
+        :param engine: Only runs of this engine.
+        :param min_sharpe: Only runs with at least this Sharpe ratio.
+        :param order_by: One of RUN_ORDERS.
+        :param descending: Sorts in descending order.
+        :param limit: Maximum number of runs returned.
+        :param offset: Number of runs skipped, for paging.
+        """
+        if order_by not in RUN_ORDERS:
+            raise ValueError(f"Unsupported order: {order_by}")
+        conditions, parameters = [], []
+        if strategy:
+            conditions.append("strategy LIKE ? ESCAPE '\\'")
+            parameters.append(_like_pattern(strategy))
+        if engine:
+            conditions.append("engine = ?")
+            parameters.append(engine)
+        if min_sharpe is not None:
+            conditions.append("sharpe >= ?")
+            parameters.append(min_sharpe)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ''
+        return self._query(
+            f"SELECT * FROM runs {where}ORDER BY {order_by} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?",
+            (*parameters, limit, offset)
+        )
+
+    def sync(self):
+        """
+        Adds the strategy folders and stored results missing from the catalog and removes strategies whose
+        folder is gone.
+        """
+        names = sorted(
+            name for name in os.listdir(self.strategy_dir) if os.path.isdir(os.path.join(self.strategy_dir, name))
+        )
+        known = set(self.strategy_names())
+        recorded = {row['result_path'] for row in self._query("SELECT DISTINCT result_path FROM runs")}
+        for name in names:
+            if name not in known:
+                self.add_strategy(name)
+            path = result_path(os.path.join(self.strategy_dir, name))
+            result = StoredResult.open(path)
+            if result is not None and path not in recorded:
+                self.record_run(name, result.meta, path, created_at=os.path.getmtime(path))
+        for name in known - set(names):
+            self.remove_strategy(name)
+
+
+def _finite(value):
+    # SQLite stores NaN as NULL anyway; None keeps the intent explicit
+    return None if value is None or value != value else float(value)
+
+
+def _like_pattern(text: str) -> str:
+    text = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    # A prefix pattern can use the index on the name; '*' opts into a substring search
+    return text.replace('*', '%') + '%'
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(strategy_dir: str = STRATEGY_DIR) -> StrategyCatalog:
+    """
+    Catalog of a strategy directory shared by the process. The first call syncs it with the folders.
+    """
+    with _catalogs_lock:
+        if strategy_dir not in _catalogs:
+            catalog = StrategyCatalog(strategy_dir)
+            catalog.sync()
+            _catalogs[strategy_dir] = catalog
+        return _catalogs[strategy_dir]
+
+
+def _record_spec_write(file_path):
+    # Specification files live in <strategy_dir>/<strategy name>/
+    strategy_folder = os.path.dirname(os.path.abspath(file_path))
+    strategy_dir = os.path.dirname(strategy_folder)
+    kind = os.path.splitext(os.path.basename(file_path))[0]
+    if strategy_dir != os.path.abspath(STRATEGY_DIR) or kind not in ('conditions', 'actions'):
+        return
+    try:
+        with open(file_path, 'r') as f:
+            content = json.load(f)
+        get_catalog(STRATEGY_DIR).record_spec(os.path.basename(strategy_folder), kind, content)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        logging.error(f"Could not record {file_path} in the strategy catalog: {e}")
+
+
+add_write_listener(_record_spec_write)
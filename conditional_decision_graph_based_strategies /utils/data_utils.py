@@ -2,6 +2,8 @@
 import json
 import os
 import pickle
+import shutil
+import uuid
 
 # File paths
 CONDITIONS_FILE = 'conditions.json'
@@ -14,6 +16,19 @@ STRATEGY_DIR = 'strategies'
 if not os.path.exists(STRATEGY_DIR):
     os.makedirs(STRATEGY_DIR)
 
+# Callbacks run with the path of every specification file written, e.g. to invalidate caches
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify_write(file_path):
+    for listener in _write_listeners:
+        listener(file_path)
+
 
 def load_conditions(file_path):
     if os.path.exists(file_path):
@@ -25,6 +40,7 @@ def load_conditions(file_path):
 def save_conditions(file_path, data):
     with open(file_path, 'w') as f:
         json.dump(data, f, indent=4)
+    _notify_write(file_path)
 
 
 def load_actions(file_path):
@@ -36,4 +52,42 @@ def load_actions(file_path):
 
 def save_actions(file_path, data):
     with open(file_path, 'w') as f:
-        json.dump(data, f, indent=4)
\ No newline at end of file
+        json.dump(data, f, indent=4)
+    _notify_write(file_path)
+
+
+def temp_directory(path):
+    """
+    Sibling path a directory is written to before `replace_directory` moves it to `path`.
+    """
+    return f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+
+
+def replace_directory(tmp_path, path):
+    """
+    Moves a fully written directory to `path`, replacing the directory there.
+
+    The replaced files are unlinked, never truncated, so readers that memory-mapped them keep
+    reading the old data. `path` is only missing between two renames.
+
+    :param tmp_path: Directory written, normally from `temp_directory(path)`.
+    :param path: Destination directory.
+    """
+    while True:
+        old_path = temp_directory(path) + '.old'
+        try:
+            os.rename(path, old_path)
+        except FileNotFoundError:
+            old_path = None
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another writer moved its directory in between: move it aside as well
+            if old_path is not None:
+                shutil.rmtree(old_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+            continue
+        if old_path is not None:
+            shutil.rmtree(old_path, ignore_errors=True)
+        return
@@ -1,15 +1,65 @@
 
-def generate_dot(conditions, actions):
+# Fill colors of the profiling overlay, from the cheapest to the most expensive node
+COST_COLORS = ((0xFF, 0xF5, 0xCC), (0xFF, 0x45, 0x00))
+MAX_PENWIDTH = 8.0
+
+
+def cost_color(share):
+    """
+    Interpolates the overlay fill color for a node.
+
+    Parameters:
+        share (float): Cost of the node relative to the most expensive node, between 0 and 1.
+
+    Returns:
+        str: Hexadecimal color.
+    """
+    low, high = COST_COLORS
+    return '#' + ''.join(f"{round(a + (b - a) * share):02X}" for a, b in zip(low, high))
+
+
+def edge_overlay(label, stats, branch, max_branch):
+    """
+    Builds the label and extra attributes of a branch edge for the profiling overlay.
+
+    Parameters:
+        label (str): Label of the edge without overlay.
+        stats (dict or None): Statistics of the edge's decision node.
+        branch (str): 'true' or 'false'.
+        max_branch (int): Highest branch count of the tree, mapped to the thickest edge.
+
+    Returns:
+        tuple: Edge label and DOT attributes to append.
+    """
+    if not stats:
+        return label, ''
+    branches = stats['true'] + stats['false']
+    share = stats[branch] / branches if branches else 0.0
+    penwidth = 1.0 + (MAX_PENWIDTH - 1.0) * (stats[branch] / max_branch if max_branch else 0.0)
+    return f"{label} ({stats[branch]}, {share:.0%})", f', penwidth={penwidth:.2f}'
+
+
+def generate_dot(conditions, actions, profile=None):
     """
     Generates DOT code for the decision tree based on conditions and actions.
 
     Parameters:
         conditions (list): List of condition dictionaries.
         actions (dict): Dictionary of actions with allocations.
+        profile (dict, optional): Node statistics by name, as returned by `Profiler.summary()`.
+            Overlays call counts and latencies on the nodes, colors decision nodes by total time
+            and sets edge thickness by branch frequency.
 
     Returns:
         str: DOT language string representing the decision tree.
     """
+    profile = profile or {}
+    max_cost = max([profile[cond['node_name']]['total_ns'] for cond in conditions if cond['node_name'] in profile] or [0])
+    max_branch = max(
+        [max(profile[cond['node_name']]['true'], profile[cond['node_name']]['false'])
+         for cond in conditions if cond['node_name'] in profile] or [0]
+    )
+
     dot = 'digraph DecisionTree {\n'
     dot += '    node [shape=rectangle, style=filled, fillcolor="#EFEFEF"];\n\n'
 
@@ -29,12 +79,20 @@ def generate_dot(conditions, actions):
             threshold_display = f"Dynamic: {threshold['indicator']} {threshold['etf1']} {threshold['operator']} {threshold['etf2']} ({threshold['window']})"
 
         label = f"{node_name}\\n{indicator} {operator} {etf} ({window})\\nThreshold: {threshold_display}"
-        dot += f'    "{node_name}" [shape=diamond, fillcolor="#FFD700", style=filled, color="#8B6508", fontcolor=black, label="{label}"];\n'
+        fillcolor = "#FFD700"
+        stats = profile.get(node_name)
+        if stats:
+            label += f"\\n{stats['calls']} calls, {stats['total_ns'] / 1e6:.2f} ms, p50 {stats['p50_ns'] / 1e3:.1f} us, p99 {stats['p99_ns'] / 1e3:.1f} us"
+            fillcolor = cost_color(stats['total_ns'] / max_cost if max_cost else 0.0)
+        dot += f'    "{node_name}" [shape=diamond, fillcolor="{fillcolor}", style=filled, color="#8B6508", fontcolor=black, label="{label}"];\n'
 
     # Define action nodes
     for action_name, allocations in actions.items():
         allocations_display = "\\n".join([f"{etf}: {alloc}" for etf, alloc in allocations.items()])
         label = f"{action_name}\\nAllocations:\\n{allocations_display}"
+        stats = profile.get(action_name)
+        if stats:
+            label += f"\\n{stats['calls']} orders, p50 {stats['p50_ns'] / 1e3:.1f} us"
         dot += f'    "{action_name}" [shape=oval, fillcolor="#ADFF2F", style=filled, color="#556B2F", fontcolor=black, label="{label}"];\n'
 
     dot += '\n'
@@ -45,11 +103,15 @@ def generate_dot(conditions, actions):
         true_branch = cond['true_branch']
         false_branch = cond['false_branch']
 
+        stats = profile.get(node_name)
+        true_label, true_attributes = edge_overlay("True", stats, 'true', max_branch)
+        false_label, false_attributes = edge_overlay("False", stats, 'false', max_branch)
+
         # Edge for true_branch
-        dot += f'    "{node_name}" -> "{true_branch}" [label="True", color="#228B22"];\n'
+        dot += f'    "{node_name}" -> "{true_branch}" [label="{true_label}", color="#228B22"{true_attributes}];\n'
 
         # Edge for false_branch
-        dot += f'    "{node_name}" -> "{false_branch}" [label="False", color="#B22222"];\n'
+        dot += f'    "{node_name}" -> "{false_branch}" [label="{false_label}", color="#B22222"{false_attributes}];\n'
 
     dot += '}'
     return dot
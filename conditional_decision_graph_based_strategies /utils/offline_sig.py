@@ -0,0 +1,150 @@
+"""
+Offline stand-in for the subset of `sigtech.framework` used by the project.
+
+Instruments are served from histories registered with `set_market_data`, or generated on demand by
+the seeded synthetic generator, so strategies can run, be profiled and be load-tested without the
+platform. Use it through `utils.sig_backend`.
+"""
+from typing import Dict, Optional
+import datetime as dtm
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.synthetic_data import generate_prices
+
+# Synthetic histories generated for tickers without registered market data
+SYNTHETIC_START_DATE = '1990-01-01'
+SYNTHETIC_SEED = 0
+
+_market_data = {}
+_instruments = {}
+
+
+def init(*args, **kwargs):
+    logging.info("Offline SigTech stand-in initialized")
+
+
+def set_market_data(etf_histories: Dict[str, pd.Series]):
+    """
+    Registers the histories served by the stand-in, replacing previously fetched instruments.
+
+    :param etf_histories: Dictionary mapping ETFs to their price histories.
+    """
+    _market_data.update(etf_histories)
+    for name in etf_histories:
+        _instruments.pop(name, None)
+
+
+def clear_market_data():
+    _market_data.clear()
+    _instruments.clear()
+
+
+class Instrument:
+    def __init__(self, name: str, history: pd.Series):
+        self.name = name
+        self._history = history
+
+    def history(self, datetime_start=None) -> pd.Series:
+        """
+        Price history of the instrument, from `datetime_start` when given.
+        """
+        if datetime_start is not None:
+            return self._history.loc[pd.Timestamp(datetime_start):]
+        return self._history
+
+    def __repr__(self):
+        return f"Instrument({self.name})"
+
+
+class _ObjectStore:
+    def get(self, name: str) -> Instrument:
+        """
+        Retrieves an instrument, like `sig.obj.get`.
+
+        :param name: Name of the instrument.
+        :return: Instrument object.
+        """
+        if name not in _instruments:
+            history = _market_data.get(name)
+            if history is None:
+                history = generate_prices(
+                    [name], SYNTHETIC_START_DATE, pd.Timestamp(dtm.date.today()), seed=SYNTHETIC_SEED
+                )[name]
+                logging.warning(f"No market data registered for {name}: serving a synthetic history.")
+            _instruments[name] = Instrument(name, history)
+        return _instruments[name]
+
+
+obj = _ObjectStore()
+
+
+class DynamicStrategy:
+    """
+    Daily loop of a `sig.DynamicStrategy`.
+
+    On every business day, `basket_creation_method` returns the target units per instrument,
+    which are traded at that day's price. An empty basket keeps the current positions. The NAV
+    is the remaining cash plus the value of the positions.
+    """
+
+    def __init__(
+        self,
+        currency: str,
+        start_date,
+        end_date,
+        trade_frequency: str,
+        basket_creation_method,
+        basket_creation_kwargs: Optional[dict] = None,
+        initial_cash: float = 1000000.0,
+        **kwargs
+    ):
+        if trade_frequency != '1BD':
+            raise ValueError(f"Unsupported trade frequency: {trade_frequency}")
+        self.currency = currency
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        self.basket_creation_method = basket_creation_method
+        self.basket_creation_kwargs = basket_creation_kwargs or {}
+        self.initial_cash = initial_cash
+        self.positions = {}
+        self._history = None
+
+    def size_date_from_decision_dt(self, dt):
+        return dt.date()
+
+    def build(self, progress: bool = False):
+        """
+        Runs the daily loop over the business days of the strategy.
+
+        :param progress: Logs the progress every 10% of the dates.
+        """
+        dates = pd.bdate_range(self.start_date, self.end_date)
+        cash = self.initial_cash
+        positions = {}
+        nav = np.empty(len(dates))
+        for position, date in enumerate(dates):
+            decision_dt = date.to_pydatetime()
+            basket = self.basket_creation_method(self, decision_dt, dict(positions), **self.basket_creation_kwargs)
+            if basket:
+                for instrument in set(positions) | set(basket):
+                    units = basket.get(instrument, 0.0)
+                    traded = units - positions.get(instrument, 0.0)
+                    if traded:
+                        cash -= traded * instrument.history().asof(date)
+                    positions[instrument] = units
+            nav[position] = cash + sum(
+                units * instrument.history().asof(date) for instrument, units in positions.items() if units
+            )
+            if progress and len(dates) >= 10 and (position + 1) % (len(dates) // 10) == 0:
+                logging.info(f"DynamicStrategy build: {position + 1}/{len(dates)} dates")
+
+        self.positions = positions
+        self._history = pd.Series(nav, index=dates)
+
+    def history(self) -> pd.Series:
+        if self._history is None:
+            self.build()
+        return self._history
@@ -0,0 +1,300 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+import datetime as dtm
+import fcntl
+import json
+import logging
+import os
+
+import pandas as pd
+
+from utils.price_store import PriceStore, update_price_store
+from utils.sig_backend import SIG_BACKEND, sig
+
+# Directories of the default price cache, one per SigTech backend so synthetic prices never mix with real ones
+PRICE_CACHE_DIR = 'price_cache'
+OFFLINE_PRICE_CACHE_DIR = 'price_cache_offline'
+INDEX_FILE = 'index.json'
+# Lock serializing the index updates of the processes sharing a cache directory
+INDEX_LOCK_FILE = 'index.lock'
+# Memory-mapped store of the cached histories, and the index entries it was written from
+STORE_DIR = 'store'
+STORE_VERSIONS_FILE = 'store_versions.json'
+
+# Cached histories refreshed more recently than this are served without contacting the source
+DEFAULT_MAX_AGE = dtm.timedelta(hours=12)
+
+_sig_initialized = False
+
+
+def default_price_cache_dir() -> str:
+    """
+    Directory of the default price cache of the selected SigTech backend.
+    """
+    return OFFLINE_PRICE_CACHE_DIR if SIG_BACKEND == 'offline' else PRICE_CACHE_DIR
+
+
+def init_sigtech():
+    """
+    Initializes the SigTech environment once per process.
+    """
+    global _sig_initialized
+    if not _sig_initialized:
+        sig.init()
+        _sig_initialized = True
+
+
+class PriceSource(ABC):
+    """
+    Source of ETF price histories used to fill a PriceCache.
+    """
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the source, recorded with the histories it fetched.
+        """
+        return type(self).__name__
+
+    @abstractmethod
+    def fetch(self, ticker: str, start_date=None) -> pd.Series:
+        """
+        Fetches the price history of a ticker.
+
+        :param ticker: Ticker to fetch.
+        :param start_date: First date to fetch. Defaults to the start of the history.
+        :return: Series of prices indexed by date.
+        """
+        pass
+
+
+class SigTechPriceSource(PriceSource):
+    @property
+    def name(self) -> str:
+        # 'offline' marks histories served by the offline stand-in, possibly synthetic
+        return SIG_BACKEND
+
+    def fetch(self, ticker: str, start_date=None) -> pd.Series:
+        init_sigtech()
+        instrument = sig.obj.get(ticker)
+        if start_date is None:
+            return instrument.history()
+        # Only the requested dates are downloaded
+        return instrument.history(datetime_start=pd.Timestamp(start_date))
+
+
+class FilePriceSource(PriceSource):
+    """
+    Local stand-in for SigTech reading one CSV file (date, price) per ticker, for tests and offline research.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{ticker}.csv")
+
+    def fetch(self, ticker: str, start_date=None) -> pd.Series:
+        if not os.path.exists(self.path(ticker)):
+            raise KeyError(f"No price file for {ticker} in {self.directory}")
+        history = pd.read_csv(self.path(ticker), index_col=0, parse_dates=True).iloc[:, 0]
+        history.name = None
+        if start_date is not None:
+            history = history.loc[pd.Timestamp(start_date):]
+        return history
+
+
+def save_price_files(directory: str, etf_histories: Dict[str, pd.Series]):
+    """
+    Writes histories in the format read by FilePriceSource.
+
+    :param directory: Directory of the price files.
+    :param etf_histories: Dictionary mapping ETFs to their price histories.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for ticker, history in etf_histories.items():
+        history.rename('price').to_csv(os.path.join(directory, f"{ticker}.csv"), index_label='date')
+
+
+class PriceCache:
+    """
+    Persistent per-ticker cache of price histories.
+
+    The index records, for each ticker, the first date requested, the last date held, when it was
+    last refreshed and the source it was fetched from; histories of another source are fetched again.
+    A history is only fetched from the first date a run needs, and a refresh only fetches its tail
+    from the last date held onwards. Reads are served from a memory-mapped PriceStore of the cached
+    histories, where only the files of refreshed tickers are rewritten, so the processes sharing
+    the cache share the pages of the same files.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        source: Optional[PriceSource] = None,
+        max_age: dtm.timedelta = DEFAULT_MAX_AGE
+    ):
+        """
+        Initializes a PriceCache.
+
+        :param cache_dir: Directory holding the cached histories. Defaults to `default_price_cache_dir()`.
+        :param source: Source of the histories. Defaults to SigTech.
+        :param max_age: Age after which a cached history is refreshed on read.
+        """
+        self.cache_dir = cache_dir if cache_dir is not None else default_price_cache_dir()
+        self.source = source if source is not None else SigTechPriceSource()
+        self.max_age = max_age
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        index_file = os.path.join(self.cache_dir, INDEX_FILE)
+        if os.path.exists(index_file):
+            with open(index_file, 'r') as f:
+                return json.load(f)
+        return {}
+
+    @contextmanager
+    def _index_lock(self):
+        with open(os.path.join(self.cache_dir, INDEX_LOCK_FILE), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _update_index(self, ticker: str, entry: Dict[str, str]):
+        """
+        Records the entry of a ticker, merged into the index on disk so entries written by other processes are kept.
+        """
+        index_file = os.path.join(self.cache_dir, INDEX_FILE)
+        tmp_file = f"{index_file}.{os.getpid()}.tmp"
+        with self._index_lock():
+            self.index = self._load_index()
+            self.index[ticker] = entry
+            with open(tmp_file, 'w') as f:
+                json.dump(self.index, f, indent=4)
+            os.replace(tmp_file, index_file)
+
+    def _history_file(self, ticker: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticker}.pkl")
+
+    def _cached_entry(self, ticker: str) -> Optional[Dict[str, str]]:
+        # Histories fetched from another source are never served, nor extended
+        entry = self.index.get(ticker)
+        if entry is None or entry.get('source') != self.source.name or not os.path.exists(self._history_file(ticker)):
+            return None
+        return entry
+
+    @staticmethod
+    def _covers(entry: Dict[str, str], start_date) -> bool:
+        # Entries without a start date hold the history from its inception
+        first_date = entry.get('start_date')
+        return first_date is None or (start_date is not None and pd.Timestamp(start_date) >= pd.Timestamp(first_date))
+
+    def is_fresh(self, ticker: str, end_date=None, start_date=None) -> bool:
+        """
+        Checks whether a cached history can be served without contacting the source.
+
+        :param ticker: Ticker to check.
+        :param end_date: Last date needed. A history already covering it is always fresh.
+        :param start_date: First date needed. Defaults to the start of the history.
+        :return: True if the cached history is fresh.
+        """
+        entry = self._cached_entry(ticker)
+        if entry is None or not self._covers(entry, start_date):
+            return False
+        if end_date is not None and pd.Timestamp(entry['last_date']) >= pd.Timestamp(end_date):
+            return True
+        return dtm.datetime.now() - dtm.datetime.fromisoformat(entry['refreshed_at']) < self.max_age
+
+    def refresh(self, ticker: str, start_date=None) -> pd.Series:
+        """
+        Fetches the missing tail of a ticker's history and stores the merged history.
+
+        A history not held from `start_date` is fetched again from it.
+
+        :param ticker: Ticker to refresh.
+        :param start_date: First date needed. Defaults to the start of the history.
+        :return: Updated price history.
+        """
+        entry = self._cached_entry(ticker)
+        if entry is None or entry['last_date'] is None or not self._covers(entry, start_date):
+            start_date = pd.Timestamp(start_date).isoformat() if start_date is not None else None
+            history = self.source.fetch(ticker, start_date=start_date)
+            logging.info(f"Price cache: fetched {len(history)} prices for {ticker} from {start_date or 'inception'}")
+        else:
+            start_date = entry.get('start_date')
+            cached = pd.read_pickle(self._history_file(ticker))
+            # The last date held is fetched again, as its price may have been provisional
+            tail = self.source.fetch(ticker, start_date=entry['last_date'])
+            history = pd.concat([cached, tail])
+            history = history[~history.index.duplicated(keep='last')]
+            logging.info(f"Price cache: fetched {len(tail)} prices for {ticker} from {entry['last_date']}")
+
+        history_file = self._history_file(ticker)
+        history.to_pickle(f"{history_file}.{os.getpid()}.tmp")
+        os.replace(f"{history_file}.{os.getpid()}.tmp", history_file)
+        self._update_index(ticker, {
+            'start_date': start_date,
+            'last_date': history.index[-1].isoformat() if len(history) else None,
+            'refreshed_at': dtm.datetime.now().isoformat(),
+            'source': self.source.name,
+        })
+        return history
+
+    def open_store(self, tickers: Iterable[str]) -> PriceStore:
+        """
+        Opens the price store of the cache, first writing the tickers it misses or holds from before their last refresh.
+
+        Only the files of those tickers are written; the other tickers of the store are left untouched.
+
+        :param tickers: Cached tickers the store must hold.
+        :return: PriceStore of the cached tickers written so far.
+        """
+        store_path = os.path.join(self.cache_dir, STORE_DIR)
+        versions_file = os.path.join(self.cache_dir, STORE_VERSIONS_FILE)
+        with self._index_lock():
+            self.index = self._load_index()
+            versions = {}
+            if os.path.exists(versions_file) and os.path.isdir(store_path):
+                with open(versions_file, 'r') as f:
+                    versions = json.load(f)
+            stale = [ticker for ticker in dict.fromkeys(tickers)
+                     if versions.get(ticker) != self.index[ticker]['refreshed_at']]
+            if not stale:
+                return PriceStore.open(store_path)
+            store = update_price_store(store_path, {ticker: pd.read_pickle(self._history_file(ticker))
+                                                    for ticker in stale})
+            versions.update({ticker: self.index[ticker]['refreshed_at'] for ticker in stale})
+            with open(versions_file + '.tmp', 'w') as f:
+                json.dump(versions, f, indent=4)
+            os.replace(versions_file + '.tmp', versions_file)
+            return store
+
+    def get(
+            self,
+            tickers: Iterable[str],
+            end_date=None,
+            refresh: bool = False,
+            start_dates: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, pd.Series]:
+        """
+        Returns the histories of the tickers, served locally when the cache is fresh.
+
+        :param tickers: Tickers to read.
+        :param end_date: Last date needed, see `is_fresh`.
+        :param refresh: Refresh every ticker regardless of its freshness.
+        :param start_dates: Optional dictionary mapping tickers to the first date needed. Tickers missing from it
+            are fetched from the start of their history.
+        :return: Dictionary mapping tickers to their price histories, read from the memory-mapped store. They can
+            start before the requested dates.
+        """
+        tickers = list(tickers)
+        start_dates = start_dates or {}
+        for ticker in tickers:
+            if refresh or not self.is_fresh(ticker, end_date, start_dates.get(ticker)):
+                self.refresh(ticker, start_dates.get(ticker))
+        store = self.open_store(tickers)
+        return {ticker: store[ticker] for ticker in tickers}
@@ -0,0 +1,187 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import replace_directory, temp_directory
+
+# Directory of the default price store
+PRICE_STORE_DIR = 'price_store'
+
+# Manifest mapping each ticker to the stem of its column files, in the order of the tickers
+TICKERS_FILE = 'tickers.json'
+DATES_SUFFIX = '.dates.npy'
+PRICES_SUFFIX = '.prices.npy'
+
+
+def _write_columns(path: str, history: pd.Series) -> str:
+    # New files get a new stem, so columns that readers have mapped are never overwritten
+    stem = uuid.uuid4().hex[:16]
+    np.save(os.path.join(path, stem + DATES_SUFFIX), history.index.to_numpy())
+    np.save(os.path.join(path, stem + PRICES_SUFFIX), history.to_numpy(dtype=float))
+    return stem
+
+
+def _write_manifest(path: str, stems: Dict[str, str]):
+    tmp_file = os.path.join(path, f"{TICKERS_FILE}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump(stems, f, indent=4)
+    os.replace(tmp_file, os.path.join(path, TICKERS_FILE))
+
+
+def _read_manifest(path: str) -> Dict[str, str]:
+    with open(os.path.join(path, TICKERS_FILE), 'r') as f:
+        return json.load(f)
+
+
+def write_price_store(path: str, etf_histories: Dict[str, pd.Series]) -> 'PriceStore':
+    """
+    Writes ETF histories to an on-disk columnar price store.
+
+    The store is a directory holding, for each ticker, one file of its dates and one file of its
+    float64 prices, and a manifest of the tickers. Reading or updating a ticker only touches its
+    own files.
+
+    The store is written to a temporary directory and then moved to `path`, so stores that
+    readers have mapped are replaced rather than rewritten in place.
+
+    :param path: Directory of the store. An existing store is replaced.
+    :param etf_histories: Dictionary mapping ETFs to their price histories.
+    :return: PriceStore opened on the written files.
+    """
+    tmp_path = temp_directory(path)
+    os.makedirs(tmp_path)
+    stems = {ticker: _write_columns(tmp_path, history) for ticker, history in etf_histories.items()}
+    _write_manifest(tmp_path, stems)
+    replace_directory(tmp_path, path)
+    logging.info(f"Price store written to {path}: {len(stems)} tickers")
+    return PriceStore.open(path)
+
+
+def update_price_store(path: str, etf_histories: Dict[str, pd.Series]) -> 'PriceStore':
+    """
+    Adds or replaces the histories of some tickers of a price store, leaving the other tickers' files untouched.
+
+    The new columns are written to new files and the manifest is replaced atomically; the replaced
+    files are then unlinked, so stores that readers have already mapped keep reading the old data.
+    Writers of the same store must be serialized, e.g. by the index lock of the PriceCache.
+
+    :param path: Directory of the store. Created if it does not exist.
+    :param etf_histories: Dictionary mapping the ETFs to update to their price histories.
+    :return: PriceStore opened on the updated store.
+    """
+    if not os.path.exists(os.path.join(path, TICKERS_FILE)):
+        return write_price_store(path, etf_histories)
+    stems = _read_manifest(path)
+    replaced = [stems[ticker] for ticker in etf_histories if ticker in stems]
+    stems.update({ticker: _write_columns(path, history) for ticker, history in etf_histories.items()})
+    _write_manifest(path, stems)
+    for stem in replaced:
+        for suffix in (DATES_SUFFIX, PRICES_SUFFIX):
+            os.remove(os.path.join(path, stem + suffix))
+    logging.info(f"Price store {path} updated: {len(etf_histories)} of {len(stems)} tickers")
+    return PriceStore.open(path)
+
+
+class PriceStore(Mapping):
+    """
+    Memory-mapped price store, usable wherever a dictionary of ETF histories is expected.
+
+    Each history is a view on the mapped files of its ticker: opening a store or restricting it
+    to a date range does not load any price, and processes opening the same store share the
+    pages of the operating system's file cache.
+    """
+
+    def __init__(self, columns: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        Initializes a PriceStore. Use `PriceStore.open` to map a store written by `write_price_store`.
+
+        :param columns: Dictionary mapping tickers to their sorted datetime64 dates and their prices.
+        """
+        self.columns = columns
+        self.tickers = list(columns)
+        self._calendar = None
+        self._histories = {}
+
+    @classmethod
+    def open(cls, path: str = PRICE_STORE_DIR) -> 'PriceStore':
+        """
+        Maps a price store without reading its prices.
+
+        :param path: Directory of the store.
+        :return: PriceStore object.
+        """
+        return cls({
+            ticker: (np.load(os.path.join(path, stem + DATES_SUFFIX), mmap_mode='r'),
+                     np.load(os.path.join(path, stem + PRICES_SUFFIX), mmap_mode='r'))
+            for ticker, stem in _read_manifest(path).items()
+        })
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        """
+        Union of the dates of every ticker.
+        """
+        if self._calendar is None:
+            calendar = pd.DatetimeIndex([])
+            for dates, _ in self.columns.values():
+                calendar = calendar.union(pd.DatetimeIndex(dates))
+            self._calendar = calendar
+        return self._calendar
+
+    def between(self, start_date=None, end_date=None) -> 'PriceStore':
+        """
+        Restricts the store to a date range. The result is a view on the same mapped files.
+
+        :param start_date: First date included. Defaults to the start of the store.
+        :param end_date: Last date included. Defaults to the end of the store.
+        :return: PriceStore object.
+        """
+        columns = {}
+        for ticker, (dates, prices) in self.columns.items():
+            start = 0 if start_date is None else dates.searchsorted(np.datetime64(pd.Timestamp(start_date)), 'left')
+            end = len(dates) if end_date is None else dates.searchsorted(np.datetime64(pd.Timestamp(end_date)), 'right')
+            columns[ticker] = (dates[start:end], prices[start:end])
+        return PriceStore(columns)
+
+    def history(self, ticker: str) -> pd.Series:
+        """
+        Reads the price history of a ticker, like `instrument.history()`.
+
+        :param ticker: Ticker to read.
+        :return: Series of prices over the ticker's own dates, a view on the mapped file.
+        """
+        dates, prices = self.columns[ticker]
+        return pd.Series(prices, index=pd.DatetimeIndex(dates), name=ticker, copy=False)
+
+    def frame(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the aligned dates x tickers panel, NaN where a ticker has no price.
+
+        :param tickers: Tickers (columns) of the panel. Defaults to every ticker of the store.
+        :return: DataFrame of prices.
+        """
+        tickers = self.tickers if tickers is None else tickers
+        return pd.DataFrame({ticker: self[ticker] for ticker in tickers}, index=self.calendar, columns=tickers)
+
+    def __getitem__(self, ticker: str) -> pd.Series:
+        if ticker not in self.columns:
+            raise KeyError(ticker)
+        # Histories are looked up on every evaluation date, so each is built once
+        if ticker not in self._histories:
+            self._histories[ticker] = self.history(ticker)
+        return self._histories[ticker]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tickers)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.columns
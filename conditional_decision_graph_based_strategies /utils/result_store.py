@@ -0,0 +1,294 @@
+"""
+Columnar storage of strategy run results.
+
+A result is a directory holding a small `meta.json` (run parameters, specifications, profile)
+and one `.npy` file per time series: the calendar, the NAV and, when the engine provides them,
+the target weights, the positions and the action taken on each date. Opening a result only reads
+the metadata; the series are memory-mapped on first access. No file is unpickled.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+import datetime as dtm
+import json
+import logging
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.data_utils import replace_directory, temp_directory
+
+# Directory of the result inside a strategy folder, and pickled results it replaces
+RESULT_DIR = 'result'
+LEGACY_RESULT_FILE = 'strategy.pkl'
+MIGRATED_SUFFIX = '.migrated'
+
+META_FILE = 'meta.json'
+CALENDAR_FILE = 'calendar.npy'
+NAV_FILE = 'nav.npy'
+WEIGHTS_FILE = 'weights.npy'
+POSITIONS_FILE = 'positions.npy'
+DECISION_PATH_FILE = 'decision_path.npy'
+PROFILE_REPORT_FILE = 'profile_report.json'
+
+FORMAT_VERSION = 1
+
+# Keys of a result computed from its series files rather than stored in the metadata
+SERIES_KEYS = ('performance', 'weights', 'positions', 'decision_path', 'profile_report')
+
+# Date x ETF matrices of a result: key, file and metadata entry listing the columns
+FRAMES = (('weights', WEIGHTS_FILE, 'weight_columns'), ('positions', POSITIONS_FILE, 'position_columns'))
+
+# Metadata entries describing the stored files, written again by write_result
+DERIVED_META_KEYS = ('format_version', 'nav_name', 'dates', 'decision_actions',
+                     *(columns_key for _, _, columns_key in FRAMES))
+
+
+def _json_default(value):
+    if isinstance(value, (dtm.date, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def write_result(
+    path: str,
+    meta: Dict[str, Any],
+    nav: pd.Series,
+    weights: Optional[pd.DataFrame] = None,
+    decision_path: Optional[pd.Series] = None,
+    profile_report: Optional[pd.DataFrame] = None,
+    positions: Optional[pd.DataFrame] = None
+) -> 'StoredResult':
+    """
+    Writes the result of a run.
+
+    :param path: Directory of the result. An existing result is replaced by moving the new one over it, never
+        rewritten in place, so processes that memory-mapped its series keep reading them.
+    :param meta: JSON-serializable run parameters: name, dates, initial cash, engine, specifications, profile...
+    :param nav: Strategy NAV per date. Its name is kept as the performance column.
+    :param weights: Optional target weights per date and ETF, on the dates of `nav`.
+    :param decision_path: Optional name of the action taken per date, on the dates of `nav`.
+    :param profile_report: Optional DataFrame of `Profiler.report()`.
+    :param positions: Optional units held per date and ETF, on the dates of `nav`.
+    :return: StoredResult opened on the written files.
+    """
+    # The result is written to a sibling directory, then swapped in complete
+    final_path, path = path, temp_directory(path)
+    os.makedirs(path)
+
+    calendar = pd.DatetimeIndex(nav.index)
+    meta = {**meta, 'format_version': FORMAT_VERSION, 'nav_name': nav.name, 'dates': len(calendar)}
+    np.save(os.path.join(path, CALENDAR_FILE), calendar.to_numpy())
+    np.save(os.path.join(path, NAV_FILE), nav.to_numpy(dtype=np.float64))
+
+    for (_, file_name, columns_key), frame in zip(FRAMES, (weights, positions)):
+        if frame is not None:
+            frame = frame.reindex(calendar)
+            np.save(os.path.join(path, file_name), frame.to_numpy(dtype=np.float64))
+            meta[columns_key] = [str(column) for column in frame.columns]
+    if decision_path is not None:
+        codes, actions = pd.factorize(decision_path.reindex(calendar))
+        np.save(os.path.join(path, DECISION_PATH_FILE), codes.astype(np.int32))
+        meta['decision_actions'] = [str(action) for action in actions]
+    if profile_report is not None and not profile_report.empty:
+        with open(os.path.join(path, PROFILE_REPORT_FILE), 'w') as f:
+            json.dump(profile_report.reset_index().to_dict(orient='list'), f, default=_json_default)
+
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=4, default=_json_default)
+    replace_directory(path, final_path)
+    return StoredResult.open(final_path)
+
+
+class StoredResult(Mapping):
+    """
+    Lazily-loaded result, readable like the strategy objects formerly pickled in `strategy.pkl`.
+
+    Metadata keys are served from `meta.json`. 'performance' (NAV DataFrame), 'weights',
+    'positions', 'decision_path' and 'profile_report' are read from their files on first access,
+    with the arrays memory-mapped; they are None when the run did not record them.
+    """
+
+    def __init__(self, path: str, meta: Dict[str, Any]):
+        self.path = path
+        self.meta = meta
+        self._series = {}
+
+    @classmethod
+    def open(cls, path: str) -> Optional['StoredResult']:
+        """
+        Opens a result written by `write_result`.
+
+        :param path: Directory of the result.
+        :return: StoredResult, or None if there is no complete result in the directory.
+        """
+        try:
+            with open(os.path.join(path, META_FILE), 'r') as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return cls(path, meta)
+
+    def _load(self, file_name: str) -> Optional[np.ndarray]:
+        file_path = os.path.join(self.path, file_name)
+        if not os.path.exists(file_path):
+            return None
+        return np.load(file_path, mmap_mode='r', allow_pickle=False)
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        if 'calendar' not in self._series:
+            self._series['calendar'] = pd.DatetimeIndex(self._load(CALENDAR_FILE))
+        return self._series['calendar']
+
+    def _read_series(self, key: str):
+        if key == 'performance':
+            nav = self._load(NAV_FILE)
+            return pd.DataFrame({self.meta.get('nav_name') or 'NAV': nav}, index=self.calendar, copy=False)
+        for frame_key, file_name, columns_key in FRAMES:
+            if key == frame_key:
+                values = self._load(file_name)
+                if values is None:
+                    return None
+                return pd.DataFrame(values, index=self.calendar, columns=self.meta[columns_key], copy=False)
+        if key == 'decision_path':
+            codes = self._load(DECISION_PATH_FILE)
+            if codes is None:
+                return None
+            return pd.Series(pd.Categorical.from_codes(codes, self.meta['decision_actions']), index=self.calendar)
+        file_path = os.path.join(self.path, PROFILE_REPORT_FILE)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'r') as f:
+            return pd.DataFrame(json.load(f)).set_index(['kind', 'name'])
+
+    def __getitem__(self, key: str):
+        if key in SERIES_KEYS:
+            if key not in self._series:
+                self._series[key] = self._read_series(key)
+            return self._series[key]
+        return self.meta[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.meta
+        yield from SERIES_KEYS
+
+    def __len__(self) -> int:
+        return len(self.meta) + len(SERIES_KEYS)
+
+    def __repr__(self):
+        return f"StoredResult({self.path})"
+
+
+def copy_result(result: StoredResult, path: str, nav_name: Optional[str] = None, **meta) -> StoredResult:
+    """
+    Writes a copy of a result.
+
+    :param result: Result to copy.
+    :param path: Directory of the copy. An existing result is replaced.
+    :param nav_name: Name of the performance column of the copy. Defaults to the original one.
+    :param meta: Metadata entries to add or replace.
+    :return: StoredResult opened on the copy.
+    """
+    nav = result['performance'].iloc[:, 0]
+    return write_result(
+        path, {**{key: value for key, value in result.meta.items() if key not in DERIVED_META_KEYS}, **meta},
+        nav.rename(nav_name or nav.name), weights=result['weights'], decision_path=result['decision_path'],
+        profile_report=result['profile_report'], positions=result['positions']
+    )
+
+
+def result_path(strategy_folder: str) -> str:
+    return os.path.join(strategy_folder, RESULT_DIR)
+
+
+def open_strategy_result(strategy_folder: str, migrate: bool = True) -> Optional[StoredResult]:
+    """
+    Opens the result of a strategy folder, migrating a legacy `strategy.pkl` first if needed.
+
+    :param strategy_folder: Strategy folder.
+    :param migrate: Migrates a legacy pickled result found instead of a stored one.
+    :return: StoredResult, or None if the strategy has no result.
+    """
+    result = StoredResult.open(result_path(strategy_folder))
+    if result is None and migrate and os.path.exists(os.path.join(strategy_folder, LEGACY_RESULT_FILE)):
+        result = migrate_strategy_pickle(strategy_folder)
+    return result
+
+
+def list_results(strategy_dir: str) -> List[Dict[str, Any]]:
+    """
+    Reads the metadata of every stored result, without touching the series files.
+
+    :param strategy_dir: Directory of the strategy folders.
+    :return: List of metadata dictionaries with their 'path'.
+    """
+    results = []
+    for name in sorted(os.listdir(strategy_dir)):
+        strategy_folder = os.path.join(strategy_dir, name)
+        if not os.path.isdir(strategy_folder):
+            continue
+        try:
+            result = StoredResult.open(result_path(strategy_folder))
+        except OSError as e:
+            logging.error(f"Could not read the result of {strategy_folder}: {e}")
+            continue
+        if result is not None:
+            results.append({**result.meta, 'path': result.path})
+    return results
+
+
+def migrate_strategy_pickle(strategy_folder: str) -> Optional[StoredResult]:
+    """
+    Converts a legacy `strategy.pkl` into a stored result, then renames the pickle with MIGRATED_SUFFIX.
+
+    Only pickles written by this application should be migrated: unpickling runs arbitrary code.
+
+    :param strategy_folder: Strategy folder holding `strategy.pkl`.
+    :return: StoredResult, or None if the pickle could not be read.
+    """
+    legacy_file = os.path.join(strategy_folder, LEGACY_RESULT_FILE)
+    try:
+        with open(legacy_file, 'rb') as f:
+            strategy_object = pickle.load(f)
+    except Exception as e:
+        logging.error(f"Could not read {legacy_file}: {e}")
+        return None
+
+    strategy_object = dict(strategy_object)
+    performance = strategy_object.pop('performance')
+    nav = performance.iloc[:, 0] if isinstance(performance, pd.DataFrame) else performance
+    nav.index = pd.to_datetime(nav.index)
+    profile_report = strategy_object.pop('profile_report', None)
+    result = write_result(result_path(strategy_folder), strategy_object, nav, profile_report=profile_report)
+    shutil.move(legacy_file, legacy_file + MIGRATED_SUFFIX)
+    logging.info(f"Migrated {legacy_file} to {result.path}")
+    return result
+
+
+def migrate_all(strategy_dir: str) -> List[str]:
+    """
+    Migrates the legacy pickled results of every strategy folder.
+
+    :param strategy_dir: Directory of the strategy folders.
+    :return: Paths of the migrated results.
+    """
+    migrated = []
+    for name in sorted(os.listdir(strategy_dir)):
+        strategy_folder = os.path.join(strategy_dir, name)
+        if os.path.exists(os.path.join(strategy_folder, LEGACY_RESULT_FILE)):
+            result = migrate_strategy_pickle(strategy_folder)
+            if result is not None:
+                migrated.append(result.path)
+    return migrated
+
+
+if __name__ == '__main__':
+    # python -m utils.result_store [strategy_dir]: migrates every strategy.pkl
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    migrate_all(sys.argv[1] if len(sys.argv) > 1 else 'strategies')
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache of run results.
+
+A run is identified by a hash of everything its result depends on: the canonical validated
+specifications, the tickers and lookbacks they need, the dates, the initial cash, the engine, the
+source of the price data loaded for the run and a digest of that data. Results are stored under
+that key in the columnar format of `utils.result_store`, so a repeated run is served without
+rebuilding the strategy. The least recently used entries are evicted beyond a number of entries or a size on disk.
+"""
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.catalog import spec_hash
+from utils.result_store import FORMAT_VERSION, StoredResult, copy_result
+
+# Directory of the default run cache
+RUN_CACHE_DIR = 'run_cache'
+
+# Eviction thresholds of the default run cache
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 1 << 30
+
+# File whose mtime records the last use of an entry
+LAST_USED_FILE = 'last_used'
+
+
+def data_version(etf_histories: Dict[str, pd.Series]) -> str:
+    """
+    Digest of the dates and prices of the histories a run reads.
+    """
+    digest = hashlib.sha256()
+    for ticker in sorted(etf_histories):
+        history = etf_histories[ticker]
+        digest.update(ticker.encode() + b'\0')
+        digest.update(history.index.to_numpy().astype('datetime64[ns]').view(np.int64).tobytes())
+        digest.update(history.to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def run_cache_key(condition_specs, action_specs, dependencies, start_date, end_date, initial_cash, engine,
+                  etf_histories, data_source=None) -> str:
+    """
+    Key of a run in the run cache.
+
+    :param condition_specs: Validated condition specifications.
+    :param action_specs: Validated action specifications.
+    :param dependencies: StrategyDependencies of the specifications.
+    :param start_date: Start date of the run.
+    :param end_date: End date of the run.
+    :param initial_cash: Initial cash of the strategy.
+    :param engine: Backtest engine.
+    :param etf_histories: Histories the run reads.
+    :param data_source: Name of the price source the histories come from, see `PriceSource.name`.
+    :return: Hexadecimal key.
+    """
+    payload = {
+        'conditions': spec_hash(condition_specs),
+        'actions': spec_hash(action_specs),
+        'universe': sorted(dependencies.lookbacks.items()),
+        'start_date': pd.Timestamp(start_date).isoformat(),
+        'end_date': pd.Timestamp(end_date).isoformat(),
+        'initial_cash': float(initial_cash),
+        'engine': engine,
+        'data_version': data_version(etf_histories),
+        'data_source': data_source,
+        'format_version': FORMAT_VERSION,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class RunCache:
+    def __init__(self, cache_dir: str = RUN_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initializes a RunCache.
+
+        :param cache_dir: Directory holding one result directory per key.
+        :param max_entries: Number of results kept.
+        :param max_bytes: Total size of the results kept.
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[StoredResult]:
+        """
+        Looks a run up, marking it as recently used.
+
+        :param key: Key returned by `run_cache_key`.
+        :return: StoredResult, or None on a miss.
+        """
+        result = StoredResult.open(self._path(key))
+        if result is None:
+            return None
+        try:
+            open(os.path.join(result.path, LAST_USED_FILE), 'w').close()
+        except OSError:
+            # Evicted by another process since it was opened
+            logging.info(f"Run cache entry {key} was evicted while being read")
+            return None
+        return result
+
+    def put(self, key: str, result: StoredResult) -> StoredResult:
+        """
+        Stores a copy of a run's result, then evicts the least recently used entries over the limits.
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        copy_result(result, tmp_path)
+        open(os.path.join(tmp_path, LAST_USED_FILE), 'w').close()
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process stored the same run first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+        return StoredResult.open(path)
+
+    def entries(self) -> List[Tuple[str, float, int]]:
+        """
+        Lists the cached runs.
+
+        :return: List of (key, last use time, size in bytes), least recently used first.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = self._path(key)
+            if key.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            try:
+                last_used = os.path.getmtime(os.path.join(path, LAST_USED_FILE))
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+            except OSError:
+                continue
+            entries.append((key, last_used, size))
+        return sorted(entries, key=lambda entry: entry[1])
+
+    def evict(self):
+        entries = self.entries()
+        total_bytes = sum(size for _, _, size in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            key, _, size = entries.pop(0)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            total_bytes -= size
+            logging.info(f"Run cache: evicted {key}")
+
+    def clear(self):
+        for key, _, _ in self.entries():
+            shutil.rmtree(self._path(key), ignore_errors=True)
+
+
+_run_cache = None
+
+
+def get_run_cache() -> RunCache:
+    """
+    Default run cache of the process.
+    """
+    global _run_cache
+    if _run_cache is None:
+        _run_cache = RunCache()
+    return _run_cache
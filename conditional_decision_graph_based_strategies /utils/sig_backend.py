@@ -0,0 +1,51 @@
+import logging
+import os
+
+# Environment variable selecting the backend: 'sigtech' (default) or 'offline'
+SIG_BACKEND_ENV = 'SIG_BACKEND'
+SIG_BACKENDS = ('sigtech', 'offline')
+DEFAULT_SIG_BACKEND = 'sigtech'
+
+
+def selected_sig_backend() -> str:
+    """
+    Backend selected by the SIG_BACKEND environment variable.
+    """
+    backend = os.environ.get(SIG_BACKEND_ENV, DEFAULT_SIG_BACKEND)
+    if backend not in SIG_BACKENDS:
+        raise ValueError(f"Unsupported SigTech backend: {backend}")
+    return backend
+
+
+def load_sig_backend(backend=None):
+    """
+    Imports the SigTech framework, or the offline stand-in in `utils/offline_sig.py` when explicitly selected.
+
+    The offline stand-in serves synthetic prices for tickers without registered market data, so it is
+    never used in place of a missing SigTech installation.
+
+    :param backend: 'sigtech' or 'offline'. Defaults to the SIG_BACKEND environment variable, then 'sigtech'.
+    :return: Module exposing `init`, `obj.get` and `DynamicStrategy`.
+    :raises ImportError: If SigTech is selected but not installed.
+    """
+    backend = backend or selected_sig_backend()
+    if backend not in SIG_BACKENDS:
+        raise ValueError(f"Unsupported SigTech backend: {backend}")
+
+    if backend == 'offline':
+        logging.warning("SIG_BACKEND=offline: using the offline SigTech stand-in. Prices may be synthetic.")
+        from utils import offline_sig
+        return offline_sig
+
+    try:
+        import sigtech.framework as sig
+    except ImportError as e:
+        raise ImportError(
+            "The SigTech framework is not installed. Install it, or set SIG_BACKEND=offline to run on the "
+            "offline stand-in with synthetic data."
+        ) from e
+    return sig
+
+
+SIG_BACKEND = selected_sig_backend()
+sig = load_sig_backend(SIG_BACKEND)
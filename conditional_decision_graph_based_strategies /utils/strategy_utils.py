@@ -2,6 +2,9 @@
 import os
 import pickle
 
+from utils.catalog import get_catalog
+from utils.result_store import open_strategy_result
+
 STRATEGY_DIR = 'strategies'
 DEBUG = False
 
@@ -18,18 +21,15 @@ def load_strategy(strategy_name):
     if not os.path.exists(strategy_folder):
         if DEBUG: print("DEBUG [load_strategy] strategy_folder not found")
         return None  # Folder does not exist
-    strategy_file = os.path.join(strategy_folder, 'strategy.pkl')
-    if not os.path.exists(strategy_file):
-        if DEBUG: print("DEBUG [load_strategy] strategy_file not found")
-        return None  # File does not exist
-    with open(strategy_file, 'rb') as f:
-        strategy_object = pickle.load(f)
+    # Results are read lazily from the columnar store; legacy strategy.pkl files are migrated on first load
+    strategy_object = open_strategy_result(strategy_folder)
+    if strategy_object is None:
+        if DEBUG: print("DEBUG [load_strategy] strategy result not found")
     return strategy_object
 
 
 def list_saved_strategies():
-    if not os.path.exists(STRATEGY_DIR):
-        os.makedirs(STRATEGY_DIR)
-    strategy_files = [f for f in os.listdir(STRATEGY_DIR) if f.endswith('.pkl')]
-    strategy_names = [os.path.splitext(f)[0] for f in strategy_files]
-    return strategy_names
+    """
+    Names of the strategies, from the strategy catalog.
+    """
+    return get_catalog(STRATEGY_DIR).strategy_names()
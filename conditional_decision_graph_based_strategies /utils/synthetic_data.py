@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Optional, Union
+import zlib
+
+import numpy as np
+import pandas as pd
+
+MODELS = ('gbm', 'regime')
+
+# Daily drift and volatility of the market factor in each regime (bull, bear) and the
+# probabilities of staying in each regime from one day to the next
+REGIME_DRIFTS = (0.0005, -0.0008)
+REGIME_VOLATILITIES = (0.008, 0.02)
+REGIME_PERSISTENCE = (0.99, 0.97)
+
+
+def synthetic_tickers(count: int) -> List[str]:
+    return [f"SYN{i:04d} US EQUITY" for i in range(count)]
+
+
+def ticker_seed(seed: int, ticker: str) -> List[int]:
+    """
+    Seed of a ticker's idiosyncratic returns, stable across runs and independent of the other tickers requested.
+    """
+    return [seed, zlib.crc32(ticker.encode())]
+
+
+def generate_regimes(periods: int, seed: int = 0, persistence=REGIME_PERSISTENCE) -> np.ndarray:
+    """
+    Simulates a two-state Markov chain of market regimes.
+
+    :param periods: Number of dates.
+    :param seed: Random seed.
+    :param persistence: Probabilities of staying in each regime from one date to the next.
+    :return: Array of regime ids (0 for bull, 1 for bear).
+    """
+    rng = np.random.default_rng([seed, 0])
+    draws = rng.random(periods)
+    regimes = np.zeros(periods, dtype=np.int8)
+    for t in range(1, periods):
+        previous = regimes[t - 1]
+        regimes[t] = previous if draws[t] < persistence[previous] else 1 - previous
+    return regimes
+
+
+def generate_prices(
+    tickers: Union[int, Iterable[str]],
+    start_date='1990-01-01',
+    end_date=None,
+    periods: Optional[int] = None,
+    model: str = 'regime',
+    seed: int = 0,
+    start_price: float = 100.0
+) -> Dict[str, pd.Series]:
+    """
+    Generates seeded synthetic business-day price histories.
+
+    With 'gbm' every ticker follows an independent geometric Brownian motion. With 'regime' the
+    tickers load on a common market factor whose drift and volatility switch between a bull and
+    a bear regime, which produces the trend changes and volatility clusters decision trees react to.
+    A ticker's history only depends on the seed, its name and the dates, so it is the same whichever
+    other tickers are generated with it.
+
+    :param tickers: Number of tickers, or their names.
+    :param start_date: First date of the histories.
+    :param end_date: Last date of the histories. Either `end_date` or `periods` must be given.
+    :param periods: Number of business days.
+    :param model: 'gbm' or 'regime'.
+    :param seed: Random seed.
+    :param start_price: Price on the first date.
+    :return: Dictionary mapping tickers to price histories.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unsupported model: {model}")
+    tickers = synthetic_tickers(tickers) if isinstance(tickers, int) else list(tickers)
+    if end_date is None and periods is None:
+        raise ValueError("Either end_date or periods must be given.")
+    dates = pd.bdate_range(start_date, end_date, periods=periods) if end_date is not None \
+        else pd.bdate_range(start_date, periods=periods)
+
+    if model == 'regime':
+        regimes = generate_regimes(len(dates), seed)
+        market_rng = np.random.default_rng([seed, 1])
+        market_returns = (np.asarray(REGIME_DRIFTS)[regimes]
+                          + np.asarray(REGIME_VOLATILITIES)[regimes] * market_rng.standard_normal(len(dates)))
+
+    histories = {}
+    for ticker in tickers:
+        rng = np.random.default_rng(ticker_seed(seed, ticker))
+        if model == 'gbm':
+            drift, volatility = rng.normal(0.0003, 0.0002), rng.uniform(0.005, 0.03)
+            log_returns = drift + volatility * rng.standard_normal(len(dates))
+        else:
+            beta, volatility = rng.uniform(0.2, 1.8), rng.uniform(0.003, 0.02)
+            log_returns = beta * market_returns + volatility * rng.standard_normal(len(dates))
+        # The first date is the starting price
+        log_returns[0] = 0.0
+        histories[ticker] = pd.Series(start_price * np.exp(np.cumsum(log_returns)), index=dates)
+    return histories